@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CatappConfig(AppConfig):
     name = 'catapp'
+
+    def ready(self):
+        # Connect the signal handlers keeping the response cache versions fresh,
+        # the denormalized cat homes in step, the counters up to date and the
+        # breeds copied to every shard.
+        from . import caching, counters, denormalization, sharding  # noqa: F401
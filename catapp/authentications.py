@@ -1,12 +1,26 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import timedelta
 
 from catproject.settings import TOKEN_EXPIRY_TIME
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import AuthenticationFailed
 
+from .metrics import timed
+from .replicas import is_reading_from_replica
+
 
 #this return left time
 def expires_in(token):
@@ -30,23 +44,246 @@ def token_expire_handler(token):
     return is_expired, token
 
 
+def get_row(instance):
+    return tuple(getattr(instance, field.attname)
+                 for field in instance._meta.concrete_fields)
+
+
+def from_row(model, using, row):
+    names = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(using, names, row)
+
+
+class TokenCache:
+    """
+    Thread-safe TTL + LRU cache of key -> token (with its user loaded).
+    Entries never outlive the token itself.
+
+    Only the column values are kept, so every `get()` builds a new token and
+    user that requests cannot share. Changes made by another process are only
+    noticed once the entry expires, after at most `ttl` seconds
+    (`TOKEN_CACHE_TTL`): until then a token deleted or rotated there stays
+    valid here, and so does the token of a user deactivated there.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            rows, deadline = entry
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        using, _, token_row, user_row = rows
+        token = from_row(Token, using, token_row)
+        token.user = from_row(get_user_model(), using, user_row)
+        return token
+
+    def set(self, token):
+        ttl = min(self.ttl, expires_in(token).total_seconds())
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        rows = (token._state.db, token.user_id, get_row(token), get_row(token.user))
+        with self._lock:
+            self._entries[token.key] = (rows, time.monotonic() + ttl)
+            self._entries.move_to_end(token.key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key, (rows, _) in list(self._entries.items()):
+                if rows[1] == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, "TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "TOKEN_CACHE_TTL", 300),
+)
+
+
+# Deleted or rotated tokens and deactivated users must not stay cached.
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user_tokens(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    if kwargs.get("signal") is post_delete or not instance.is_active:
+        revoke_signed_tokens_for_user(instance.pk)
+
+
+#________________________________________________
+# Stateless signed tokens
+SIGNED_TOKEN_SALT = "catapp.authentications.signed-token"
+
+
+def get_revocation_cache():
+    """
+    The cache of revoked signed tokens, `SIGNED_TOKEN_REVOCATION_CACHE`. It
+    must be shared by every worker (a database cache by default), otherwise
+    a token revoked in one process stays valid in the others.
+    """
+    return caches[settings.SIGNED_TOKEN_REVOCATION_CACHE]
+
+
+def create_signed_token(user):
+    """
+    Return a new HMAC-signed token for `user` and its lifetime in seconds.
+    """
+    issued_at = time.time()
+    claims = {
+        "uid": user.pk,
+        "iat": issued_at,
+        "exp": int(issued_at + settings.TOKEN_EXPIRY_TIME),
+        "jti": uuid.uuid4().hex,
+    }
+    key = signing.dumps(
+        claims, key=settings.SIGNED_TOKEN_KEY, salt=SIGNED_TOKEN_SALT
+    )
+    return key, settings.TOKEN_EXPIRY_TIME
+
+
+def revoke_signed_token(claims):
+    """
+    Add a token to the revocation list until it would have expired anyway.
+    """
+    timeout = claims["exp"] - time.time()
+    if timeout > 0:
+        get_revocation_cache().set("signed-token:jti:%s" % claims["jti"], True, timeout)
+
+
+def revoke_signed_tokens_for_user(user_id):
+    # Every token issued up to now is rejected, see SignedTokenAuthentication.
+    get_revocation_cache().set(
+        "signed-token:user:%s" % user_id, time.time(), settings.TOKEN_EXPIRY_TIME
+    )
+
+
+class SignedTokenUser:
+    """
+    Stand-in for the user of a signed token, built from the token claims alone.
+    Any attribute not known from the claims loads the real user, so privilege
+    checks such as `is_staff` always see the current flags.
+    """
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, claims):
+        self.pk = self.id = claims["uid"]
+
+    def __str__(self):
+        return "SignedTokenUser %s" % self.pk
+
+    def __eq__(self, other):
+        return getattr(other, "pk", None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        user = self.__dict__.get("_user")
+        if user is None:
+            try:
+                user = get_user_model()._default_manager.get(pk=self.pk)
+            except ObjectDoesNotExist:
+                # Deleted before the revocation of its tokens was seen.
+                raise AuthenticationFailed("User not found")
+            self._user = user
+        return getattr(user, name)
+
+
+def get_token(key):
+    queryset = Token.objects.select_related("user")
+    try:
+        return queryset.get(key=key)
+    except Token.DoesNotExist:
+        if not is_reading_from_replica():
+            raise
+    # A token created moments ago may not have reached the replica yet.
+    return queryset.using(DEFAULT_DB_ALIAS).get(key=key)
+
+
 #________________________________________________
 #DEFAULT_AUTHENTICATION_CLASSES
 class ExpiringTokenAuthentication(TokenAuthentication):
     """
     If token is expired then it will return authentication failed message.
+    Valid tokens are kept in `token_cache` so warm workers skip the database.
     """
+    @timed("auth")
     def authenticate_credentials(self, key):
-        try:
-            token = Token.objects.get(key = key)
-        except Token.DoesNotExist:
-            raise AuthenticationFailed("Invalid Token")
+        token = cached = token_cache.get(key)
+        if token is None:
+            try:
+                token = get_token(key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed("Invalid Token")
         
         if not token.user.is_active:
             raise AuthenticationFailed("User is not active")
 
         is_expired, token = token_expire_handler(token)
         if is_expired:
+            token_cache.invalidate(key)
             raise AuthenticationFailed("The Token is expired")
-        
-        return (token.user, token)
\ No newline at end of file
+
+        if cached is None:
+            token_cache.set(token)
+        return (token.user, token)
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Verifies HMAC-signed expiring tokens without loading the token or the user;
+    only the revocation list is read, from the shared `get_revocation_cache()`
+    (the database by default, a memcached or Redis cache is cheaper).
+    Clients send `Authorization: Signed <token>`, so this class can sit next
+    to `ExpiringTokenAuthentication` on the same viewset.
+    """
+    keyword = "Signed"
+
+    @timed("auth")
+    def authenticate_credentials(self, key):
+        try:
+            claims = signing.loads(
+                key, key=settings.SIGNED_TOKEN_KEY, salt=SIGNED_TOKEN_SALT
+            )
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid Token")
+
+        if claims["exp"] <= time.time():
+            raise AuthenticationFailed("The Token is expired")
+
+        jti_key = "signed-token:jti:%s" % claims["jti"]
+        user_key = "signed-token:user:%s" % claims["uid"]
+        revoked = get_revocation_cache().get_many([jti_key, user_key])
+        if jti_key in revoked or revoked.get(user_key, 0) >= claims["iat"]:
+            raise AuthenticationFailed("The Token is revoked")
+
+        return (SignedTokenUser(claims), claims)
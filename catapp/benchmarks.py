@@ -0,0 +1,412 @@
+import math
+import platform
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from itertools import accumulate, islice
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .authentications import token_cache
+from .caching import bump_model_version, get_cache
+from .models import Breed, Cat, Home, Human
+from .views import BreedViewSet, CatViewSet, HomeViewSet, HumanViewSet
+
+# Benchmarks of the API on generated datasets, see the `benchmark` command.
+
+DATASET_SIZES = {"1k": 1000, "100k": 100000, "1M": 1000000}
+VIEWSETS = {
+    "home": HomeViewSet,
+    "human": HumanViewSet,
+    "breed": BreedViewSet,
+    "cat": CatViewSet,
+}
+SCENARIOS = ("list", "retrieve", "create", "token_auth")
+BREED_COUNT = 60
+# Weights of 1, 2, 3 and 4 humans living in a home.
+HOUSEHOLD_WEIGHTS = (35, 35, 20, 10)
+FIRST_BIRTHDAY = date(2005, 1, 1).toordinal()
+LAST_BIRTHDAY = date(2023, 12, 31).toordinal()
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run the block in a transaction that is always rolled back, so benchmark
+    datasets never stay in the database.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def parse_size(value):
+    """
+    Parse a dataset size, either a number of cats or one of `DATASET_SIZES`.
+    """
+    if value in DATASET_SIZES:
+        return DATASET_SIZES[value]
+    cats = int(value)
+    if cats < 1:
+        raise ValueError("A dataset needs at least one cat.")
+    return cats
+
+
+def random_date(rng, first=FIRST_BIRTHDAY, last=LAST_BIRTHDAY):
+    return date.fromordinal(rng.randint(first, last))
+
+
+def get_next_pk(model):
+    return (model._default_manager.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def bulk_insert(model, objects, batch_size):
+    """
+    Insert the `objects` generated lazily, `batch_size` at a time.
+    """
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            break
+        model._default_manager.bulk_create(batch)
+
+
+def draw_cats(rng, cats, human_count, breed_weights):
+    """
+    Yield the owner and breed indexes, gender, birthday and whether it has a
+    description of `cats` random cats.
+    """
+    breeds = range(BREED_COUNT)
+    for _ in range(cats):
+        # Skewed towards the first humans.
+        owner = int(human_count * rng.random() ** 2)
+        breed = rng.choices(breeds, cum_weights=breed_weights)[0]
+        yield owner, breed, rng.choice("MF"), random_date(rng), rng.random() < 0.3
+
+
+def generate_dataset(cats, seed=0, batch_size=10000):
+    """
+    Insert `cats` cats with their breeds, owners and homes, and return the
+    primary keys of the new rows per model. The same `cats` and `seed` always
+    produce the same rows: about 4 cats per home, 1 to 4 humans per home, a
+    few humans owning most cats and breeds following a Zipf distribution.
+    Counters and denormalized columns are filled in, but no signal is sent.
+    """
+    rng = random.Random(seed)
+
+    breed_start = get_next_pk(Breed)
+    breed_weights = list(accumulate(1 / rank for rank in range(1, BREED_COUNT + 1)))
+    breed_cat_counts = [0] * BREED_COUNT
+
+    home_start = get_next_pk(Home)
+    home_count = max(cats // 4, 1)
+    home_humans = rng.choices(
+        range(1, len(HOUSEHOLD_WEIGHTS) + 1), HOUSEHOLD_WEIGHTS, k=home_count
+    )
+    bulk_insert(
+        Home,
+        (
+            Home(
+                pk=home_start + index,
+                name="Home %d" % index,
+                address="%d Cat Street" % index,
+                type=rng.choice((Home.LANDED, Home.LANDED, Home.CONDO)),
+                human_count=home_humans[index],
+            )
+            for index in range(home_count)
+        ),
+        batch_size,
+    )
+
+    # The home of every human, by index.
+    human_homes = [home for home, count in enumerate(home_humans) for _ in range(count)]
+    human_start = get_next_pk(Human)
+    human_cat_counts = [0] * len(human_homes)
+    # The cats are drawn twice, first to count them per human and breed, then
+    # to insert them once their humans and breeds exist.
+    state = rng.getstate()
+    for owner, breed, *_ in draw_cats(rng, cats, len(human_homes), breed_weights):
+        human_cat_counts[owner] += 1
+        breed_cat_counts[breed] += 1
+
+    Breed.objects.bulk_create(
+        Breed(
+            pk=breed_start + index,
+            name="Breed %d" % index,
+            origin=rng.choice(("Europe", "Asia", "Africa", "America")),
+            cat_count=breed_cat_counts[index],
+        )
+        for index in range(BREED_COUNT)
+    )
+    bulk_insert(
+        Human,
+        (
+            Human(
+                pk=human_start + index,
+                name="Human %d" % index,
+                gender=rng.choice("MF"),
+                date_of_birth=random_date(rng, date(1940, 1, 1).toordinal()),
+                home_id=home_start + home,
+                cat_count=human_cat_counts[index],
+            )
+            for index, home in enumerate(human_homes)
+        ),
+        batch_size,
+    )
+    rng.setstate(state)
+    cat_start = get_next_pk(Cat)
+    bulk_insert(
+        Cat,
+        (
+            Cat(
+                pk=cat_start + index,
+                name="Cat %d" % index,
+                gender=gender,
+                date_of_birth=birthday,
+                description="A very good cat." if described else "",
+                breed_id=breed_start + breed,
+                owner_id=human_start + owner,
+                home_id=home_start + human_homes[owner],
+                home_name="Home %d" % human_homes[owner],
+            )
+            for index, (owner, breed, gender, birthday, described) in enumerate(
+                draw_cats(rng, cats, len(human_homes), breed_weights)
+            )
+        ),
+        batch_size,
+    )
+    for model in (Home, Human, Breed, Cat):
+        bump_model_version(model)
+    return {
+        "home": range(home_start, home_start + home_count),
+        "human": range(human_start, human_start + len(human_homes)),
+        "breed": range(breed_start, breed_start + BREED_COUNT),
+        "cat": range(cat_start, cat_start + cats),
+    }
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of the sorted `values`.
+    """
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def measure(run, iterations, warmup=0, setup=None):
+    """
+    Call `run` `iterations` times, after `warmup` untimed calls, and return its
+    latency percentiles in milliseconds, its query count and its peak memory
+    allocation in bytes, measured in a separate pass. `setup` is called,
+    untimed, before each call.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        run()
+    durations = []
+    queries = []
+    errors = 0
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            succeeded = run()
+            durations.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured.captured_queries))
+        errors += not succeeded
+
+    # tracemalloc slows everything down, so memory is measured on its own.
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "mean_ms": sum(durations) / len(durations),
+        "min_ms": durations[0],
+        "p50_ms": percentile(durations, 50),
+        "p90_ms": percentile(durations, 90),
+        "p99_ms": percentile(durations, 99),
+        "max_ms": durations[-1],
+        "queries": max(queries),
+        "peak_memory": peak_memory,
+    }
+
+
+def get_create_payload(basename, pks, rng):
+    url = "http://testserver/%s/%d/"
+    if basename == "home":
+        return {"name": "New home", "address": "1 New Street"}
+    if basename == "human":
+        return {
+            "name": "New human",
+            "gender": "F",
+            "home": url % ("home", rng.choice(pks["home"])),
+        }
+    if basename == "breed":
+        return {"name": "New breed", "origin": "Europe"}
+    return {
+        "name": "New cat",
+        "gender": "M",
+        "breed": url % ("breed", rng.choice(pks["breed"])),
+        "owner": url % ("human", rng.choice(pks["human"])),
+    }
+
+
+class Benchmark:
+    """
+    Run the scenarios of `SCENARIOS` against the viewsets of `VIEWSETS` on a
+    dataset generated by `generate_dataset()`, through the whole middleware
+    stack. Every response is computed afresh: the response cache is cleared
+    before each request.
+    """
+
+    page_size = 100
+
+    def __init__(self, cats, seed=0, iterations=50, warmup=5, viewsets=None):
+        self.cats = cats
+        self.seed = seed
+        self.iterations = iterations
+        self.warmup = warmup
+        self.viewsets = viewsets or list(VIEWSETS)
+
+    def setup(self):
+        self.pks = generate_dataset(self.cats, self.seed)
+        self.user, _ = User.objects.get_or_create(username="benchmark")
+        self.token, _ = Token.objects.get_or_create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token %s" % self.token.key)
+        self.rng = random.Random(self.seed)
+
+    def get_runner(self, basename, scenario):
+        client = self.client
+        rng = self.rng
+        pks = self.pks
+
+        def succeeded(response):
+            return response.status_code < 400
+
+        if scenario == "list":
+            url = "/%s/?page_size=%d" % (basename, self.page_size)
+            return lambda: succeeded(client.get(url))
+        if scenario == "retrieve":
+            return lambda: succeeded(
+                client.get("/%s/%d/" % (basename, rng.choice(pks[basename])))
+            )
+        if scenario == "create":
+            return lambda: succeeded(
+                client.post(
+                    "/%s/" % basename,
+                    get_create_payload(basename, pks, rng),
+                    format="json",
+                )
+            )
+
+        # token_auth: the authentication classes of the viewset, with the
+        # token cache cold.
+        viewset = VIEWSETS[basename]
+        request = APIRequestFactory().get(
+            "/%s/" % basename, HTTP_AUTHORIZATION="Token %s" % self.token.key
+        )
+
+        def authenticate():
+            drf_request = Request(
+                request,
+                authenticators=[auth() for auth in viewset.authentication_classes],
+            )
+            return drf_request.user == self.user
+
+        return authenticate
+
+    def run(self):
+        """
+        Generate the dataset and return the results of every scenario.
+        """
+        self.setup()
+        results = {}
+        for basename in self.viewsets:
+            for scenario in SCENARIOS:
+                if scenario == "token_auth":
+                    setup = token_cache.clear
+                else:
+                    setup = get_cache().clear
+                results["%s.%s" % (basename, scenario)] = measure(
+                    self.get_runner(basename, scenario),
+                    self.iterations,
+                    self.warmup,
+                    setup,
+                )
+        return {
+            "dataset": {
+                "cats": self.cats,
+                "seed": self.seed,
+                "rows": {model: len(pks) for model, pks in self.pks.items()},
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "created": timezone.now().isoformat(),
+            "scenarios": results,
+        }
+
+
+def compare_results(baseline, current, threshold=0.2, noise_ms=1.0):
+    """
+    Return the regressions of `current` over `baseline`: a median or p90
+    latency or a peak memory more than `threshold` higher, latency
+    differences under `noise_ms` aside, or more queries.
+    """
+    regressions = []
+    for name, result in sorted(current["scenarios"].items()):
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        for key in ("p50_ms", "p90_ms"):
+            if (
+                result[key] > before[key] * (1 + threshold)
+                and result[key] - before[key] > noise_ms
+            ):
+                regressions.append(
+                    "%s: %s went from %.2f to %.2f"
+                    % (name, key, before[key], result[key])
+                )
+        if result["queries"] > before["queries"]:
+            regressions.append(
+                "%s: queries went from %d to %d"
+                % (name, before["queries"], result["queries"])
+            )
+        if result["peak_memory"] > before["peak_memory"] * (1 + threshold):
+            regressions.append(
+                "%s: peak memory went from %d to %d bytes"
+                % (name, before["peak_memory"], result["peak_memory"])
+            )
+    return regressions
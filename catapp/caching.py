@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+
+from .models import Breed, Cat, Home, Human
+from .querysets import get_query_plan
+
+VERSION_KEY = "catapp:version:%s"
+RESPONSE_KEY = "catapp:response:%s:%s"
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _initial_version():
+    # A fresh starting point, so a version key evicted from the cache can never
+    # come back to a value that earlier responses were cached under.
+    return int(time.time() * 1000)
+
+
+def get_model_versions(models):
+    """
+    Return the current version counter of every model in `models`.
+    """
+    cache = get_cache()
+    keys = {VERSION_KEY % model._meta.label_lower: model for model in models}
+    versions = cache.get_many(list(keys))
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in sorted(keys)]
+
+
+def bump_model_version(model):
+    """
+    Invalidate every cached response that depends on `model`.
+    """
+    cache = get_cache()
+    key = VERSION_KEY % model._meta.label_lower
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+_dependencies = {}
+
+
+def get_model_dependencies(serializer_class):
+    """
+    Return the models whose rows can show up in the output of `serializer_class`,
+    derived from its query plan.
+    """
+    try:
+        return _dependencies[serializer_class]
+    except KeyError:
+        pass
+    plan = get_query_plan(serializer_class)
+    models = {plan.model}
+    models.update(model for _, model, _ in plan.get_related_paths())
+    _dependencies[serializer_class] = models
+    return models
+
+
+def get_response_cache_key(request, models):
+    """
+    Cache key of a response: absolute URI (responses hold absolute links, so
+    the scheme and host matter), rendering format and the versions of every
+    model it depends on.
+    """
+    request_key = "%s|%s|%s" % (
+        request.build_absolute_uri(),
+        request.accepted_renderer.format,
+        request.accepted_media_type,
+    )
+    versions = ".".join(str(version) for version in get_model_versions(models))
+    return RESPONSE_KEY % (
+        hashlib.md5(request_key.encode("utf-8")).hexdigest(),
+        versions,
+    )
+
+
+def bump_instance_version(sender, **kwargs):
+    bump_model_version(sender)
+
+
+for model in (Home, Human, Breed, Cat):
+    post_save.connect(
+        bump_instance_version, sender=model, dispatch_uid="catapp-version"
+    )
+    post_delete.connect(
+        bump_instance_version, sender=model, dispatch_uid="catapp-version"
+    )
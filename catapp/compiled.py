@@ -0,0 +1,235 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    HyperlinkedRelatedField,
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+)
+
+from .links import build_url, get_link_mode, get_url_template
+from .metrics import timed
+from .querysets import get_query_plan
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+def _is_identity(field):
+    """
+    Whether `field.to_representation()` returns database values unchanged.
+    """
+    if isinstance(field, serializers.ChoiceField):
+        return all(
+            key == value for key, value in field.choice_strings_to_values.items()
+        )
+    # CharField applies str() and IntegerField int() to values of that type.
+    return type(field) in (serializers.CharField, serializers.IntegerField)
+
+
+class CompiledSerializer:
+    """
+    A read-only stand-in for `serializer_class(queryset, many=True).data`.
+
+    Rows are fetched with `values()` and turned into dicts by per-field
+    accessors derived once from the serializer fields, skipping field binding,
+    `get_attribute()` and model instances altogether. The output is the same
+    as the serializer's. Raises `UnsupportedField` for fields it cannot
+    compile, such as method fields.
+    """
+
+    def __init__(self, serializer_class, field_names=None):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.plan = get_query_plan(serializer_class, field_names)
+        self.pk_name = self.model._meta.pk.attname
+        self.columns = {self.pk_name}
+        # (name, kind, column, extra) in output order
+        self.fields = []
+        # name -> (queryset, foreign key attname, columns)
+        self.related = {}
+        for name, field in serializer.fields.items():
+            if field.write_only or (
+                field_names is not None and name not in field_names
+            ):
+                continue
+            self.compile_field(name, field)
+
+    def get_model_field(self, source_attrs):
+        model = self.model
+        model_field = None
+        for attr in source_attrs:
+            if model is None:
+                raise UnsupportedField(attr)
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise UnsupportedField(attr)
+            model = model_field.related_model
+        return model_field
+
+    def compile_field(self, name, field):
+        if isinstance(field, HyperlinkedIdentityField):
+            self.compile_link(name, field, field.lookup_field)
+            return
+        if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+            raise UnsupportedField(name)
+        model_field = self.get_model_field(field.source_attrs)
+        if isinstance(field, ManyRelatedField):
+            self.compile_many(name, field, model_field)
+            return
+        if model_field.is_relation and (
+            model_field.many_to_many or model_field.one_to_many
+        ):
+            raise UnsupportedField(name)
+
+        column = "__".join(field.source_attrs)
+        if model_field.is_relation:
+            column = "__".join(field.source_attrs[:-1] + [model_field.attname])
+        if isinstance(field, HyperlinkedRelatedField):
+            if field.lookup_field != "pk" or not model_field.is_relation:
+                raise UnsupportedField(name)
+            self.compile_link(name, field, column)
+        elif isinstance(field, PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                raise UnsupportedField(name)
+            self.columns.add(column)
+            self.fields.append((name, "value", column, None))
+        elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+            raise UnsupportedField(name)
+        else:
+            self.columns.add(column)
+            convert = None if _is_identity(field) else field.to_representation
+            self.fields.append((name, "value", column, convert))
+
+    def compile_link(self, name, field, column):
+        self.columns.add(column)
+        self.fields.append(
+            (name, "link", column, (field.view_name, field.lookup_url_kwarg))
+        )
+
+    def compile_many(self, name, field, model_field):
+        child = field.child_relation
+        if not model_field.one_to_many or len(field.source_attrs) != 1:
+            raise UnsupportedField(name)
+        if getattr(child, "compiled_columns", None) is not None:
+            columns = child.compiled_columns
+            kind = "many"
+            extra = child.to_compiled_representation
+        elif isinstance(child, HyperlinkedRelatedField) and child.lookup_field == "pk":
+            columns = ("pk",)
+            kind = "many_links"
+            extra = (child.view_name, child.lookup_url_kwarg)
+        elif isinstance(child, PrimaryKeyRelatedField) and child.pk_field is None:
+            columns = ("pk",)
+            kind = "many"
+            extra = None
+        else:
+            raise UnsupportedField(name)
+        lookup = field.source
+        queryset = self.plan.prefetch_related.get(lookup)
+        if queryset is None:
+            queryset = model_field.related_model._default_manager.all()
+        self.related[name] = (queryset, model_field.field.attname, columns)
+        self.fields.append((name, kind, lookup, extra))
+
+    def get_queryset(self, queryset, extra_columns=()):
+        """
+        Turn a model queryset into the `values()` queryset this serializer reads.
+        """
+        return queryset.prefetch_related(None).values(
+            *sorted(self.columns.union(extra_columns))
+        )
+
+    def fetch_related(self, rows):
+        pks = [row[self.pk_name] for row in rows]
+        related = {}
+        for name, (queryset, foreign_key, columns) in self.related.items():
+            values = related[name] = defaultdict(list)
+            if not pks:
+                continue
+            for row in queryset.filter(**{"%s__in" % foreign_key: pks}).values_list(
+                foreign_key, *columns
+            ):
+                values[row[0]].append(row[1:])
+        return related
+
+    def get_accessors(self, related, request, format):
+        raw_links = get_link_mode(request) == "id"
+
+        def template(view_name, lookup_url_kwarg):
+            return get_url_template(view_name, lookup_url_kwarg, request, format)
+
+        pk_name = self.pk_name
+        accessors = []
+        for name, kind, column, extra in self.fields:
+            if kind == "value" and extra is None or kind == "link" and raw_links:
+                accessor = itemgetter(column)
+            elif kind == "value":
+
+                def accessor(row, column=column, convert=extra):
+                    value = row[column]
+                    return None if value is None else convert(value)
+
+            elif kind == "link":
+
+                def accessor(row, column=column, url=template(*extra)):
+                    value = row[column]
+                    return None if value is None else build_url(url, value)
+
+            elif kind == "many_links" and not raw_links:
+
+                def accessor(
+                    row, values=related[name], url=template(*extra), pk_name=pk_name
+                ):
+                    return [
+                        build_url(url, value[0])
+                        for value in values.get(row[pk_name], ())
+                    ]
+
+            elif extra is None or kind == "many_links":
+
+                def accessor(row, values=related[name], pk_name=pk_name):
+                    return [value[0] for value in values.get(row[pk_name], ())]
+
+            else:
+
+                def accessor(row, values=related[name], convert=extra, pk_name=pk_name):
+                    return [convert(*value) for value in values.get(row[pk_name], ())]
+
+            accessors.append((name, accessor))
+        return accessors
+
+    @timed("serialize")
+    def serialize(self, rows, request, format=None):
+        """
+        Return the serialized data of `rows`, dicts from `get_queryset()`.
+        """
+        rows = list(rows)
+        accessors = self.get_accessors(self.fetch_related(rows), request, format)
+        return [{name: accessor(row) for name, accessor in accessors} for row in rows]
+
+
+_compiled_cache = {}
+
+
+def get_compiled_serializer(serializer_class, field_names=None):
+    """
+    Return the (cached) `CompiledSerializer` of `serializer_class`, or None
+    when one of its fields cannot be compiled.
+    """
+    key = (serializer_class, field_names)
+    try:
+        return _compiled_cache[key]
+    except KeyError:
+        pass
+    try:
+        compiled = CompiledSerializer(serializer_class, field_names)
+    except UnsupportedField:
+        compiled = None
+    _compiled_cache[key] = compiled
+    return compiled
@@ -0,0 +1,192 @@
+import threading
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .caching import bump_model_version
+from .models import Breed, Cat, Home, Human
+
+# (child model, foreign key attname, parent model, counter field): the counter
+# holds the number of children pointing at each parent row.
+COUNTERS = (
+    (Cat, "breed_id", Breed, "cat_count"),
+    (Cat, "owner_id", Human, "cat_count"),
+    (Human, "home_id", Home, "human_count"),
+)
+
+_batch = threading.local()
+
+
+def get_counters(model):
+    return [counter for counter in COUNTERS if counter[0] is model]
+
+
+def _get_value(instance, attname):
+    if isinstance(instance, Mapping):
+        return instance[attname]
+    return getattr(instance, attname)
+
+
+def apply_deltas(deltas):
+    """
+    Add `deltas`, a mapping of `(parent model, counter field)` to a `Counter`
+    of parent pk -> delta, with one atomic `F()` UPDATE per distinct delta.
+    """
+    now = timezone.now()
+    for (parent, field), counts in deltas.items():
+        by_delta = defaultdict(list)
+        for pk, delta in counts.items():
+            if delta and pk is not None:
+                by_delta[delta].append(pk)
+        for delta, pks in sorted(by_delta.items()):
+            # updated_at keeps the ETags of the parent lists honest.
+            parent._default_manager.filter(pk__in=pks).update(
+                **{field: F(field) + delta, "updated_at": now}
+            )
+        if by_delta:
+            # update() sends no post_save signals.
+            bump_model_version(parent)
+
+
+def add_deltas(deltas):
+    pending = getattr(_batch, "deltas", None)
+    if pending is None:
+        apply_deltas(deltas)
+        return
+    for key, counts in deltas.items():
+        pending.setdefault(key, Counter()).update(counts)
+
+
+@contextmanager
+def batched_counters():
+    """
+    Collect the counter updates made inside the block and apply them once on
+    exit, so bulk writes issue a few UPDATEs instead of one per row.
+    """
+    if getattr(_batch, "deltas", None) is not None:
+        # Already batching.
+        yield
+        return
+    _batch.deltas = {}
+    try:
+        yield
+        deltas = _batch.deltas
+    finally:
+        _batch.deltas = None
+    apply_deltas(deltas)
+
+
+def count_rows(model, rows, sign=1):
+    """
+    Count `rows` (instances or dicts of attnames) as added to (or removed
+    from, with `sign=-1`) the counters of their parents.
+    """
+    deltas = {}
+    for _, attname, parent, field in get_counters(model):
+        counts = deltas[(parent, field)] = Counter()
+        for row in rows:
+            counts[_get_value(row, attname)] += sign
+    add_deltas(deltas)
+
+
+def get_counted_values(model, pks, attnames):
+    return {
+        row[0]: dict(zip(attnames, row[1:]))
+        for row in model._default_manager.filter(pk__in=pks).values_list(
+            "pk", *attnames
+        )
+    }
+
+
+def count_bulk_write(model, instances, fields=None):
+    """
+    Count `instances` about to be written by `bulk_create()` (`fields` is
+    None) or `bulk_update(fields)`, reading the previous foreign keys of
+    updated rows. Call inside `batched_counters()`, so the counters are only
+    updated once the rows are written.
+    """
+    counters = get_counters(model)
+    if fields is None:
+        count_rows(model, instances)
+        return
+    counters = [
+        counter
+        for counter in counters
+        if model._meta.get_field(counter[1]).name in fields
+    ]
+    if not counters:
+        return
+    attnames = [attname for _, attname, _, _ in counters]
+    previous = get_counted_values(
+        model, [instance.pk for instance in instances], attnames
+    )
+    deltas = {}
+    for _, attname, parent, field in counters:
+        counts = deltas[(parent, field)] = Counter()
+        for instance in instances:
+            old = previous.get(instance.pk, {}).get(attname)
+            new = getattr(instance, attname)
+            if old != new:
+                counts[old] -= 1
+                counts[new] += 1
+    add_deltas(deltas)
+
+
+def get_repair_queryset(child, attname, parent, field):
+    """
+    Return the `(pk, actual count)` of the parents whose counter is wrong.
+    """
+    related_name = child._meta.get_field(attname).remote_field.get_accessor_name()
+    return (
+        parent._default_manager.annotate(actual=Count(related_name))
+        .exclude(**{field: F("actual")})
+        .values_list("pk", "actual")
+    )
+
+
+def remember_counted_values(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    attnames = [attname for _, attname, _, _ in get_counters(sender)]
+    if update_fields is not None:
+        attnames = [
+            attname
+            for attname in attnames
+            if sender._meta.get_field(attname).name in update_fields
+        ]
+    if attnames:
+        instance._counted_values = get_counted_values(
+            sender, [instance.pk], attnames
+        ).get(instance.pk, {})
+
+
+def count_saved(sender, instance, created, **kwargs):
+    if created:
+        count_rows(sender, [instance])
+        return
+    previous = instance.__dict__.pop("_counted_values", None)
+    if not previous:
+        return
+    deltas = {}
+    for _, attname, parent, field in get_counters(sender):
+        if attname in previous and previous[attname] != getattr(instance, attname):
+            deltas[(parent, field)] = Counter(
+                {previous[attname]: -1, getattr(instance, attname): 1}
+            )
+    add_deltas(deltas)
+
+
+def count_deleted(sender, instance, **kwargs):
+    count_rows(sender, [instance], sign=-1)
+
+
+for model in (Cat, Human):
+    pre_save.connect(
+        remember_counted_values, sender=model, dispatch_uid="catapp-counters"
+    )
+    post_save.connect(count_saved, sender=model, dispatch_uid="catapp-counters")
+    post_delete.connect(count_deleted, sender=model, dispatch_uid="catapp-counters")
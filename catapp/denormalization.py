@@ -0,0 +1,138 @@
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .caching import bump_model_version
+from .models import Cat, Home, Human
+
+# `Cat.home` and `Cat.home_name` copy `cat.owner.home`, so cats can be listed
+# and filtered by home without joining `Human` and `Home`. They are filled in
+# before a cat is written and re-copied when a human moves home or a home is
+# renamed. Bulk writes, which send no signals, call `prepare_bulk_write()`
+# and `finish_bulk_write()` instead.
+
+
+def fill_cat_homes(cats):
+    """
+    Copy the home of each cat's owner onto `cats`, in at most one query.
+    """
+    owner_field = Cat._meta.get_field("owner")
+    home_field = Human._meta.get_field("home")
+    homes = {}
+    pending = set()
+    for cat in cats:
+        owner = owner_field.get_cached_value(cat, None)
+        if owner is not None and home_field.is_cached(owner):
+            homes[cat.owner_id] = (owner.home_id, owner.home.name)
+        elif cat.owner_id is not None:
+            pending.add(cat.owner_id)
+    if pending:
+        homes.update(
+            (pk, (home_id, name))
+            for pk, home_id, name in Human.objects.filter(pk__in=pending).values_list(
+                "pk", "home_id", "home__name"
+            )
+        )
+    for cat in cats:
+        if cat.owner_id in homes:
+            cat.home_id, cat.home_name = homes[cat.owner_id]
+
+
+def copy_owner_homes(queryset):
+    """
+    Re-copy the owner's home onto every cat of `queryset` in a single UPDATE,
+    returning the number of cats updated.
+    """
+    owner = Human.objects.filter(pk=OuterRef("owner"))
+    updated = queryset.update(
+        home=Subquery(owner.values("home")[:1]),
+        home_name=Subquery(owner.values("home__name")[:1]),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        # update() sends no post_save signals.
+        bump_model_version(Cat)
+    return updated
+
+
+def get_stale_cats():
+    """
+    Return the cats whose denormalized home no longer matches their owner's.
+    """
+    return Cat.objects.exclude(home=F("owner__home")) | Cat.objects.exclude(
+        home_name=F("home__name")
+    )
+
+
+def sync_owner_cats(owner_ids):
+    """
+    Update the cats of the humans in `owner_ids` that moved home.
+    """
+    return copy_owner_homes(
+        Cat.objects.filter(owner__in=owner_ids).exclude(home=F("owner__home"))
+    )
+
+
+def sync_home_cats(home_ids):
+    """
+    Update the cats living in the homes in `home_ids` that were renamed.
+    """
+    updated = (
+        Cat.objects.filter(home__in=home_ids)
+        .exclude(home_name=F("home__name"))
+        .update(
+            home_name=Subquery(
+                Home.objects.filter(pk=OuterRef("home")).values("name")[:1]
+            ),
+            updated_at=timezone.now(),
+        )
+    )
+    if updated:
+        bump_model_version(Cat)
+    return updated
+
+
+def prepare_bulk_write(model, instances, fields=None):
+    """
+    Fill the denormalized columns of `instances` before they are written with
+    `bulk_create()` (`fields` is None) or `bulk_update(fields)`, returning the
+    names of the extra fields to write.
+    """
+    if model is Cat and (fields is None or "owner" in fields):
+        fill_cat_homes(instances)
+        return {"home", "home_name"}
+    return set()
+
+
+def finish_bulk_write(model, instances, fields=None):
+    """
+    Propagate `bulk_create()` or `bulk_update(fields)` writes of `instances`
+    to the rows that copy them.
+    """
+    if fields is None:
+        # New humans and homes have no cats yet.
+        return
+    if model is Human and "home" in fields:
+        sync_owner_cats([instance.pk for instance in instances])
+    elif model is Home and "name" in fields:
+        sync_home_cats([instance.pk for instance in instances])
+
+
+def fill_cat_home(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "owner" in update_fields:
+        fill_cat_homes([instance])
+
+
+def sync_moved_owner(sender, instance, created, **kwargs):
+    if not created:
+        sync_owner_cats([instance.pk])
+
+
+def sync_renamed_home(sender, instance, created, **kwargs):
+    if not created:
+        sync_home_cats([instance.pk])
+
+
+pre_save.connect(fill_cat_home, sender=Cat, dispatch_uid="catapp-cat-home")
+post_save.connect(sync_moved_owner, sender=Human, dispatch_uid="catapp-cat-home")
+post_save.connect(sync_renamed_home, sender=Home, dispatch_uid="catapp-cat-home")
@@ -0,0 +1,111 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .links import LINKS_QUERY_PARAM
+from .profiling import PROFILE_QUERY_PARAM
+
+
+class IndexedFilterBackend(BaseFilterBackend):
+    """
+    Filter on the query parameters declared in the view's `filter_fields`, a
+    dict mapping a field path to its allowed lookups, e.g.
+
+        filter_fields = {"breed": ("exact", "in"), "date_of_birth": ("gte", "lte")}
+
+    Only indexed columns should be listed. Any other query parameter is
+    rejected with a 400 instead of being ignored or scanning the table, except
+    those the view reads itself and lists in `extra_query_params`.
+
+    The `ordering` parameter of the view's paginator is validated by the
+    paginator and applied to unpaginated lists too.
+    """
+
+    ignored_query_params = (
+        "fields",
+        "exclude",
+        LINKS_QUERY_PARAM,
+        PROFILE_QUERY_PARAM,
+    )
+
+    def get_ignored_query_params(self, view):
+        params = set(self.ignored_query_params)
+        params.add(api_settings.URL_FORMAT_OVERRIDE)
+        paginator = getattr(view, "paginator", None)
+        for attr in (
+            "cursor_query_param",
+            "page_size_query_param",
+            "ordering_query_param",
+        ):
+            params.add(getattr(paginator, attr, None))
+        params.add(getattr(view, "stream_query_param", None))
+        params.update(getattr(view, "extra_query_params", ()))
+        params.discard(None)
+        return params
+
+    def get_lookup(self, param, filter_fields):
+        if param in filter_fields:
+            path, lookup = param, "exact"
+        elif "__" in param:
+            path, lookup = param.rsplit("__", 1)
+        else:
+            return None, None
+        if lookup not in filter_fields.get(path, ()):
+            return None, None
+        return path, lookup
+
+    def get_model_field(self, model, path):
+        for name in path.split("__"):
+            field = model._meta.get_field(name)
+            model = field.related_model
+        # Compare foreign keys on the target column.
+        return field.target_field if field.is_relation else field
+
+    def to_python(self, model_field, lookup, value):
+        if lookup == "in":
+            return [model_field.to_python(item) for item in value.split(",") if item]
+        return model_field.to_python(value)
+
+    def get_ordering(self, request, queryset, view):
+        paginator = getattr(view, "paginator", None)
+        param = getattr(paginator, "ordering_query_param", None)
+        if param is None or param not in request.query_params:
+            return None
+        return paginator.get_ordering(request, queryset, view)
+
+    def filter_queryset(self, request, queryset, view):
+        filter_fields = getattr(view, "filter_fields", {})
+        ignored = self.get_ignored_query_params(view)
+        filters = {}
+        errors = {}
+        for param, value in request.query_params.items():
+            if param in ignored:
+                continue
+            path, lookup = self.get_lookup(param, filter_fields)
+            if path is None:
+                errors[param] = [
+                    "Unsupported filter, use one of: %s."
+                    % ", ".join(
+                        sorted(
+                            path if lookup == "exact" else "%s__%s" % (path, lookup)
+                            for path, lookups in filter_fields.items()
+                            for lookup in lookups
+                        )
+                    )
+                ]
+                continue
+            model_field = self.get_model_field(queryset.model, path)
+            try:
+                filters["%s__%s" % (path, lookup)] = self.to_python(
+                    model_field, lookup, value
+                )
+            except DjangoValidationError as error:
+                errors[param] = error.messages
+        if errors:
+            raise ValidationError(errors)
+        queryset = queryset.filter(**filters)
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering is not None:
+            queryset = queryset.order_by(*ordering)
+        return queryset
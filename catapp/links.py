@@ -0,0 +1,69 @@
+from urllib.parse import quote
+
+from rest_framework.reverse import reverse
+
+# `?links=id` or `Accept: application/json; links=id` renders hyperlinks as
+# raw primary keys, `url` (the default) as absolute URLs.
+LINKS_QUERY_PARAM = "links"
+LINK_MODES = ("url", "id")
+
+# Stands in for the lookup value when reversing a URL template.
+URL_PLACEHOLDER = "__lookup__"
+# Characters left unquoted by Django's reverse().
+URL_SAFE = "!$&'()*+,;=/~:@"
+
+
+def get_link_mode(request):
+    """
+    Return the link mode negotiated by `request`, `"url"` or `"id"`.
+    """
+    if request is None:
+        return "url"
+    try:
+        return request._link_mode
+    except AttributeError:
+        pass
+    params = getattr(request, "query_params", request.GET)
+    mode = params.get(LINKS_QUERY_PARAM)
+    if mode is None:
+        media_type = getattr(request, "accepted_media_type", None) or ""
+        for parameter in media_type.split(";")[1:]:
+            key, _, value = parameter.partition("=")
+            if key.strip() == LINKS_QUERY_PARAM:
+                mode = value.strip()
+    if mode not in LINK_MODES:
+        mode = "url"
+    request._link_mode = mode
+    return mode
+
+
+def get_url_template(view_name, lookup_url_kwarg, request, format=None):
+    """
+    Reverse `view_name` once per request and return the `(prefix, suffix)`
+    around its lookup value, so URLs are built with two concatenations.
+    """
+    key = (view_name, lookup_url_kwarg, format)
+    templates = getattr(request, "_url_templates", None)
+    if templates is None:
+        templates = {}
+        if request is not None:
+            request._url_templates = templates
+    try:
+        return templates[key]
+    except KeyError:
+        pass
+    url = reverse(
+        view_name,
+        kwargs={lookup_url_kwarg: URL_PLACEHOLDER},
+        request=request,
+        format=format,
+    )
+    prefix, _, suffix = url.partition(URL_PLACEHOLDER)
+    templates[key] = (prefix, suffix)
+    return prefix, suffix
+
+
+def build_url(template, lookup_value):
+    if not isinstance(lookup_value, int):
+        lookup_value = quote(str(lookup_value), safe=URL_SAFE)
+    return "%s%s%s" % (template[0], lookup_value, template[1])
@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catapp.benchmarks import (
+    DATASET_SIZES,
+    VIEWSETS,
+    Benchmark,
+    compare_results,
+    parse_size,
+    rolled_back,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency percentiles, query counts and peak memory of the "
+        "list, retrieve, create and token authentication of every viewset on a "
+        "generated dataset. The dataset is created in a transaction that is "
+        "rolled back. Exits with an error when the results regress on --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cats",
+            type=parse_size,
+            default="1k",
+            help="Number of cats, or one of %s." % ", ".join(DATASET_SIZES),
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--viewset", action="append", choices=list(VIEWSETS), dest="viewsets"
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--baseline", help="Compare the results to this earlier JSON output."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Tolerated relative increase of latencies and peak memory.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline["dataset"]["cats"] != options["cats"]:
+                raise CommandError(
+                    "The baseline was measured on %d cats, not %d."
+                    % (baseline["dataset"]["cats"], options["cats"])
+                )
+
+        benchmark = Benchmark(
+            options["cats"],
+            seed=options["seed"],
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            viewsets=options["viewsets"],
+        )
+        with rolled_back():
+            results = benchmark.run()
+
+        for name, result in results["scenarios"].items():
+            self.stdout.write(
+                "%-18s p50 %8.2f ms  p90 %8.2f ms  p99 %8.2f ms  %3d queries  "
+                "%8.1f KiB%s"
+                % (
+                    name,
+                    result["p50_ms"],
+                    result["p90_ms"],
+                    result["p99_ms"],
+                    result["queries"],
+                    result["peak_memory"] / 1024,
+                    "  %d errors" % result["errors"] if result["errors"] else "",
+                )
+            )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        if baseline is not None:
+            regressions = compare_results(baseline, results, options["threshold"])
+            if regressions:
+                raise CommandError(
+                    "%d regressions:\n%s" % (len(regressions), "\n".join(regressions))
+                )
+            self.stdout.write(self.style.SUCCESS("No regression."))
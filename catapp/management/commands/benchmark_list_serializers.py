@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from catapp.benchmarks import generate_dataset, rolled_back
+from catapp.compiled import get_compiled_serializer
+from catapp.querysets import get_query_plan
+from catapp.renderers import dump_row
+from catapp.serializers import (
+    BreedSerializer,
+    CatSerializer,
+    HomeSerializer,
+    HumanSerializer,
+)
+
+SERIALIZERS = (HomeSerializer, HumanSerializer, BreedSerializer, CatSerializer)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the time taken by the regular serializers and the compiled "
+        "read path to serialize the same lists, on a dataset generated like "
+        "the one of the benchmark command. The rows are created in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cats", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            generate_dataset(options["cats"])
+            self.benchmark(options["repeat"])
+
+    def time(self, function, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def benchmark(self, repeat):
+        request = Request(APIRequestFactory().get("/"))
+        for serializer_class in SERIALIZERS:
+            model = serializer_class.Meta.model
+            plan = get_query_plan(serializer_class)
+            compiled = get_compiled_serializer(serializer_class)
+
+            def regular():
+                queryset = plan.apply(model._default_manager.order_by("pk"))
+                return serializer_class(
+                    queryset, many=True, context={"request": request}
+                ).data
+
+            def fast():
+                queryset = model._default_manager.order_by("pk")
+                return compiled.serialize(compiled.get_queryset(queryset), request)
+
+            regular_time, regular_data = self.time(regular, repeat)
+            fast_time, fast_data = self.time(fast, repeat)
+            identical = dump_row(list(regular_data)) == dump_row(fast_data)
+            self.stdout.write(
+                "%-18s %6d rows  regular %8.1f ms  compiled %8.1f ms  "
+                "%5.1fx  %s"
+                % (
+                    serializer_class.__name__,
+                    len(fast_data),
+                    regular_time * 1000,
+                    fast_time * 1000,
+                    regular_time / fast_time if fast_time else 0,
+                    "identical" if identical else "DIFFERENT",
+                )
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catapp.denormalization import copy_owner_homes, get_stale_cats
+from catapp.models import Cat
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the denormalized home of every cat matches the home of its "
+        "owner. Exits with an error listing the stale cats, or repairs them "
+        "with --fix."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix", action="store_true", help="Re-copy the owner's home."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        stale = get_stale_cats().order_by("pk").values_list("pk", flat=True)
+        if not options["fix"]:
+            count = stale.count()
+            if count:
+                raise CommandError(
+                    "%d cats have a stale home, e.g. %s. Run with --fix to repair."
+                    % (count, ", ".join(str(pk) for pk in stale[:10]))
+                )
+            self.stdout.write(self.style.SUCCESS("All cat homes are consistent."))
+            return
+
+        fixed = 0
+        while True:
+            batch = list(stale[: options["batch_size"]])
+            if not batch:
+                break
+            updated = copy_owner_homes(Cat.objects.filter(pk__in=batch))
+            if not updated:
+                break
+            fixed += updated
+            self.stdout.write("Fixed %d cats" % fixed)
+        self.stdout.write(self.style.SUCCESS("Fixed %d cats." % fixed))
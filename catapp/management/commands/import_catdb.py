@@ -0,0 +1,326 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from catapp.caching import bump_model_version
+from catapp.counters import count_rows
+from catapp.models import Breed, Cat, Home, Human
+from catapp.sharding import get_shards
+
+# Import order, so that foreign keys can be resolved against rows already loaded.
+MODELS = (("breeds", Breed), ("homes", Home), ("humans", Human), ("cats", Cat))
+
+COPY_NULL = "\\N"
+
+
+def read_rows(path, file_format):
+    """
+    Yield `(line number, row dict)` for every record of a CSV or NDJSON file.
+    """
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            # Line 1 is the header.
+            yield from enumerate(csv.DictReader(source), start=2)
+            return
+        for line_number, line in enumerate(source, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+
+
+def natural_home_key(row, prefix="home_"):
+    return (row.get(prefix + "name"), row.get(prefix + "address"))
+
+
+def index_natural_keys(rows):
+    """
+    Map the natural keys of `(key, pk)` rows to their pk, or to None when
+    several rows share a key.
+    """
+    index = {}
+    for key, pk in rows:
+        index[key] = None if key in index else pk
+    return index
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import breeds, homes, humans and cats from CSV or NDJSON files. "
+        "Foreign keys are given as ids (breed_id, home_id, owner_id) or natural "
+        "keys (breed name; home_name and home_address; owner_name plus the "
+        "owner's home_name and home_address). Uses COPY on PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        for option, model in MODELS:
+            parser.add_argument(
+                "--%s" % option,
+                metavar="PATH",
+                help="File with %s rows." % model._meta.verbose_name,
+            )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "ndjson"),
+            help="File format, guessed from the file extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the files and batches already committed by an interrupted "
+            "import.",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if get_shards():
+            # Rows written here would skip the shard placement of households
+            # and the replication of breeds.
+            raise CommandError(
+                "import_catdb does not support DATABASE_SHARDS, import into an "
+                "unsharded database."
+            )
+        self.batch_size = options["batch_size"]
+        self.connection = connections[options["database"]]
+        self.using = options["database"]
+        files = [
+            (options[option], model) for option, model in MODELS if options[option]
+        ]
+        if not files:
+            raise CommandError("Nothing to import, pass at least one file.")
+        for path, model in files:
+            self.import_file(path, model, options["format"], options["resume"])
+        # Only a fully imported run forgets its progress, so resuming an
+        # interrupted one skips the files it finished.
+        for path, _ in files:
+            if os.path.exists(path + ".progress"):
+                os.remove(path + ".progress")
+
+    def get_format(self, path, file_format):
+        if file_format:
+            return file_format
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            return "csv"
+        if extension in (".ndjson", ".jsonl"):
+            return "ndjson"
+        raise CommandError("Cannot guess the format of %s, use --format." % path)
+
+    def import_file(self, path, model, file_format, resume):
+        progress_path = path + ".progress"
+        done = 0
+        if resume and os.path.exists(progress_path):
+            with open(progress_path) as progress:
+                state = json.load(progress)
+            if state.get("complete"):
+                self.stdout.write("Skipping %s, already imported" % path)
+                return
+            done = state["rows"]
+            self.stdout.write("Resuming %s after %d rows" % (path, done))
+
+        rows = islice(read_rows(path, self.get_format(path, file_format)), done, None)
+        imported = 0
+        started = time.monotonic()
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            values = self.resolve(model, batch)
+            with transaction.atomic(using=self.using):
+                self.write(model, values)
+                # COPY and bulk_create() bypass the counter signals.
+                count_rows(model, values)
+            # COPY and bulk_create() send no post_save signals.
+            bump_model_version(model)
+            done += len(batch)
+            imported += len(batch)
+            with open(progress_path, "w") as progress:
+                json.dump({"rows": done}, progress)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                "%s: %d rows, %.0f rows/s"
+                % (path, done, imported / elapsed if elapsed else imported)
+            )
+
+        with open(progress_path, "w") as progress:
+            json.dump({"rows": done, "complete": True}, progress)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Imported %d %s in %.2fs (%.0f rows/s)"
+                % (
+                    imported,
+                    model._meta.verbose_name_plural,
+                    elapsed,
+                    imported / elapsed if elapsed else imported,
+                )
+            )
+        )
+
+    def get_columns(self, model):
+        return [field for field in model._meta.concrete_fields if not field.primary_key]
+
+    def resolve(self, model, batch):
+        """
+        Resolve the foreign keys of a batch and clean every value, returning
+        one dict of column attname -> python value per row.
+        """
+        if model is Human:
+            self.resolve_homes(batch, "home_id")
+        elif model is Cat:
+            self.resolve_breeds(batch)
+            self.resolve_owners(batch)
+            self.resolve_cat_homes(batch)
+
+        now = timezone.now()
+        values = []
+        for line_number, row in batch:
+            cleaned = {}
+            for field in self.get_columns(model):
+                if getattr(field, "auto_now", False):
+                    cleaned[field.attname] = now
+                    continue
+                value = row.get(field.attname, row.get(field.name))
+                if value == "" and field.null:
+                    value = None
+                elif value is None and not field.null:
+                    value = field.get_default()
+                try:
+                    if field.is_relation:
+                        # Already resolved, clean() would query each target again.
+                        cleaned[field.attname] = field.to_python(value)
+                    else:
+                        cleaned[field.attname] = field.clean(value, None)
+                except ValidationError as error:
+                    raise CommandError(
+                        "Line %d: %s: %s" % (line_number, field.name, "; ".join(error))
+                    )
+            values.append(cleaned)
+        return values
+
+    def resolve_homes(self, batch, attname):
+        keys = {natural_home_key(row) for _, row in batch if not row.get(attname)}
+        if not keys:
+            return
+        names, addresses = zip(*keys)
+        homes = index_natural_keys(
+            ((name, address), pk)
+            for pk, name, address in Home.objects.using(self.using)
+            .filter(name__in=set(names), address__in=set(addresses))
+            .values_list("id", "name", "address")
+        )
+        for line_number, row in batch:
+            if row.get(attname):
+                continue
+            key = natural_home_key(row)
+            if key not in homes:
+                raise CommandError(
+                    "Line %d: unknown home %r at %r" % ((line_number,) + key)
+                )
+            if homes[key] is None:
+                raise CommandError(
+                    "Line %d: several homes %r at %r, use ids" % ((line_number,) + key)
+                )
+            row[attname] = homes[key]
+
+    def resolve_breeds(self, batch):
+        names = {row.get("breed") for _, row in batch if not row.get("breed_id")}
+        if not names:
+            return
+        breeds = index_natural_keys(
+            Breed.objects.using(self.using)
+            .filter(name__in=names)
+            .values_list("name", "id")
+        )
+        for line_number, row in batch:
+            if row.get("breed_id"):
+                continue
+            name = row.get("breed")
+            if name not in breeds:
+                raise CommandError("Line %d: unknown breed %r" % (line_number, name))
+            if breeds[name] is None:
+                raise CommandError(
+                    "Line %d: several breeds %r, use ids" % (line_number, name)
+                )
+            row["breed_id"] = breeds[name]
+
+    def resolve_owners(self, batch):
+        pending = [
+            (line_number, row) for line_number, row in batch if not row.get("owner_id")
+        ]
+        if not pending:
+            return
+        self.resolve_homes(pending, "owner_home_id")
+        owners = index_natural_keys(
+            ((home_id, name), pk)
+            for pk, home_id, name in Human.objects.using(self.using)
+            .filter(
+                home_id__in={row["owner_home_id"] for _, row in pending},
+                name__in={row.get("owner_name") for _, row in pending},
+            )
+            .values_list("id", "home_id", "name")
+        )
+        for line_number, row in pending:
+            key = (row["owner_home_id"], row.get("owner_name"))
+            if key not in owners:
+                raise CommandError(
+                    "Line %d: unknown owner %r" % (line_number, row.get("owner_name"))
+                )
+            if owners[key] is None:
+                raise CommandError(
+                    "Line %d: several owners %r in the home, use ids"
+                    % (line_number, row.get("owner_name"))
+                )
+            row["owner_id"] = owners[key]
+
+    def resolve_cat_homes(self, batch):
+        # Cat.home and Cat.home_name are copied from the owner.
+        homes = {
+            pk: (home_id, name)
+            for pk, home_id, name in Human.objects.using(self.using)
+            .filter(pk__in={row["owner_id"] for _, row in batch})
+            .values_list("id", "home_id", "home__name")
+        }
+        for line_number, row in batch:
+            try:
+                row["home_id"], row["home_name"] = homes[int(row["owner_id"])]
+            except (KeyError, ValueError):
+                raise CommandError(
+                    "Line %d: unknown owner %r" % (line_number, row["owner_id"])
+                )
+
+    def write(self, model, values):
+        if self.connection.vendor == "postgresql":
+            self.copy(model, values)
+        else:
+            model._default_manager.using(self.using).bulk_create(
+                [model(**row) for row in values], batch_size=self.batch_size
+            )
+
+    def copy(self, model, values):
+        columns = self.get_columns(model)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in values:
+            writer.writerow(
+                [
+                    COPY_NULL if row[field.attname] is None else row[field.attname]
+                    for field in columns
+                ]
+            )
+        buffer.seek(0)
+        quote_name = self.connection.ops.quote_name
+        sql = "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '%s')" % (
+            quote_name(model._meta.db_table),
+            ", ".join(quote_name(field.column) for field in columns),
+            COPY_NULL,
+        )
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from catapp.caching import bump_model_version
+from catapp.counters import COUNTERS, get_repair_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the cat_count and human_count counters, one batch of parent "
+        "rows at a time, and fix the ones that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for child, attname, parent, field in COUNTERS:
+            wrong = get_repair_queryset(child, attname, parent, field)
+            last = parent._default_manager.aggregate(last=Max("pk"))["last"] or 0
+            fixed = 0
+            for start in range(0, last, batch_size):
+                with transaction.atomic():
+                    by_count = defaultdict(list)
+                    for pk, actual in wrong.filter(
+                        pk__gt=start, pk__lte=start + batch_size
+                    ):
+                        by_count[actual].append(pk)
+                    now = timezone.now()
+                    for actual, pks in by_count.items():
+                        fixed += parent._default_manager.filter(pk__in=pks).update(
+                            **{field: actual, "updated_at": now}
+                        )
+            if fixed:
+                # update() sends no post_save signals.
+                bump_model_version(parent)
+            self.stdout.write(
+                "%s.%s: fixed %d rows" % (parent._meta.object_name, field, fixed)
+            )
+        self.stdout.write(self.style.SUCCESS("Counters repaired."))
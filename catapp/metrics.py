@@ -0,0 +1,299 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.functional import empty
+
+# Per-request timings of the phases of a request, sent back in a
+# `Server-Timing` header, and per-process aggregates of them, exposed in the
+# Prometheus text format on /metrics/.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_local = threading.local()
+slow_query_logger = logging.getLogger("catapp.slow_queries")
+
+
+class RequestTimings:
+    """
+    Accumulated duration and count of every phase (`auth`, `db`, `serialize`,
+    `render`, ...) of the current request. Queries taking
+    `slow_query_threshold` seconds or more are logged.
+    """
+
+    def __init__(self, request=None, slow_query_threshold=None):
+        self.request = request
+        self.slow_query_threshold = slow_query_threshold
+        self.phases = {}
+        self.active = set()
+
+    def add(self, name, duration, count=1):
+        total, number = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + duration, number + count)
+
+    def __call__(self, execute, sql, params, many, context):
+        # A connection.execute_wrapper() timing every SQL query.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.add("db", duration)
+            threshold = self.slow_query_threshold
+            if threshold is not None and duration >= threshold:
+                log_slow_query(
+                    self.request, context["connection"].alias, sql, params, duration
+                )
+
+
+def get_user_id(request):
+    # Only a user already loaded is reported, looking it up would run a query.
+    user = getattr(request, "user", None)
+    if getattr(user, "_wrapped", None) is empty:
+        return None
+    return getattr(user, "pk", None)
+
+
+def log_slow_query(request, database, sql, params, duration):
+    record = {
+        "duration": round(duration, 6),
+        "database": database,
+        "sql": sql,
+        "params": list(params) if isinstance(params, tuple) else params,
+        "endpoint": get_endpoint(request) if request is not None else None,
+        "method": getattr(request, "method", None),
+        "user": get_user_id(request),
+    }
+    slow_query_logger.warning(
+        json.dumps(record, default=str), extra={"slow_query": record}
+    )
+
+
+def get_request_timings():
+    return getattr(_local, "timings", None)
+
+
+@contextmanager
+def timing(name):
+    """
+    Add the time spent in the block to the `name` phase of the current
+    request. Nested blocks of the same phase are only counted once.
+    """
+    timings = get_request_timings()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings.add(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """
+    Decorate a function so its calls count towards the `name` phase.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with timing(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def format_server_timing(phases, total):
+    entries = []
+    for name, (duration, count) in sorted(phases.items()):
+        entry = "%s;dur=%.3f" % (name, duration * 1000)
+        if name == "db":
+            entry += ';desc="%d queries"' % count
+        entries.append(entry)
+    entries.append("total;dur=%.3f" % (total * 1000))
+    return ", ".join(entries)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Request latency histograms and phase totals per endpoint and method.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.latency = {}
+        self.requests = {}
+        self.phase_seconds = {}
+        self.db_queries = {}
+
+    def observe(self, endpoint, method, status, total, phases):
+        key = (endpoint, method)
+        with self.lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(self.buckets)
+            histogram.observe(total)
+            requests_key = key + (str(status),)
+            self.requests[requests_key] = self.requests.get(requests_key, 0) + 1
+            for name, (duration, count) in phases.items():
+                phase_key = key + (name,)
+                self.phase_seconds[phase_key] = (
+                    self.phase_seconds.get(phase_key, 0.0) + duration
+                )
+                if name == "db":
+                    self.db_queries[key] = self.db_queries.get(key, 0) + count
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def labels(**values):
+            return ",".join(
+                '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                for name, value in sorted(values.items())
+            )
+
+        with self.lock:
+            lines.append(
+                "# HELP catapp_request_duration_seconds Request latency per endpoint."
+            )
+            lines.append("# TYPE catapp_request_duration_seconds histogram")
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                cumulative = 0
+                bounds = [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        "catapp_request_duration_seconds_bucket{%s} %d"
+                        % (
+                            labels(endpoint=endpoint, method=method, le=bound),
+                            cumulative,
+                        )
+                    )
+                lines.append(
+                    "catapp_request_duration_seconds_sum{%s} %r"
+                    % (labels(endpoint=endpoint, method=method), histogram.sum)
+                )
+                lines.append(
+                    "catapp_request_duration_seconds_count{%s} %d"
+                    % (labels(endpoint=endpoint, method=method), cumulative)
+                )
+
+            lines.append(
+                "# HELP catapp_requests_total Requests per endpoint and status."
+            )
+            lines.append("# TYPE catapp_requests_total counter")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    "catapp_requests_total{%s} %d"
+                    % (labels(endpoint=endpoint, method=method, status=status), count)
+                )
+
+            lines.append(
+                "# HELP catapp_request_phase_seconds_total Time spent per request "
+                "phase (auth, db, serialize, render, view)."
+            )
+            lines.append("# TYPE catapp_request_phase_seconds_total counter")
+            for (endpoint, method, phase), seconds in sorted(
+                self.phase_seconds.items()
+            ):
+                lines.append(
+                    "catapp_request_phase_seconds_total{%s} %r"
+                    % (labels(endpoint=endpoint, method=method, phase=phase), seconds)
+                )
+
+            lines.append("# HELP catapp_db_queries_total SQL queries per endpoint.")
+            lines.append("# TYPE catapp_db_queries_total counter")
+            for (endpoint, method), count in sorted(self.db_queries.items()):
+                lines.append(
+                    "catapp_db_queries_total{%s} %d"
+                    % (labels(endpoint=endpoint, method=method), count)
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def get_endpoint(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.url_name or "unnamed"
+
+
+class ServerTimingMiddleware:
+    """
+    Time every request and its SQL queries, add a `Server-Timing` header and
+    record the timings in `registry`. Disabled by `PERFORMANCE_METRICS = False`.
+    Streamed content is sent after the timings are taken.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "PERFORMANCE_METRICS", True):
+            return self.get_response(request)
+        timings = _local.timings = RequestTimings(
+            request, getattr(settings, "SLOW_QUERY_THRESHOLD", None)
+        )
+        start = time.perf_counter()
+        wrappers = [
+            connection.execute_wrapper(timings) for connection in connections.all()
+        ]
+        try:
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+            _local.timings = None
+        total = time.perf_counter() - start
+        response["Server-Timing"] = format_server_timing(timings.phases, total)
+        registry.observe(
+            get_endpoint(request),
+            request.method,
+            response.status_code,
+            total,
+            timings.phases,
+        )
+        return response
+
+
+def metrics_view(request):
+    """
+    The aggregated request metrics of this process, in the Prometheus format.
+    """
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catapp', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['date_of_birth'], name='cat_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['breed', 'date_of_birth'], name='cat_breed_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['owner', 'date_of_birth'], name='cat_owner_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cat',
+            index=models.Index(fields=['gender', 'date_of_birth'], name='cat_gender_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='home',
+            index=models.Index(fields=['type'], name='home_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='human',
+            index=models.Index(fields=['date_of_birth'], name='human_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='human',
+            index=models.Index(fields=['home', 'date_of_birth'], name='human_home_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='human',
+            index=models.Index(fields=['gender', 'date_of_birth'], name='human_gender_dob_idx'),
+        ),
+    ]
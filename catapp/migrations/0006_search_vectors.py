@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# table -> (weight A column, weight B column)
+SEARCH_COLUMNS = {
+    "catapp_home": ("name", "address"),
+    "catapp_human": ("name", "description"),
+    "catapp_breed": ("name", "description"),
+    "catapp_cat": ("name", "description"),
+}
+
+CREATE_SQL = """
+ALTER TABLE {table} ADD COLUMN search_vector tsvector;
+CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.{a}, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.{b}, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER {table}_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF {a}, {b} ON {table}
+    FOR EACH ROW EXECUTE PROCEDURE {table}_search_vector_update();
+UPDATE {table} SET search_vector =
+    setweight(to_tsvector('pg_catalog.english', coalesce({a}, '')), 'A') ||
+    setweight(to_tsvector('pg_catalog.english', coalesce({b}, '')), 'B');
+CREATE INDEX {table}_search_vector_idx ON {table} USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table};
+DROP FUNCTION IF EXISTS {table}_search_vector_update();
+ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def create_search_vectors(apps, schema_editor):
+    # The search vectors only exist on PostgreSQL, see catapp.search.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, (a, b) in SEARCH_COLUMNS.items():
+        schema_editor.execute(CREATE_SQL.format(table=table, a=a, b=b))
+
+
+def drop_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in SEARCH_COLUMNS:
+        schema_editor.execute(DROP_SQL.format(table=table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("catapp", "0005_list_filter_indexes")]
+
+    operations = [migrations.RunPython(create_search_vectors, drop_search_vectors)]
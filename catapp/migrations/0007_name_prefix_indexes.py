@@ -0,0 +1,53 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+NAME_TABLES = ('catapp_home', 'catapp_human', 'catapp_breed')
+
+
+def create_name_search_indexes(apps, schema_editor):
+    # istartswith() compiles to UPPER(name) LIKE UPPER('prefix%') and fuzzy
+    # matching uses the pg_trgm operators, see catapp.mixins.AutocompleteMixin.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in NAME_TABLES:
+        schema_editor.execute(
+            'CREATE INDEX {0}_name_prefix_idx ON {0} '
+            '(UPPER(name::text) text_pattern_ops)'.format(table)
+        )
+        schema_editor.execute(
+            'CREATE INDEX {0}_name_trgm_idx ON {0} '
+            'USING gin (name gin_trgm_ops)'.format(table)
+        )
+
+
+def drop_name_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in NAME_TABLES:
+        schema_editor.execute('DROP INDEX IF EXISTS {0}_name_prefix_idx'.format(table))
+        schema_editor.execute('DROP INDEX IF EXISTS {0}_name_trgm_idx'.format(table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catapp', '0006_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='breed',
+            index=models.Index(fields=['name'], name='breed_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='home',
+            index=models.Index(fields=['name'], name='home_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='human',
+            index=models.Index(fields=['name'], name='human_name_idx'),
+        ),
+        migrations.RunPython(create_name_search_indexes, drop_name_search_indexes),
+    ]
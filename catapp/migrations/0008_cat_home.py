@@ -0,0 +1,61 @@
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 10000
+
+
+def backfill_cat_homes(apps, schema_editor):
+    Cat = apps.get_model("catapp", "Cat")
+    Human = apps.get_model("catapp", "Human")
+    cats = Cat.objects.using(schema_editor.connection.alias)
+    owner = Human.objects.filter(pk=OuterRef("owner"))
+    last = cats.aggregate(last=Max("pk"))["last"] or 0
+    # One bounded UPDATE per batch of primary keys.
+    for start in range(0, last, BATCH_SIZE):
+        cats.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(
+            home=Subquery(owner.values("home")[:1]),
+            home_name=Subquery(owner.values("home__name")[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("catapp", "0007_name_prefix_indexes")]
+
+    operations = [
+        migrations.AddField(
+            model_name="cat",
+            name="home",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="cats",
+                to="catapp.Home",
+            ),
+        ),
+        migrations.AddField(
+            model_name="cat",
+            name="home_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_cat_homes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="cat",
+            name="home",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="cats",
+                to="catapp.Home",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cat",
+            index=models.Index(
+                fields=["home", "date_of_birth"], name="cat_home_dob_idx"
+            ),
+        ),
+    ]
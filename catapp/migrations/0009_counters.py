@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 10000
+
+# (parent model, counter field, child model, foreign key)
+COUNTERS = (
+    ("Breed", "cat_count", "Cat", "breed"),
+    ("Human", "cat_count", "Cat", "owner"),
+    ("Home", "human_count", "Human", "home"),
+)
+
+
+def backfill_counters(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    for parent_name, field, child_name, foreign_key in COUNTERS:
+        parent = apps.get_model("catapp", parent_name)
+        child = apps.get_model("catapp", child_name)
+        counts = (
+            child.objects.filter(**{foreign_key: OuterRef("pk")})
+            .order_by()
+            .values(foreign_key)
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        rows = parent.objects.using(alias)
+        last = rows.aggregate(last=Max("pk"))["last"] or 0
+        # One bounded UPDATE per batch of primary keys.
+        for start in range(0, last, BATCH_SIZE):
+            rows.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(
+                **{field: Coalesce(Subquery(counts, output_field=IntegerField()), 0)}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("catapp", "0008_cat_home")]
+
+    operations = [
+        migrations.AddField(
+            model_name="breed",
+            name="cat_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="home",
+            name="human_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="human",
+            name="cat_count",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
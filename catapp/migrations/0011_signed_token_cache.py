@@ -0,0 +1,17 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # The database caches of settings.CACHES, e.g. the shared revocation list
+    # of signed tokens.
+    call_command(
+        "createcachetable", database=schema_editor.connection.alias, verbosity=0
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("catapp", "0010_id_sequence")]
+
+    operations = [migrations.RunPython(create_cache_tables, migrations.RunPython.noop)]
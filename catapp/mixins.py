@@ -0,0 +1,582 @@
+import hashlib
+from collections.abc import Mapping
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.models import Count, Max
+from django.db.models.expressions import RawSQL
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .caching import (
+    get_cache,
+    get_model_dependencies,
+    get_model_versions,
+    get_response_cache_key,
+)
+from .compiled import get_compiled_serializer
+from .counters import batched_counters
+from .metrics import timing
+from .querysets import (
+    get_field_names,
+    get_query_plan,
+    has_updated_at,
+    iterate_in_chunks,
+)
+from .renderers import NDJSONRenderer, dump_row
+from .replicas import (
+    get_read_database,
+    mark_unavailable,
+    pin_to_primary,
+    set_current_database,
+)
+from .serializers import get_sparse_fieldset
+from .sharding import aggregate_across_shards, get_shards
+from .timeouts import statement_timeout
+
+AUTOCOMPLETE_KEY = "catapp:autocomplete:%s"
+
+
+class ServerTimingMixin:
+    """
+    Report the time spent in the view, rendering aside, as the `view` phase
+    of the `Server-Timing` header (see catapp.metrics).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with timing("view"):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """
+    Serve `list` and `retrieve`, token lookups included, from a read replica
+    (see catapp.replicas). Successful writes keep the client on the primary
+    for a while, and a replica failing mid-request is retried on the primary.
+    """
+
+    replica_actions = ("list", "retrieve")
+    read_database = DEFAULT_DB_ALIAS
+
+    def initial(self, request, *args, **kwargs):
+        if self.action in self.replica_actions:
+            self.read_database = get_read_database(request)
+        set_current_database(self.read_database)
+        super().initial(request, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            set_current_database(None)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.read_database == DEFAULT_DB_ALIAS:
+            return queryset
+        # Bound explicitly, as streamed responses are read after the request.
+        return queryset.using(self.read_database)
+
+    def list(self, request, *args, **kwargs):
+        return self.read_with_fallback(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.read_with_fallback(super().retrieve, request, *args, **kwargs)
+
+    def read_with_fallback(self, action, request, *args, **kwargs):
+        try:
+            return action(request, *args, **kwargs)
+        except DatabaseError:
+            if self.read_database == DEFAULT_DB_ALIAS:
+                raise
+        mark_unavailable(self.read_database)
+        self.read_database = DEFAULT_DB_ALIAS
+        set_current_database(DEFAULT_DB_ALIAS)
+        return action(request, *args, **kwargs)
+
+
+class StatementTimeoutMixin:
+    """
+    Bound the time the action's SQL statements may take (see
+    catapp.timeouts), answering 503 when it is exceeded. The limit in seconds
+    comes from `statement_timeouts[action]`, then `statement_timeout`, then
+    the `STATEMENT_TIMEOUT` setting; None disables it. Streamed rows are
+    fetched after the action returns and are not bounded.
+    """
+
+    statement_timeout = None
+    statement_timeouts = {}
+
+    def get_statement_timeout(self):
+        timeout = self.statement_timeouts.get(self.action, self.statement_timeout)
+        if timeout is None:
+            timeout = getattr(settings, "STATEMENT_TIMEOUT", None)
+        return timeout
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timeout = self.get_statement_timeout()
+        method = request.method.lower()
+        handler = getattr(self, method, None)
+        if not timeout or handler is None:
+            return
+
+        def bounded_handler(*args, **kwargs):
+            with statement_timeout(timeout):
+                return handler(*args, **kwargs)
+
+        # dispatch() looks the handler up after initial().
+        setattr(self, method, bounded_handler)
+
+
+class QueryPlanMixin:
+    """
+    Apply the `select_related`/`prefetch_related`/`only()` plan derived from
+    the viewset's serializer, so list actions run in a constant number of queries.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        # Sparse fieldsets also drop the columns and joins of unused fields.
+        field_names = get_sparse_fieldset(
+            self.request, get_field_names(serializer_class)
+        )
+        plan = get_query_plan(serializer_class, field_names)
+        # Column pruning is only safe when the instances are not saved back.
+        return plan.apply(
+            queryset, restrict_columns=self.request.method in SAFE_METHODS
+        )
+
+
+class StreamingListMixin:
+    """
+    Stream list actions row by row when asked for with `?stream=1` (a JSON
+    array), `?stream=ndjson` or `Accept: application/x-ndjson`.
+    """
+
+    stream_query_param = "stream"
+    stream_chunk_size = 2000
+
+    def get_stream_format(self, request):
+        if isinstance(request.accepted_renderer, NDJSONRenderer):
+            return "ndjson"
+        value = request.query_params.get(self.stream_query_param, "").lower()
+        if value == "ndjson":
+            return "ndjson"
+        if value in ("1", "true", "json"):
+            return "json"
+        return None
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if stream_format == "ndjson":
+            content, content_type = self.stream_ndjson(queryset), "application/x-ndjson"
+        else:
+            content, content_type = self.stream_json(queryset), "application/json"
+        return StreamingHttpResponse(content, content_type=content_type)
+
+    def stream_rows(self, queryset):
+        # One serializer is reused for every row instead of one per instance.
+        serializer = self.get_serializer()
+        for instance in iterate_in_chunks(queryset, self.stream_chunk_size):
+            yield dump_row(serializer.to_representation(instance))
+
+    def stream_ndjson(self, queryset):
+        for row in self.stream_rows(queryset):
+            yield row + b"\n"
+
+    def stream_json(self, queryset):
+        separator = b"["
+        for row in self.stream_rows(queryset):
+            yield separator + row
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+
+class CompiledListMixin:
+    """
+    Serve list actions through the compiled read path of `catapp.compiled`
+    when the `COMPILED_LIST_SERIALIZERS` setting is on. Rows are read with
+    `values()` and rendered without serializer instances; the response is the
+    same. Serializers with fields that cannot be compiled use the regular path.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, "COMPILED_LIST_SERIALIZERS", False):
+            return super().list(request, *args, **kwargs)
+        serializer_class = self.get_serializer_class()
+        compiled = get_compiled_serializer(
+            serializer_class,
+            get_sparse_fieldset(request, get_field_names(serializer_class)),
+        )
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        if paginator is not None and paginator.is_requested(request):
+            # The cursor is read from the ordering columns of the last row.
+            ordering = paginator.get_ordering(request, queryset, self)
+            rows = paginator.paginate_queryset(
+                compiled.get_queryset(
+                    queryset, [column.lstrip("-") for column in ordering]
+                ),
+                request,
+                view=self,
+            )
+            return paginator.get_paginated_response(
+                compiled.serialize(rows, request, self.format_kwarg)
+            )
+        return Response(
+            compiled.serialize(
+                compiled.get_queryset(queryset), request, self.format_kwarg
+            )
+        )
+
+
+class BulkModelMixin:
+    """
+    Accept list payloads on the list route: `POST` creates, `PUT`/`PATCH`
+    update the rows named by each item's `id`, and `DELETE` takes a list of ids.
+    Every bulk request runs in a single transaction.
+    """
+
+    bulk_max_size = 10000
+
+    def check_bulk_size(self, data):
+        if len(data) > self.bulk_max_size:
+            raise ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "At most %d items can be sent at once." % self.bulk_max_size
+                    ]
+                }
+            )
+
+    def get_bulk_ids(self, items):
+        ids = []
+        for item in items:
+            value = item.get("id") if isinstance(item, Mapping) else item
+            try:
+                ids.append(int(value))
+            except (TypeError, ValueError):
+                raise ValidationError({"id": ["Every item needs a valid id."]})
+        return ids
+
+    def get_bulk_objects(self, ids):
+        objects = self.filter_queryset(self.get_queryset()).in_bulk(ids)
+        missing = sorted(set(ids) - set(objects))
+        if missing:
+            raise ValidationError(
+                {"id": ["Objects not found: %s." % ", ".join(map(str, missing))]}
+            )
+        return [objects[pk] for pk in ids]
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        self.check_bulk_size(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        if not isinstance(request.data, list):
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Expected a list of items."]}
+            )
+        self.check_bulk_size(request.data)
+        instances = self.get_bulk_objects(self.get_bulk_ids(request.data))
+        serializer = self.get_serializer(
+            instances, data=request.data, many=True, partial=partial
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
+    def partial_bulk_update(self, request, *args, **kwargs):
+        kwargs["partial"] = True
+        return self.bulk_update(request, *args, **kwargs)
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Expected a list of ids."]}
+            )
+        self.check_bulk_size(request.data)
+        ids = self.get_bulk_ids(request.data)
+        with transaction.atomic(), batched_counters():
+            self.get_bulk_objects(ids)
+            self.get_queryset().model._default_manager.filter(pk__in=ids).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ResponseCacheMixin:
+    """
+    Cache rendered `list` and `retrieve` responses. Entries are keyed on the
+    versions of every model the serializer reads, which are bumped on writes,
+    so stale entries are never served and simply expire.
+    """
+
+    # The browsable API renders the current user, so only cache these formats.
+    # NDJSON lists are streamed (see StreamingListMixin) and never cached, so
+    # "ndjson" only covers retrieve responses.
+    response_cache_formats = ("json", "ndjson")
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, action, request, *args, **kwargs):
+        if request.accepted_renderer.format not in self.response_cache_formats:
+            return action(request, *args, **kwargs)
+        cache = get_cache()
+        key = get_response_cache_key(
+            request, get_model_dependencies(self.get_serializer_class())
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, validators = cached
+            response = HttpResponse(content, content_type=content_type)
+            for header, value in validators.items():
+                response[header] = value
+            # The cached validators are as fresh as the cached content.
+            return get_conditional_response(
+                request,
+                etag=validators.get("ETag"),
+                last_modified=parse_http_date_safe(validators.get("Last-Modified")),
+                response=response,
+            )
+
+        response = action(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and not response.streaming:
+            timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+            def store(rendered):
+                validators = {
+                    header: rendered[header]
+                    for header in ("ETag", "Last-Modified")
+                    if header in rendered
+                }
+                cache.set(
+                    key,
+                    (rendered.content, rendered["Content-Type"], validators),
+                    timeout,
+                )
+
+            response.add_post_render_callback(store)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified on `list` and `retrieve`. The validators come from a
+    single aggregate query over the `updated_at` columns of every row the
+    response would show (and the number of those rows), so a `304 Not Modified`
+    never loads or serializes the payload. Paginated lists are not validated.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if getattr(self.paginator, "is_requested", lambda request: False)(request):
+            # Keyset pages stay free of COUNT(*) and full-table aggregates.
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(super().get_queryset())
+        return self.conditional_response(
+            queryset, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(super().get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional_response(
+            queryset, super().retrieve, request, *args, **kwargs
+        )
+
+    def get_validators(self, queryset):
+        """
+        Return the `(etag, last_modified)` of the response for `queryset`, or
+        `(None, None)` when it is empty.
+        """
+        aggregates = {"count": Count("pk", distinct=True)}
+        if has_updated_at(queryset.model):
+            aggregates["updated_at"] = Max("updated_at")
+        local = set(aggregates)
+        joins_shards = False
+        plan = get_query_plan(self.get_serializer_class())
+        for index, (lookup, model, many) in enumerate(plan.get_related_paths()):
+            joins_shards = joins_shards or getattr(model, "sharded", False)
+            if has_updated_at(model):
+                aggregates["updated_at_%d" % index] = Max(lookup + "__updated_at")
+            if many:
+                aggregates["count_%d" % index] = Count(lookup, distinct=True)
+        queryset = queryset.order_by()
+        if (
+            joins_shards
+            and get_shards()
+            and not getattr(queryset.model, "sharded", False)
+        ):
+            # The rows of a reference table only join the sharded rows of the
+            # database they are read from.
+            values = aggregate_across_shards(queryset, aggregates, local)
+        else:
+            values = queryset.aggregate(**aggregates)
+        if not values["count"]:
+            return None, None
+
+        timestamps = [value for value in values.values() if isinstance(value, datetime)]
+        last_modified = max(timestamps).timestamp() if timestamps else None
+        validator = "%s|%s|%s|%r" % (
+            # Links are absolute, so responses differ per scheme and host.
+            self.request.build_absolute_uri(),
+            self.request.accepted_renderer.format,
+            self.request.accepted_media_type,
+            sorted(values.items()),
+        )
+        return hashlib.md5(validator.encode("utf-8")).hexdigest(), last_modified
+
+    def conditional_response(self, queryset, action, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(queryset)
+        if etag is None:
+            return action(request, *args, **kwargs)
+
+        validators = HttpResponse()
+        validators["ETag"] = quote_etag(etag)
+        if last_modified is not None:
+            last_modified = int(last_modified)
+            validators["Last-Modified"] = http_date(last_modified)
+        not_modified = get_conditional_response(
+            request,
+            etag=validators["ETag"],
+            last_modified=last_modified,
+            response=validators,
+        )
+        if not_modified is not validators:
+            return not_modified
+
+        response = action(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and not response.streaming:
+            for header in ("ETag", "Last-Modified"):
+                if header in validators:
+                    response[header] = validators[header]
+        return response
+
+
+class AutocompleteMixin:
+    """
+    Add `GET <list url>/autocomplete/?q=` returning the `id`, `name` and `url`
+    of the rows whose name starts with `q`, or resembles it with `fuzzy=1`.
+
+    Prefix lookups use the `UPPER(name)` pattern index on PostgreSQL and fuzzy
+    ones the trigram index (migration 0007). Hot prefixes are cached briefly,
+    keyed on the model version so writes show up at once.
+    """
+
+    autocomplete_field = "name"
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
+    # Fuzzy matches need at least this pg_trgm similarity.
+    autocomplete_similarity = 0.3
+
+    @action(detail=False, methods=["get"], url_path="autocomplete")
+    def autocomplete(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": ["This query parameter is required."]})
+        fuzzy = request.query_params.get("fuzzy") in ("1", "true")
+        limit = self.get_autocomplete_limit(request)
+        model = self.queryset.model
+
+        cache = get_cache()
+        key = (
+            AUTOCOMPLETE_KEY
+            % hashlib.md5(
+                (
+                    "%s|%s|%s|%d|%s"
+                    % (
+                        model._meta.label_lower,
+                        query.upper(),
+                        fuzzy,
+                        limit,
+                        get_model_versions([model])[0],
+                    )
+                ).encode("utf-8")
+            ).hexdigest()
+        )
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(
+                self.get_autocomplete_queryset(query, fuzzy).values_list(
+                    "pk", self.autocomplete_field
+                )[:limit]
+            )
+            cache.set(key, rows, getattr(settings, "AUTOCOMPLETE_CACHE_TIMEOUT", 30))
+
+        url_name = "%s-detail" % model._meta.model_name
+        return Response(
+            [
+                {
+                    "id": pk,
+                    "name": name,
+                    "url": request.build_absolute_uri(reverse(url_name, args=(pk,))),
+                }
+                for pk, name in rows
+            ]
+        )
+
+    def get_autocomplete_limit(self, request):
+        try:
+            limit = int(request.query_params.get("limit", self.autocomplete_limit))
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+        return max(1, min(limit, self.autocomplete_max_limit))
+
+    def get_autocomplete_queryset(self, query, fuzzy):
+        queryset = self.queryset.all()
+        field = self.autocomplete_field
+        if not fuzzy:
+            return queryset.filter(**{"%s__istartswith" % field: query}).order_by(
+                field, "pk"
+            )
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.filter(**{"%s__icontains" % field: query}).order_by(
+                field, "pk"
+            )
+        column = "%s.%s" % (
+            queryset.model._meta.db_table,
+            queryset.model._meta.get_field(field).column,
+        )
+        return (
+            queryset.annotate(
+                similarity=RawSQL("similarity(%s, %%s)" % column, [query])
+            )
+            # `%` is the indexable pg_trgm similarity operator.
+            .extra(where=["%s %%%% %%s" % column], params=[query])
+            .filter(similarity__gte=self.autocomplete_similarity)
+            .order_by("-similarity", field, "pk")
+        )
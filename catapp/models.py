@@ -1,12 +1,76 @@
 from django.db import models
 
+from .sharding import ShardedQuerySet, allocate_ids, get_shards
+
 # Create your models here.
 MALE = "M"
 FEMALE = "F"
 GENDER_CHOICES = ((MALE, "Male"), (FEMALE, "Female"))
 
 
-class Home(models.Model):
+class CountedModel(models.Model):
+    """
+    A model with counter columns, listed in `counter_fields`. They are only
+    written with atomic `F()` updates (see catapp.counters), so `save()` never
+    writes back the possibly stale counts of an existing instance.
+    """
+
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class ShardedModel(models.Model):
+    """
+    A model whose rows live on the shard of their home when `DATABASE_SHARDS`
+    is set (see catapp.sharding). New rows then take their primary key from a
+    sequence shared by every shard.
+    """
+
+    sharded = True
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def get_home_id(self):
+        raise NotImplementedError
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and get_shards():
+            self.pk = allocate_ids(type(self), 1)[0]
+            kwargs.setdefault("force_insert", True)
+        super().save(*args, **kwargs)
+
+
+class IdSequence(models.Model):
+    """
+    The last primary key handed out for a sharded model.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+
+
+class Home(ShardedModel, CountedModel):
     LANDED = "LANDED"
     CONDO = "CONDO"
     HOME_CHOICES = ((LANDED, "Landed"), (CONDO, "Condominium"))
@@ -14,38 +78,107 @@ class Home(models.Model):
     name = models.CharField(max_length=255)
     address = models.CharField(max_length=255)
     type = models.CharField(choices=HOME_CHOICES, default=LANDED, max_length=100)
+    # Maintained by catapp.counters.
+    human_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    counter_fields = ("human_count",)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["type"], name="home_type_idx"),
+            models.Index(fields=["name"], name="home_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_home_id(self):
+        return self.pk
+
 
-class Human(models.Model):
+class Human(ShardedModel, CountedModel):
     name = models.CharField(max_length=255)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     date_of_birth = models.DateField(null=True, blank=True)
     description = models.TextField(blank=True)
     home = models.ForeignKey(Home, related_name="humans", on_delete=models.CASCADE)
+    # Maintained by catapp.counters.
+    cat_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    counter_fields = ("cat_count",)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_of_birth"], name="human_dob_idx"),
+            models.Index(fields=["home", "date_of_birth"], name="human_home_dob_idx"),
+            models.Index(
+                fields=["gender", "date_of_birth"], name="human_gender_dob_idx"
+            ),
+            models.Index(fields=["name"], name="human_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_home_id(self):
+        return self.home_id
+
 
-class Breed(models.Model):
+class Breed(CountedModel):
     name = models.CharField(max_length=255)
     origin = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    # Maintained by catapp.counters.
+    cat_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    counter_fields = ("cat_count",)
+
+    class Meta:
+        indexes = [models.Index(fields=["name"], name="breed_name_idx")]
 
     def __str__(self):
         return self.name
 
 
-class Cat(models.Model):
+class Cat(ShardedModel):
     name = models.CharField(max_length=255)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     date_of_birth = models.DateField(null=True, blank=True)
     description = models.TextField(blank=True)
     breed = models.ForeignKey(Breed, related_name="cats", on_delete=models.CASCADE)
     owner = models.ForeignKey(Human, related_name="cats", on_delete=models.CASCADE)
+    # Copied from `owner.home`, see catapp.denormalization.
+    home = models.ForeignKey(
+        Home, related_name="cats", on_delete=models.CASCADE, editable=False
+    )
+    home_name = models.CharField(max_length=255, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_of_birth"], name="cat_dob_idx"),
+            models.Index(fields=["breed", "date_of_birth"], name="cat_breed_dob_idx"),
+            models.Index(fields=["owner", "date_of_birth"], name="cat_owner_dob_idx"),
+            models.Index(fields=["home", "date_of_birth"], name="cat_home_dob_idx"),
+            models.Index(fields=["gender", "date_of_birth"], name="cat_gender_dob_idx"),
+        ]
 
     def __str__(self):
         return self.name
+
+    def get_home_id(self):
+        if self.home_id is not None:
+            return self.home_id
+        owner_field = self._meta.get_field("owner")
+        if owner_field.is_cached(self):
+            return self.owner.home_id
+        if self.owner_id is None:
+            return None
+        return (
+            Human.objects.filter(pk=self.owner_id)
+            .values_list("home_id", flat=True)
+            .first()
+        )
@@ -0,0 +1,210 @@
+import binascii
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlencode
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    LimitOffsetPagination,
+    _reverse_ordering,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .querysets import get_keyset_filter
+
+
+def get_indexed_fields(model):
+    """
+    Map the names of the indexed columns of `model` to their attribute names.
+    """
+    names = {index.fields[0].lstrip("-") for index in model._meta.indexes}
+    indexed = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.unique or field.db_index or field.name in names:
+            indexed[field.name] = field.attname
+            indexed[field.attname] = field.attname
+    return indexed
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Opt-in cursor pagination keyed on `id` or any indexed column.
+
+    Lists are only paginated when the client sends a `cursor` or `page_size`
+    parameter. Rows are ordered on the column then the primary key, and pages
+    are fetched with `WHERE (<column>, id) > (<value>, <id>)` from the last row
+    of the previous page, so ties are paged through without an `OFFSET`, deep
+    pages cost the same as the first one and no `COUNT(*)` is ever issued.
+    Null values of a nullable column sort where the database puts them: last
+    on PostgreSQL, first on SQLite.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "id"
+    ordering_query_param = "ordering"
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = self.cursor.reverse, self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    get_keyset_filter(queryset, self.ordering, position, reverse)
+                )
+            except (TypeError, ValueError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One more row tells whether there is a page after this one.
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_query_param, self.ordering)
+        descending = ordering.startswith("-")
+        name = ordering.lstrip("-")
+        indexed = get_indexed_fields(queryset.model)
+        if name not in indexed:
+            raise ValidationError(
+                {
+                    self.ordering_query_param: [
+                        "Ordering must be one of the indexed fields: %s."
+                        % ", ".join(sorted(indexed))
+                    ]
+                }
+            )
+        prefix = "-" if descending else ""
+        pk_name = queryset.model._meta.pk.attname
+        if indexed[name] == pk_name:
+            return (prefix + pk_name,)
+        # Break ties on the primary key so the row order is total.
+        return (prefix + indexed[name], prefix + pk_name)
+
+    def get_position(self, row):
+        position = []
+        for name in self.ordering:
+            name = name.lstrip("-")
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(None if value is None else str(value))
+        return tuple(position)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1]))
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.get_position(self.page[0]))
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+            nulls = {int(index) for index in tokens.get("n", [])}
+            position = tuple(
+                None if index in nulls else value
+                for index, value in enumerate(tokens["p"])
+            )
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": ["" if value is None else value for value in cursor.position]}
+        nulls = [
+            str(index) for index, value in enumerate(cursor.position) if value is None
+        ]
+        if nulls:
+            tokens["n"] = nulls
+        if cursor.reverse:
+            tokens["r"] = "1"
+        querystring = urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class SearchPagination(LimitOffsetPagination):
+    """
+    `limit`/`offset` pagination for search results.
+
+    Results come ranked from several tables, so there is no keyset to page on
+    and no cheap total: `next` is only given when one more result exists, and
+    `offset` is capped to keep every page bounded.
+    """
+
+    default_limit = 20
+    max_limit = 100
+    max_offset = 1000
+
+    def paginate_results(self, search, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = min(self.get_offset(request), self.max_offset)
+        results = search(self.offset, self.limit)
+        self.has_next = len(results) > self.limit
+        return results[: self.limit]
+
+    def get_next_link(self):
+        if not self.has_next or self.offset + self.limit > self.max_offset:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
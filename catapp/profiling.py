@@ -0,0 +1,208 @@
+import cProfile
+import pstats
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+# On-demand profiling of a single request: staff users add `?_profile=cprofile`
+# or `?_profile=sql` to any catapp endpoint and get a JSON report back instead
+# of the response body.
+
+PROFILE_QUERY_PARAM = "_profile"
+PROFILE_MODES = ("cprofile", "sql")
+
+
+class QueryLog:
+    """
+    `connection.execute_wrapper()` recording every SQL statement it runs.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "database": self.alias,
+                    "sql": sql,
+                    "params": params,
+                    "many": many,
+                    "duration": time.perf_counter() - start,
+                }
+            )
+
+
+def explain(query):
+    """
+    Return the plan of a logged SELECT as a list of rows, None for other
+    statements.
+    """
+    if query["many"] or not query["sql"].lstrip().upper().startswith("SELECT"):
+        return None
+    connection = connections[query["database"]]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "%s %s" % (connection.ops.explain_query_prefix(), query["sql"]),
+                query["params"],
+            )
+            return [[str(value) for value in row] for row in cursor.fetchall()]
+    except DatabaseError as error:
+        return ["EXPLAIN failed: %s" % error]
+
+
+def get_hotspots(profiler, limit):
+    stats = pstats.Stats(profiler)
+    # Sorted on the time spent in the function itself.
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    rows = rows[:limit]
+    hotspots = []
+    for function, (primitive_calls, calls, total_time, cumulative_time, _) in rows:
+        hotspots.append(
+            {
+                "function": "%s:%d(%s)" % function,
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "total_time": total_time,
+                "cumulative_time": cumulative_time,
+            }
+        )
+    return hotspots
+
+
+def get_allocations(snapshot, limit):
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        )
+    )
+    return [
+        {
+            "location": "%s:%d"
+            % (stat.traceback[0].filename, stat.traceback[0].lineno),
+            "size": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def get_profiling_user(request, view_func):
+    """
+    Authenticate `request` the way `view_func` will, before the view runs.
+    """
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return request.user
+    user = request.user
+    authenticators = [auth() for auth in view_class.authentication_classes]
+    try:
+        return Request(request, authenticators=authenticators).user
+    except APIException:
+        return None
+    finally:
+        # DRF copies the user it authenticated onto the Django request.
+        request.user = user
+
+
+def can_profile(request, view_func):
+    if not getattr(settings, "REQUEST_PROFILING", False):
+        return False
+    if not view_func.__module__.startswith("catapp."):
+        return False
+    user = get_profiling_user(request, view_func)
+    try:
+        return bool(user and user.is_active and user.is_staff)
+    except APIException:
+        # A signed token user deleted meanwhile.
+        return False
+
+
+class ProfilingMiddleware:
+    """
+    Answer `?_profile=cprofile` with the cProfile hotspots and the tracemalloc
+    allocation top-N of the request, and `?_profile=sql` with its SQL log and
+    the EXPLAIN plan of every SELECT. Only staff users may profile, and only
+    when `REQUEST_PROFILING` is on; the parameter is ignored otherwise.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = request.GET.get(PROFILE_QUERY_PARAM)
+        if mode is None or not can_profile(request, view_func):
+            return None
+        if mode not in PROFILE_MODES:
+            return JsonResponse(
+                {
+                    "detail": "%s must be one of %s"
+                    % (PROFILE_QUERY_PARAM, PROFILE_MODES)
+                },
+                status=400,
+            )
+        limit = getattr(settings, "REQUEST_PROFILING_TOP", 30)
+        logs = [QueryLog(alias) for alias in connections]
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        start_tracing = mode == "cprofile" and not tracemalloc.is_tracing()
+        with ExitStack() as stack:
+            for log in logs:
+                stack.enter_context(connections[log.alias].execute_wrapper(log))
+            if start_tracing:
+                tracemalloc.start()
+                stack.callback(tracemalloc.stop)
+            start = time.perf_counter()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = view_func(request, *view_args, **view_kwargs)
+                render = getattr(response, "render", None)
+                if callable(render):
+                    render()
+                if response.streaming:
+                    size = sum(len(chunk) for chunk in response.streaming_content)
+                else:
+                    size = len(response.content)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            duration = time.perf_counter() - start
+            if mode == "cprofile":
+                snapshot = tracemalloc.take_snapshot()
+                peak_memory = tracemalloc.get_traced_memory()[1]
+
+        queries = [query for log in logs for query in log.queries]
+        report = {
+            "mode": mode,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "content_length": size,
+            "duration": duration,
+            "query_count": len(queries),
+            "query_duration": sum(query["duration"] for query in queries),
+        }
+        if mode == "cprofile":
+            report["hotspots"] = get_hotspots(profiler, limit)
+            report["allocations"] = get_allocations(snapshot, limit)
+            report["peak_memory"] = peak_memory
+        else:
+            for query in queries:
+                query["explain"] = explain(query)
+                query["params"] = [str(param) for param in query["params"] or ()]
+            report["queries"] = queries
+        return JsonResponse(report)
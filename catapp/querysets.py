@@ -0,0 +1,248 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Prefetch, Q
+from rest_framework import serializers
+from rest_framework.relations import HyperlinkedIdentityField, ManyRelatedField
+
+
+class QueryPlan:
+    """
+    The `select_related`, `prefetch_related` and `only()` arguments needed to
+    serialize a queryset without issuing any per-row queries.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = set()
+        # prefetch lookup -> queryset (or None for a plain lookup)
+        self.prefetch_related = {}
+        self.only = {model._meta.pk.name}
+        # Set to False as soon as a field reads something we cannot map to a column.
+        self.restrict_columns = True
+
+    def apply(self, queryset, restrict_columns=True):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        for lookup, prefetch_queryset in sorted(self.prefetch_related.items()):
+            if prefetch_queryset is None:
+                queryset = queryset.prefetch_related(lookup)
+            else:
+                # Prefetch objects are cached on querysets, so build a fresh one.
+                queryset = queryset.prefetch_related(
+                    Prefetch(lookup, queryset=prefetch_queryset.all())
+                )
+        if restrict_columns and self.restrict_columns:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+    def get_related_paths(self):
+        """
+        Return `(lookup, model, many)` for every relation followed by the plan,
+        including the joins made by prefetch querysets.
+        """
+        lookups = {lookup: False for lookup in self.select_related}
+        for lookup, queryset in self.prefetch_related.items():
+            lookups[lookup] = True
+            if queryset is not None:
+                for nested in _flatten_select_related(queryset.query.select_related):
+                    lookups["%s__%s" % (lookup, nested)] = True
+
+        paths = {}
+        for lookup, many in lookups.items():
+            model = self.model
+            parts = lookup.split("__")
+            for index, name in enumerate(parts):
+                model_field = model._meta.get_field(name)
+                model = model_field.related_model
+                many = many or model_field.one_to_many or model_field.many_to_many
+                paths["__".join(parts[: index + 1])] = (model, many)
+        return [
+            (lookup, model, many) for lookup, (model, many) in sorted(paths.items())
+        ]
+
+
+def _flatten_select_related(select_related, prefix=""):
+    if not isinstance(select_related, dict):
+        return []
+    lookups = []
+    for name, nested in select_related.items():
+        lookups.append(prefix + name)
+        lookups.extend(_flatten_select_related(nested, prefix + name + "__"))
+    return lookups
+
+
+def _plan_many_related(plan, lookup, model_field, child):
+    related_model = model_field.related_model
+    if getattr(child, "get_prefetch_queryset", None) is not None:
+        plan.prefetch_related[lookup] = child.get_prefetch_queryset(
+            related_model._default_manager.all()
+        )
+    elif child.use_pk_only_optimization() and model_field.one_to_many:
+        # Only the pk is rendered, plus the column used to match rows back up.
+        plan.prefetch_related[lookup] = related_model._default_manager.only(
+            related_model._meta.pk.name, model_field.field.name
+        )
+    else:
+        plan.prefetch_related[lookup] = None
+
+
+def _plan_field(plan, field):
+    if field.write_only:
+        return
+    if isinstance(field, HyperlinkedIdentityField):
+        plan.only.add(field.lookup_field)
+        return
+    if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+        # Method fields and whole-object sources can read anything.
+        plan.restrict_columns = False
+        return
+
+    model = plan.model
+    path = []
+    for index, attr in enumerate(field.source_attrs):
+        is_last = index == len(field.source_attrs) - 1
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            plan.restrict_columns = False
+            return
+        path.append(attr)
+        lookup = "__".join(path)
+
+        if model_field.many_to_many or model_field.one_to_many:
+            child = getattr(field, "child_relation", None)
+            if is_last and isinstance(field, ManyRelatedField):
+                _plan_many_related(plan, lookup, model_field, child)
+            else:
+                plan.prefetch_related[lookup] = None
+            return
+
+        if model_field.is_relation and not model_field.auto_created:
+            if is_last:
+                if (
+                    isinstance(field, serializers.RelatedField)
+                    and field.use_pk_only_optimization()
+                ):
+                    # Only the foreign key column is needed to render the pk.
+                    plan.only.add(lookup)
+                    return
+                plan.select_related.add(lookup)
+                plan.only.add(lookup)
+                return
+            plan.select_related.add(lookup)
+            plan.only.add(lookup)
+            model = model_field.related_model
+            continue
+
+        if model_field.is_relation:
+            # Reverse one-to-one and friends: fall back to the full row.
+            plan.restrict_columns = False
+            return
+        plan.only.add(lookup)
+        return
+
+
+def build_query_plan(model, fields):
+    """
+    Derive a `QueryPlan` for `model` from an iterable of bound serializer fields.
+    """
+    plan = QueryPlan(model)
+    for field in fields:
+        _plan_field(plan, field)
+    return plan
+
+
+def has_updated_at(model):
+    return any(field.name == "updated_at" for field in model._meta.concrete_fields)
+
+
+_plan_cache = {}
+_field_names_cache = {}
+
+
+def get_query_plan(serializer_class, field_names=None):
+    """
+    Return the (cached) query plan for the readable fields of `serializer_class`,
+    or only for those in `field_names` when given.
+    """
+    cache_key = (serializer_class, field_names)
+    try:
+        return _plan_cache[cache_key]
+    except KeyError:
+        pass
+    serializer = serializer_class()
+    fields = [
+        field
+        for name, field in serializer.fields.items()
+        if field_names is None or name in field_names
+    ]
+    plan = build_query_plan(serializer.Meta.model, fields)
+    _plan_cache[cache_key] = plan
+    return plan
+
+
+def get_field_names(serializer_class):
+    """
+    Return the names of every field `serializer_class` declares, in order.
+    """
+    try:
+        return _field_names_cache[serializer_class]
+    except KeyError:
+        pass
+    field_names = _field_names_cache[serializer_class] = list(serializer_class().fields)
+    return field_names
+
+
+def get_keyset_filter(queryset, ordering, position, reverse=False):
+    """
+    Return the condition of the rows after `position` in `ordering`, either
+    `(<column>, <pk>)` or `(<pk>,)` with the same direction, or before it when
+    `reverse`. Null values of the column sort where the database puts them.
+    """
+    lookup = "gt" if ordering[0].startswith("-") == reverse else "lt"
+    columns = [name.lstrip("-") for name in ordering]
+    if len(columns) == 1:
+        return Q(**{"%s__%s" % (columns[0], lookup): position[0]})
+    (column, pk_name), (value, key) = columns, position
+    nulls_largest = connections[queryset.db].features.nulls_order_largest
+    # Whether null values come after every other value in this direction.
+    nulls_after = nulls_largest == (lookup == "gt")
+    tie = Q(**{"%s__%s" % (pk_name, lookup): key})
+    if value is None:
+        condition = Q(**{"%s__isnull" % column: True}) & tie
+        if not nulls_after:
+            condition |= Q(**{"%s__isnull" % column: False})
+        return condition
+    # The redundant `>=` lets the database range scan the column index.
+    condition = Q(**{"%s__%se" % (column, lookup): value}) & (
+        Q(**{"%s__%s" % (column, lookup): value}) | Q(**{column: value}) & tie
+    )
+    if nulls_after:
+        condition |= Q(**{"%s__isnull" % column: True})
+    return condition
+
+
+def iterate_in_chunks(queryset, chunk_size):
+    """
+    Yield the instances of `queryset` while holding at most `chunk_size` of them.
+
+    Plain querysets use `.iterator()` (a server-side cursor on PostgreSQL).
+    `.iterator()` skips `prefetch_related`, so prefetching querysets are walked
+    one keyset page at a time instead, in their `(<column>, <pk>)` ordering or
+    in primary key order.
+    """
+    if not queryset._prefetch_related_lookups:
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    ordering = tuple(queryset.query.order_by) or ("pk",)
+    columns = [name.lstrip("-") for name in ordering]
+    queryset = queryset.order_by(*ordering)
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield from chunk
+        position = [getattr(chunk[-1], column) for column in columns]
+        chunk = list(
+            queryset.filter(get_keyset_filter(queryset, ordering, position))[
+                :chunk_size
+            ]
+        )
@@ -0,0 +1,50 @@
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from .metrics import timing
+
+
+def dump_row(row):
+    """
+    Encode a single serialized row as compact UTF-8 JSON.
+    """
+    return json.dumps(
+        row, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class TimedRendererMixin:
+    """
+    Report the rendering time as the `render` phase of the `Server-Timing`
+    header (see catapp.metrics).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timing("render"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class JSONRenderer(TimedRendererMixin, renderers.JSONRenderer):
+    pass
+
+
+class BrowsableAPIRenderer(TimedRendererMixin, renderers.BrowsableAPIRenderer):
+    pass
+
+
+class NDJSONRenderer(TimedRendererMixin, renderers.BaseRenderer):
+    """
+    Newline delimited JSON: one object per line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(dump_row(row) + b"\n" for row in rows)
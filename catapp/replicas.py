@@ -0,0 +1,138 @@
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_KEY = "catapp:replica-pin:%s"
+
+_local = threading.local()
+# alias -> time.monotonic() until which the replica is not tried again
+_unavailable = {}
+
+
+def get_replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def get_pin_cache():
+    return caches[getattr(settings, "REPLICA_PIN_CACHE", "default")]
+
+
+def get_current_database():
+    """
+    Return the alias reads are routed to in this thread, None for the default.
+    """
+    return getattr(_local, "database", None)
+
+
+def is_reading_from_replica():
+    return get_current_database() not in (None, DEFAULT_DB_ALIAS)
+
+
+def set_current_database(alias):
+    _local.database = alias
+
+
+@contextmanager
+def use_database(alias):
+    """
+    Route the reads made in the block to `alias`.
+    """
+    previous = get_current_database()
+    set_current_database(alias)
+    try:
+        yield
+    finally:
+        set_current_database(previous)
+
+
+def get_client_key(request):
+    """
+    Identify the client of `request` by its credentials, its session or, for
+    anonymous clients, its address.
+    """
+    meta = request.META
+    client = meta.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if client is None:
+        client = meta.get("REMOTE_ADDR", "")
+    return hashlib.md5(client.encode("utf-8")).hexdigest()
+
+
+def pin_to_primary(request):
+    """
+    Keep the client of `request` reading from the primary for
+    `REPLICA_PIN_SECONDS`, so it sees its own writes despite replication lag.
+    """
+    timeout = getattr(settings, "REPLICA_PIN_SECONDS", 10)
+    if timeout > 0 and get_replicas():
+        get_pin_cache().set(PIN_KEY % get_client_key(request), True, timeout)
+
+
+def is_pinned(request):
+    return bool(get_pin_cache().get(PIN_KEY % get_client_key(request)))
+
+
+def mark_unavailable(alias):
+    _unavailable[alias] = time.monotonic() + getattr(
+        settings, "REPLICA_RETRY_SECONDS", 30
+    )
+
+
+def is_available(alias):
+    deadline = _unavailable.get(alias)
+    if deadline is not None:
+        if deadline > time.monotonic():
+            return False
+        del _unavailable[alias]
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        mark_unavailable(alias)
+        return False
+    return True
+
+
+def get_read_database(request):
+    """
+    Pick the database the reads of `request` should go to: a random available
+    replica, or the primary when there is none or the client recently wrote.
+    """
+    replicas = get_replicas()
+    if not replicas or is_pinned(request):
+        return DEFAULT_DB_ALIAS
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_available(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Send reads to the database chosen for the current request (see
+    `ReplicaReadMixin`) and writes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return get_current_database()
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in get_replicas():
+            # Rows read from a replica are written back to the primary.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS}.union(get_replicas())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
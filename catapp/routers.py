@@ -0,0 +1,18 @@
+from rest_framework.routers import DefaultRouter
+
+
+class BulkRouter(DefaultRouter):
+    """
+    `DefaultRouter` that also maps `PUT`, `PATCH` and `DELETE` on the list
+    route to the bulk actions of `BulkModelMixin`.
+    """
+
+    routes = list(DefaultRouter.routes)
+    routes[0] = routes[0]._replace(
+        mapping=dict(
+            routes[0].mapping,
+            put="bulk_update",
+            patch="partial_bulk_update",
+            delete="bulk_destroy",
+        )
+    )
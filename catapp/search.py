@@ -0,0 +1,86 @@
+import heapq
+
+from django.db import connections, router
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Breed, Cat, Home, Human
+
+# Searchable models: result type -> (model, primary column, secondary column).
+# On PostgreSQL these columns feed the weighted `search_vector` column and its
+# GIN index, kept up to date by triggers (migration 0006).
+SEARCH_MODELS = {
+    "breed": (Breed, "name", "description"),
+    "cat": (Cat, "name", "description"),
+    "home": (Home, "name", "address"),
+    "human": (Human, "name", "description"),
+}
+
+TSQUERY = "plainto_tsquery('pg_catalog.english', %s)"
+
+
+def _postgresql_search(model, query):
+    table = model._meta.db_table
+    return (
+        model._default_manager.annotate(
+            rank=RawSQL("ts_rank(%s.search_vector, %s)" % (table, TSQUERY), [query])
+        )
+        .extra(where=["%s.search_vector @@ %s" % (table, TSQUERY)], params=[query])
+        .order_by("-rank", "pk")
+    )
+
+
+def _fallback_search(model, query, primary, secondary):
+    # Substring matching for SQLite and other backends, used by the tests.
+    primary_match = Q(**{"%s__icontains" % primary: query})
+    return (
+        model._default_manager.filter(
+            primary_match | Q(**{"%s__icontains" % secondary: query})
+        )
+        .annotate(
+            rank=Case(
+                When(primary_match, then=Value(1.0)),
+                default=Value(0.5),
+                output_field=FloatField(),
+            )
+        )
+        .order_by("-rank", "pk")
+    )
+
+
+def search_model(model, query, primary, secondary):
+    """
+    Return a queryset of the `model` rows matching `query`, best first, with a
+    `rank` annotation.
+    """
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor == "postgresql":
+        return _postgresql_search(model, query)
+    return _fallback_search(model, query, primary, secondary)
+
+
+def search(query, offset, limit, types=None):
+    """
+    Return `limit + 1` results for `query` starting at `offset`, merged by rank
+    across every searchable model as `(rank, type, id, name)` tuples.
+
+    Each model contributes at most `offset + limit + 1` rows. On PostgreSQL
+    the GIN index finds the matching rows, but it cannot return them in rank
+    order: `ts_rank()` is computed for every match before the top rows are
+    sorted out, so a common term costs as much as its whole match set. The
+    substring fallback scans the tables.
+    """
+    wanted = offset + limit + 1
+    ranked = []
+    for result_type, (model, primary, secondary) in sorted(SEARCH_MODELS.items()):
+        if types and result_type not in types:
+            continue
+        rows = search_model(model, query, primary, secondary).values_list(
+            "rank", "pk", primary
+        )[:wanted]
+        ranked.append([(-rank, result_type, pk, name) for rank, pk, name in rows])
+    merged = heapq.merge(*ranked)
+    return [
+        (-negative_rank, result_type, pk, name)
+        for negative_rank, result_type, pk, name in list(merged)[offset:wanted]
+    ]
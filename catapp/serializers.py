@@ -1,9 +1,31 @@
 # from exceptions import AttributeError
 
+from collections import OrderedDict
+from collections.abc import Mapping
+from urllib.parse import urlparse
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.db.models import QuerySet
+from django.urls import Resolver404, get_script_prefix, resolve
+from django.utils import timezone
+from django.utils.encoding import uri_to_iri
 from rest_framework import serializers
-from rest_framework.serializers import HyperlinkedModelSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.serializers import (
+    LIST_SERIALIZER_KWARGS,
+    HyperlinkedModelSerializer,
+)
 
+from .caching import bump_model_version
+from .counters import batched_counters, count_bulk_write
+from .denormalization import finish_bulk_write, prepare_bulk_write
+from .links import build_url, get_link_mode, get_url_template
+from .metrics import timing
 from .models import Breed, Cat, Home, Human
+from .sharding import get_shard_move_errors, replicate_bulk_write
 
 # from catapp.models import GENDER_CHOICES
 
@@ -13,24 +35,320 @@ class GenderChoiceField(serializers.ChoiceField):
         return self._choices[obj]
 
 
+class HomeListingManyField(serializers.ManyRelatedField):
+    def get_attribute(self, instance):
+        cats = super().get_attribute(instance)
+        if isinstance(cats, QuerySet) and cats._result_cache is None:
+            # Not prefetched: still read every cat's home in one query.
+            cats = self.child_relation.get_prefetch_queryset(cats)
+        return cats
+
+
 class HomeListingField(serializers.RelatedField):
+    """
+    Lists a breed's cats with their homes, read from the denormalized
+    `Cat.home_name` column, see `get_prefetch_queryset`.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return HomeListingManyField(**list_kwargs)
+
+    # Read by the compiled list path, see catapp.compiled.
+    compiled_columns = ("name", "home_name")
+
+    def get_prefetch_queryset(self, queryset):
+        return queryset.only("id", "name", "breed", "home_name")
+
+    def to_compiled_representation(self, name, home_name):
+        return "Cat: %s, Home: %s" % (name, home_name)
+
     def to_representation(self, value):
-        human = Human.objects.get(id=value.owner_id)
-        home = Home.objects.get(id=human.home_id)
-        return "Cat: %s, Home: %s" % (value.name, home)
+        return self.to_compiled_representation(value.name, value.home_name)
+
+
+def get_sparse_fieldset(request, field_names):
+    """
+    Return the field names selected by the `fields` and `exclude` query
+    parameters of a read request, or None when all fields are wanted.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, "query_params", request.GET)
+    fields, exclude = params.get("fields"), params.get("exclude")
+    if not fields and not exclude:
+        return None
+
+    def split(value):
+        return {name.strip() for name in value.split(",") if name.strip()}
+
+    selected = split(fields) if fields else set(field_names)
+    excluded = split(exclude) if exclude else set()
+    errors = {}
+    for param, names in (("fields", selected), ("exclude", excluded)):
+        unknown = names - set(field_names)
+        if unknown:
+            errors[param] = ["Unknown fields: %s." % ", ".join(sorted(unknown))]
+    if errors:
+        raise ValidationError(errors)
+    return frozenset(selected - excluded)
+
+
+class TemplateHyperlinkMixin:
+    """
+    Build hyperlinks from a URL template reversed once per request instead of
+    calling `reverse()` for every link, and render raw primary keys when the
+    request asks for the `id` link mode (see catapp.links).
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        if hasattr(obj, "pk") and obj.pk in (None, ""):
+            return None
+        template = get_url_template(view_name, self.lookup_url_kwarg, request, format)
+        return build_url(template, getattr(obj, self.lookup_field))
+
+    def to_representation(self, value):
+        if get_link_mode(self.context.get("request")) == "id":
+            return value.pk
+        return super().to_representation(value)
+
+
+class TemplateHyperlinkedIdentityField(
+    TemplateHyperlinkMixin, serializers.HyperlinkedIdentityField
+):
+    pass
+
+
+class BulkHyperlinkedRelatedField(
+    TemplateHyperlinkMixin, serializers.HyperlinkedRelatedField
+):
+    """
+    A hyperlinked relation whose targets can be preloaded for a whole batch of
+    rows, so validating a list payload looks them up in a single query. In
+    the `id` link mode raw primary keys are accepted as well.
+    """
+
+    bulk_objects = None
+
+    def is_raw_lookup(self, data):
+        return get_link_mode(self.context.get("request")) == "id" and not (
+            isinstance(data, str) and "/" in data
+        )
+
+    def get_lookup_value(self, data):
+        """
+        Return the lookup value a hyperlink points to, without fetching it.
+        """
+        if self.is_raw_lookup(data):
+            return data
+        if not isinstance(data, str):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if data.startswith(("http:", "https:")):
+            # If needed convert absolute URLs to relative path
+            data = urlparse(data).path
+            prefix = get_script_prefix()
+            if data.startswith(prefix):
+                data = "/" + data[len(prefix) :]
+        try:
+            match = resolve(uri_to_iri(data))
+        except Resolver404:
+            self.fail("no_match")
+        if match.view_name != self.view_name:
+            self.fail("incorrect_match")
+        return match.kwargs[self.lookup_url_kwarg]
+
+    def preload(self, urls):
+        lookups = {}
+        for url in set(urls):
+            try:
+                lookups[url] = str(self.get_lookup_value(url))
+            except ValidationError:
+                # Reported with the offending row during validation.
+                continue
+        objects = {
+            str(getattr(obj, self.lookup_field)): obj
+            for obj in self.get_queryset().filter(
+                **{"%s__in" % self.lookup_field: set(lookups.values())}
+            )
+        }
+        self.bulk_objects = {
+            url: objects[value] for url, value in lookups.items() if value in objects
+        }
+
+    def to_internal_value(self, data):
+        try:
+            return self.bulk_objects[data]
+        except (KeyError, TypeError):
+            pass
+        if not self.is_raw_lookup(data):
+            return super().to_internal_value(data)
+        try:
+            return self.get_queryset().get(**{self.lookup_field: data})
+        except (ObjectDoesNotExist, TypeError, ValueError):
+            self.fail("does_not_exist")
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a list payload in one pass and writes it with `bulk_create` and
+    `bulk_update`. Callers are expected to wrap `save()` in a transaction.
+    """
+
+    batch_size = 1000
+
+    @property
+    def data(self):
+        with timing("serialize"):
+            return super().data
+
+    def get_bulk_fields(self):
+        return [
+            field
+            for field in self.child.fields.values()
+            if isinstance(field, BulkHyperlinkedRelatedField) and not field.read_only
+        ]
+
+    def to_internal_value(self, data):
+        bulk_fields = self.get_bulk_fields()
+        if isinstance(data, list):
+            rows = [row for row in data if isinstance(row, Mapping)]
+            for field in bulk_fields:
+                field.preload(
+                    row[field.field_name] for row in rows if field.field_name in row
+                )
+        try:
+            validated_data = super().to_internal_value(data)
+        finally:
+            for field in bulk_fields:
+                field.bulk_objects = None
+        if self.instance is not None:
+            # Reported per row, like the field errors.
+            errors = [
+                get_shard_move_errors(instance, attrs)
+                for instance, attrs in zip(self.instance, validated_data)
+            ]
+            if any(errors):
+                raise ValidationError(errors)
+        return validated_data
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        with batched_counters():
+            if connection.features.can_return_ids_from_bulk_insert:
+                # bulk_create() sends no pre_save/post_save signals.
+                prepare_bulk_write(model, instances)
+                count_bulk_write(model, instances)
+                instances = model._default_manager.bulk_create(
+                    instances, batch_size=self.batch_size
+                )
+                finish_bulk_write(model, instances)
+                replicate_bulk_write(model, instances)
+                bump_model_version(model)
+                return instances
+            # Without RETURNING the new primary keys are unknown after bulk_create.
+            for instance in instances:
+                instance.save(force_insert=True)
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+        if fields:
+            # bulk_update() sends no signals and skips pre_save(), which keeps
+            # auto_now fields current.
+            fields.update(prepare_bulk_write(model, instances, fields))
+            now = timezone.now()
+            for field in model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for instance in instances:
+                        setattr(instance, field.attname, now)
+                    fields.add(field.name)
+            with batched_counters():
+                count_bulk_write(model, instances, fields)
+                model._default_manager.bulk_update(
+                    instances, sorted(fields), batch_size=self.batch_size
+                )
+            finish_bulk_write(model, instances, fields)
+            replicate_bulk_write(model, instances)
+            bump_model_version(model)
+        return instances
 
 
-class HomeSerializer(HyperlinkedModelSerializer):
+class BulkHyperlinkedModelSerializer(HyperlinkedModelSerializer):
+    """
+    `HyperlinkedModelSerializer` that uses `BulkListSerializer` for `many=True`
+    and honours the `?fields=`/`?exclude=` sparse fieldset parameters.
+    """
+
+    serializer_related_field = BulkHyperlinkedRelatedField
+    serializer_url_field = TemplateHyperlinkedIdentityField
+
+    @property
+    def data(self):
+        with timing("serialize"):
+            return super().data
+
+    def validate(self, attrs):
+        if self.parent is None and self.instance is not None:
+            errors = get_shard_move_errors(self.instance, attrs)
+            if errors:
+                raise ValidationError(errors)
+        return attrs
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.parent is not None and not isinstance(
+            self.parent, serializers.ListSerializer
+        ):
+            # Only the top level serializer is narrowed.
+            return fields
+        names = get_sparse_fieldset(self.context.get("request"), fields)
+        if names is None:
+            return fields
+        return OrderedDict(
+            (name, field) for name, field in fields.items() if name in names
+        )
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        allow_empty = kwargs.pop("allow_empty", None)
+        list_kwargs = {"child": cls(*args, **kwargs)}
+        if allow_empty is not None:
+            list_kwargs["allow_empty"] = allow_empty
+        list_kwargs.update(
+            {
+                key: value
+                for key, value in kwargs.items()
+                if key in LIST_SERIALIZER_KWARGS
+            }
+        )
+        meta = getattr(cls, "Meta", None)
+        list_serializer_class = getattr(
+            meta, "list_serializer_class", BulkListSerializer
+        )
+        return list_serializer_class(*args, **list_kwargs)
+
+
+class HomeSerializer(BulkHyperlinkedModelSerializer):
     id = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Home
-        fields = "__all__"
+        exclude = ("updated_at",)
 
 
-class HumanSerializer(HyperlinkedModelSerializer):
+class HumanSerializer(BulkHyperlinkedModelSerializer):
     id = serializers.PrimaryKeyRelatedField(read_only=True)
-    cats = serializers.HyperlinkedRelatedField(
+    cats = BulkHyperlinkedRelatedField(
         many=True, read_only=True, view_name="cat-detail"
     )
     # cats_name = serializers.StringRelatedField(many=True, read_only=True, source='cats')
@@ -38,26 +356,23 @@ class HumanSerializer(HyperlinkedModelSerializer):
 
     class Meta:
         model = Human
-        fields = "__all__"
+        exclude = ("updated_at",)
 
 
-class BreedSerializer(HyperlinkedModelSerializer):
+class BreedSerializer(BulkHyperlinkedModelSerializer):
     id = serializers.PrimaryKeyRelatedField(read_only=True)
     homes = HomeListingField(many=True, source="cats", read_only=True)
 
     class Meta:
         model = Breed
-        fields = "__all__"
+        exclude = ("updated_at",)
 
 
-class CatSerializer(HyperlinkedModelSerializer):
+class CatSerializer(BulkHyperlinkedModelSerializer):
     id = serializers.PrimaryKeyRelatedField(read_only=True)
     # gender = serializers.ChoiceField(choices=GENDER_CHOICES)
     # gender = GenderChoiceField(choices=GENDER_CHOICES)
-    home = serializers.SerializerMethodField("owner_home")
-
-    def owner_home(self, cat):
-        return cat.owner.home.name
+    home = serializers.CharField(source="home_name", read_only=True)
 
     class Meta:
         model = Cat
@@ -0,0 +1,446 @@
+import bisect
+import hashlib
+import heapq
+from functools import cmp_to_key
+from itertools import chain, islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import Count, F, Max, Min, QuerySet, Sum
+from django.db.models.query import (
+    FlatValuesListIterable,
+    ModelIterable,
+    ValuesIterable,
+)
+from django.db.models.signals import post_delete, post_save
+
+# Households are sharded: a `Home`, its humans and their cats live on the
+# database alias of `DATABASE_SHARDS` the home id hashes to. Primary keys come
+# from a sequence on the default database, so they are unique across shards.
+# Reference tables (`Breed`) live on the default database and are copied to
+# every shard. Querysets that are not tied to a shard fan out to all of them.
+
+REPLICATED_MODELS = ("catapp.Breed",)
+
+
+def get_shards():
+    return tuple(getattr(settings, "DATABASE_SHARDS", ()))
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Consistent hashing of keys onto `nodes`. Every node owns `points` spots
+    on a ring of hashes and a key belongs to the node owning the first spot
+    after its own hash, so adding a node only moves about 1/N of the keys.
+    """
+
+    def __init__(self, nodes, points=64):
+        ring = sorted(
+            (_hash("%s-%d" % (node, index)), node)
+            for node in nodes
+            for index in range(points)
+        )
+        self.hashes = [spot for spot, _ in ring]
+        self.nodes = [node for _, node in ring]
+
+    def get_node(self, key):
+        index = bisect.bisect(self.hashes, _hash(str(key)))
+        return self.nodes[index % len(self.nodes)]
+
+
+_rings = {}
+
+
+def get_home_shard(home_id):
+    """
+    Return the shard holding the home `home_id` and everything beneath it.
+    """
+    shards = get_shards()
+    ring = _rings.get(shards)
+    if ring is None:
+        ring = _rings[shards] = HashRing(shards)
+    return ring.get_node(home_id)
+
+
+def get_instance_shard(instance):
+    """
+    Return the shard of a sharded model instance, or None while its home is
+    still unknown.
+    """
+    if not instance._state.adding and instance._state.db in get_shards():
+        return instance._state.db
+    home_id = instance.get_home_id()
+    return None if home_id is None else get_home_shard(home_id)
+
+
+def get_shard_move_errors(instance, attrs):
+    """
+    Return the errors of `attrs` moving the saved sharded `instance` under a
+    row of another shard, e.g. a human to a home of another shard. Households
+    are not copied between shards, so such moves are rejected.
+    """
+    if not get_shards() or not getattr(instance, "sharded", False):
+        return {}
+    if instance._state.adding:
+        return {}
+    shard = get_instance_shard(instance)
+    errors = {}
+    for name, value in attrs.items():
+        if getattr(value, "sharded", False) and get_instance_shard(value) != shard:
+            errors[name] = [
+                "Cannot move to a %s stored on another shard."
+                % value._meta.verbose_name
+            ]
+    return errors
+
+
+def allocate_ids(model, count):
+    """
+    Reserve `count` primary keys of `model` from its sequence on the default
+    database, which starts after the largest key found on any shard.
+    """
+    IdSequence = apps.get_model("catapp", "IdSequence")
+    name = model._meta.label_lower
+    sequences = IdSequence.objects.using(DEFAULT_DB_ALIAS).filter(name=name)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not sequences.update(last_id=F("last_id") + count):
+            start = model._default_manager.aggregate(start=Max("pk"))["start"] or 0
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    IdSequence.objects.using(DEFAULT_DB_ALIAS).create(
+                        name=name, last_id=start + count
+                    )
+            except IntegrityError:
+                # Created concurrently.
+                sequences.update(last_id=F("last_id") + count)
+        last_id = sequences.values_list("last_id", flat=True).get()
+    return list(range(last_id - count + 1, last_id + 1))
+
+
+class ShardRouter:
+    """
+    Route sharded models to the shard of the instance a query is made for.
+    Queries without such an instance are fanned out by `ShardedQuerySet`.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if (
+            get_shards()
+            and getattr(model, "sharded", False)
+            and getattr(instance, "sharded", False)
+        ):
+            return get_instance_shard(instance)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not get_shards():
+            return None
+        if not (getattr(obj1, "sharded", False) and getattr(obj2, "sharded", False)):
+            # Reference tables are on every shard.
+            return True
+        if obj1._state.adding or obj2._state.adding:
+            # New rows go to the shard of the rows they belong to.
+            return True
+        return get_instance_shard(obj1) == get_instance_shard(obj2)
+
+
+def _compare(row1, row2, descending, nulls_largest):
+    for value1, value2, reverse in zip(row1, row2, descending):
+        if value1 == value2:
+            continue
+        if value1 is None:
+            result = 1 if nulls_largest else -1
+        elif value2 is None:
+            result = -1 if nulls_largest else 1
+        else:
+            result = -1 if value1 < value2 else 1
+        return -result if reverse else result
+    return 0
+
+
+def _merge_aggregate(aggregate, values):
+    values = [value for value in values if value is not None]
+    if isinstance(aggregate, (Count, Sum)):
+        return sum(values) if values else (0 if isinstance(aggregate, Count) else None)
+    if isinstance(aggregate, (Max, Min)):
+        if not values:
+            return None
+        return max(values) if isinstance(aggregate, Max) else min(values)
+    raise TypeError(
+        "%s cannot be combined across shards." % aggregate.__class__.__name__
+    )
+
+
+class ShardedQuerySet(QuerySet):
+    """
+    A queryset of a sharded model. Bound to a database with `using()` or
+    reached from an instance of a sharded model, it is routed to that shard;
+    otherwise every query runs on each shard in turn. Rows are merged in the
+    queryset's order (the primary key when unordered), counts and aggregates
+    are combined and writes are applied to every shard.
+    """
+
+    def is_fanned_out(self):
+        return (
+            self._db is None
+            and bool(get_shards())
+            and not getattr(self._hints.get("instance"), "sharded", False)
+        )
+
+    def get_shard_querysets(self):
+        return [self.using(alias) for alias in get_shards()]
+
+    def get_row_key(self, ordering):
+        """
+        Return a function reading the ordering values of a result row, or None
+        when they cannot be read from the rows.
+        """
+        opts = self.model._meta
+        fields = list(self._fields or ())
+        getters = []
+        for name in ordering:
+            if not isinstance(name, str):
+                return None
+            name = name.lstrip("-")
+            try:
+                field = opts.pk if name == "pk" else opts.get_field(name)
+                attname = field.attname
+            except FieldDoesNotExist:
+                attname = name
+            if self._iterable_class is ModelIterable:
+                getters.append(lambda row, attname=attname: getattr(row, attname))
+                continue
+            # values() and values_list() rows use the names they were given,
+            # e.g. "pk" or "breed" rather than "id" or "breed_id".
+            if self._iterable_class is ValuesIterable and not fields:
+                key = attname
+            else:
+                key = next((key for key in (name, attname) if key in fields), None)
+            if key is None:
+                return None
+            if self._iterable_class is ValuesIterable:
+                getters.append(lambda row, key=key: row[key])
+            elif self._iterable_class is FlatValuesListIterable:
+                getters.append(lambda row: row)
+            else:
+                getters.append(lambda row, index=fields.index(key): row[index])
+        return lambda row: [getter(row) for getter in getters]
+
+    def fan_out(self, chunk_size=None):
+        """
+        Yield the rows of every shard, merged in the queryset's order.
+        """
+        ordering = list(self.query.order_by)
+        if not ordering and self.query.default_ordering:
+            ordering = list(self.model._meta.ordering)
+        order_by_pk = not ordering and (
+            self._iterable_class is ModelIterable
+            or self._iterable_class is ValuesIterable
+            and {"pk", self.model._meta.pk.attname}.intersection(self._fields or ())
+        )
+        if order_by_pk:
+            ordering = ["pk"]
+
+        # Every shard returns up to the end of the slice, which is then taken
+        # from the merged rows.
+        low, high = self.query.low_mark, self.query.high_mark
+        querysets = []
+        for queryset in self.get_shard_querysets():
+            queryset.query.clear_limits()
+            if order_by_pk:
+                queryset = queryset.order_by("pk")
+            queryset.query.set_limits(0, high)
+            querysets.append(queryset)
+
+        if chunk_size is None:
+            iterables = [iter(queryset) for queryset in querysets]
+        else:
+            iterables = [
+                queryset.iterator(chunk_size=chunk_size) for queryset in querysets
+            ]
+        key = self.get_row_key(ordering) if ordering else None
+        if key is None:
+            rows = chain(*iterables)
+        else:
+            descending = [name.startswith("-") for name in ordering]
+            features = connections[get_shards()[0]].features
+            compare = cmp_to_key(
+                lambda row1, row2: _compare(
+                    row1, row2, descending, features.nulls_order_largest
+                )
+            )
+            rows = heapq.merge(*iterables, key=lambda row: compare(key(row)))
+        return islice(rows, low, high)
+
+    def _fetch_all(self):
+        if self._result_cache is None and self.is_fanned_out():
+            # Each shard prefetches the related rows of its own rows.
+            self._result_cache = list(self.fan_out())
+            self._prefetch_done = True
+        super()._fetch_all()
+
+    def iterator(self, chunk_size=2000):
+        if not self.is_fanned_out():
+            return super().iterator(chunk_size=chunk_size)
+        return self.fan_out(chunk_size=chunk_size)
+
+    def count(self):
+        if self._result_cache is not None or not self.is_fanned_out():
+            return super().count()
+        if self.query.low_mark or self.query.high_mark is not None:
+            return len(self)
+        return sum(queryset.count() for queryset in self.get_shard_querysets())
+
+    def exists(self):
+        if self._result_cache is not None or not self.is_fanned_out():
+            return super().exists()
+        return any(queryset.exists() for queryset in self.get_shard_querysets())
+
+    def aggregate(self, *args, **kwargs):
+        if not self.is_fanned_out():
+            return super().aggregate(*args, **kwargs)
+        for arg in args:
+            kwargs[arg.default_alias] = arg
+        results = [
+            queryset.aggregate(**kwargs) for queryset in self.get_shard_querysets()
+        ]
+        return {
+            name: _merge_aggregate(aggregate, [result[name] for result in results])
+            for name, aggregate in kwargs.items()
+        }
+
+    def update(self, **kwargs):
+        if not self.is_fanned_out():
+            return super().update(**kwargs)
+        return sum(queryset.update(**kwargs) for queryset in self.get_shard_querysets())
+
+    def delete(self):
+        if not self.is_fanned_out():
+            return super().delete()
+        deleted, rows = 0, {}
+        for queryset in self.get_shard_querysets():
+            count, per_model = queryset.delete()
+            deleted += count
+            for label, number in per_model.items():
+                rows[label] = rows.get(label, 0) + number
+        return deleted, rows
+
+    def create(self, **kwargs):
+        if not self.is_fanned_out():
+            return super().create(**kwargs)
+        instance = self.model(**kwargs)
+        # Routed to the shard of its home by ShardRouter.
+        instance.save(force_insert=True)
+        return instance
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False):
+        if not self.is_fanned_out():
+            return super().bulk_create(
+                objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts
+            )
+        objs = list(objs)
+        pending = [obj for obj in objs if obj.pk is None]
+        for obj, pk in zip(pending, allocate_ids(self.model, len(pending))):
+            obj.pk = pk
+        by_shard = {}
+        for obj in objs:
+            by_shard.setdefault(get_instance_shard(obj), []).append(obj)
+        for alias, group in by_shard.items():
+            self.using(alias).bulk_create(
+                group, batch_size=batch_size, ignore_conflicts=ignore_conflicts
+            )
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if not self.is_fanned_out():
+            return super().bulk_update(objs, fields, batch_size=batch_size)
+        by_shard = {}
+        for obj in objs:
+            by_shard.setdefault(get_instance_shard(obj), []).append(obj)
+        for alias, group in by_shard.items():
+            self.using(alias).bulk_update(group, fields, batch_size=batch_size)
+
+
+def aggregate_across_shards(queryset, aggregates, local=()):
+    """
+    Aggregate a queryset of a reference table joined to sharded rows, which
+    only sees the rows of one shard, on every shard and merge the results.
+    The `local` aggregates read the reference rows alone and are taken from
+    the default database.
+    """
+    aliases = [DEFAULT_DB_ALIAS]
+    aliases.extend(alias for alias in get_shards() if alias != DEFAULT_DB_ALIAS)
+    results = [queryset.using(alias).aggregate(**aggregates) for alias in aliases]
+    return {
+        name: (
+            results[0][name]
+            if name in local
+            else _merge_aggregate(aggregate, [result[name] for result in results])
+        )
+        for name, aggregate in aggregates.items()
+    }
+
+
+def get_replicated_values(instance):
+    counter_fields = getattr(instance, "counter_fields", ())
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in counter_fields
+    }
+
+
+def replicate_rows(model, instances):
+    """
+    Copy `instances` of a reference table from the default database to every
+    other shard. Counters are only maintained on the default database.
+    """
+    for alias in get_shards():
+        if alias == DEFAULT_DB_ALIAS:
+            continue
+        manager = model._base_manager.using(alias)
+        missing = []
+        for instance in instances:
+            values = get_replicated_values(instance)
+            if not manager.filter(pk=instance.pk).update(**values):
+                missing.append(model(pk=instance.pk, **values))
+        manager.bulk_create(missing)
+
+
+def replicate_bulk_write(model, instances):
+    """
+    Replicate reference table rows written with `bulk_create()` or
+    `bulk_update()`, which send no signals.
+    """
+    if model._meta.label in REPLICATED_MODELS and get_shards():
+        replicate_rows(model, instances)
+
+
+def replicate_saved_row(sender, instance, using, raw=False, **kwargs):
+    if using == DEFAULT_DB_ALIAS and not raw and get_shards():
+        replicate_rows(sender, [instance])
+
+
+def replicate_deleted_row(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS or not get_shards():
+        return
+    for alias in get_shards():
+        if alias != DEFAULT_DB_ALIAS:
+            # Cascades to the rows of that shard referencing the copy.
+            sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+for label in REPLICATED_MODELS:
+    post_save.connect(replicate_saved_row, sender=label, dispatch_uid="catapp-shard")
+    post_delete.connect(
+        replicate_deleted_row, sender=label, dispatch_uid="catapp-shard"
+    )
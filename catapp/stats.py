@@ -0,0 +1,110 @@
+from datetime import date
+
+from django.db.models import Count, F
+from django.db.models.functions import ExtractYear
+from rest_framework.exceptions import ValidationError
+
+from .models import Breed, Cat, Home, Human
+from .sharding import get_shards
+
+
+class Chart:
+    """
+    A statistic computed with a single `GROUP BY` query over `model`.
+
+    `aggregate(queryset, params)` receives the filtered queryset and the query
+    parameters and returns the rows to render. `models` are the models whose
+    writes can change the result, `params` the extra query parameters it reads.
+    """
+
+    def __init__(self, model, aggregate, models, params=()):
+        self.model = model
+        self.aggregate = aggregate
+        self.models = models
+        self.params = params
+
+
+def _group_order(row):
+    # Nulls last, as on PostgreSQL.
+    return [-row["count"]] + [(value is None, value) for value in row.values()]
+
+
+def count_by(queryset, *fields, **expressions):
+    groups = (
+        queryset.values(*fields, **expressions)
+        .annotate(count=Count("pk"))
+        .order_by("-count", *(list(fields) + list(expressions)))
+    )
+    if not get_shards():
+        return list(groups)
+    # Each shard returns its own counts of the same groups.
+    counts = {}
+    for row in groups:
+        count = row.pop("count")
+        key = tuple(row.items())
+        counts[key] = counts.get(key, 0) + count
+    return sorted(
+        (dict(key, count=count) for key, count in counts.items()), key=_group_order
+    )
+
+
+def cats_per_breed(queryset, params):
+    return count_by(queryset, "breed", breed_name=F("breed__name"))
+
+
+def cats_per_home_type(queryset, params):
+    return count_by(queryset, type=F("home__type"))
+
+
+def per_gender(queryset, params):
+    return count_by(queryset, "gender")
+
+
+def per_type(queryset, params):
+    return count_by(queryset, "type")
+
+
+def get_bucket_size(params):
+    try:
+        bucket = int(params.get("bucket", 1))
+    except ValueError:
+        bucket = 0
+    if bucket < 1:
+        raise ValidationError({"bucket": ["A positive number of years is required."]})
+    return bucket
+
+
+def age_histogram(queryset, params):
+    """
+    Count rows per age bucket of `bucket` years (1 by default). The database
+    groups by year of birth; the age reached this year is derived from it.
+    """
+    bucket = get_bucket_size(params)
+    this_year = date.today().year
+    counts = {}
+    for row in queryset.values(year=ExtractYear("date_of_birth")).annotate(
+        count=Count("pk")
+    ):
+        if row["year"] is None:
+            key = None
+        else:
+            key = max(this_year - row["year"], 0) // bucket * bucket
+        counts[key] = counts.get(key, 0) + row["count"]
+    histogram = [
+        {"min_age": key, "max_age": key + bucket - 1, "count": counts[key]}
+        for key in sorted(key for key in counts if key is not None)
+    ]
+    if None in counts:
+        histogram.append({"min_age": None, "max_age": None, "count": counts[None]})
+    return histogram
+
+
+CHARTS = {
+    "cats-per-breed": Chart(Cat, cats_per_breed, (Cat, Breed, Human)),
+    "cats-per-home-type": Chart(Cat, cats_per_home_type, (Cat, Human, Home)),
+    "cats-per-gender": Chart(Cat, per_gender, (Cat, Human)),
+    "cat-ages": Chart(Cat, age_histogram, (Cat, Human), params=("bucket",)),
+    "humans-per-gender": Chart(Human, per_gender, (Human,)),
+    "human-ages": Chart(Human, age_histogram, (Human,), params=("bucket",)),
+    "homes-per-type": Chart(Home, per_type, (Home,)),
+}
@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..caching import get_cache
+from ..models import Breed, Home, Human
+
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        for name in ("Jane", "john", "Johanna", "Bob"):
+            Human.objects.create(
+                name=name, gender="F", date_of_birth="1992-01-24", home=self.home
+            )
+        self.persian = Breed.objects.create(name="Persian", origin="Europe")
+
+    def tearDown(self):
+        get_cache().clear()
+
+    def get(self, viewset, url):
+        view = viewset.as_view(actions={"get": "autocomplete"})
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        return view(request)
+
+    def test_autocomplete_prefix(self):
+        response = self.get(views.HumanViewSet, "/human/autocomplete/?q=JO")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [human["name"] for human in response.data], ["Johanna", "john"]
+        )
+        john = Human.objects.get(name="john")
+        self.assertEqual(
+            response.data[1],
+            {
+                "id": john.id,
+                "name": "john",
+                "url": "http://testserver/human/{}/".format(john.id),
+            },
+        )
+
+    def test_autocomplete_limit(self):
+        response = self.get(views.HumanViewSet, "/human/autocomplete/?q=j&limit=2")
+        self.assertEqual(
+            [human["name"] for human in response.data], ["Jane", "Johanna"]
+        )
+
+    def test_autocomplete_fuzzy(self):
+        response = self.get(views.BreedViewSet, "/breed/autocomplete/?q=ersi&fuzzy=1")
+        self.assertEqual([breed["name"] for breed in response.data], ["Persian"])
+        response = self.get(views.BreedViewSet, "/breed/autocomplete/?q=ersi")
+        self.assertEqual(response.data, [])
+
+    def test_autocomplete_cache(self):
+        self.get(views.HomeViewSet, "/home/autocomplete/?q=my")
+        # The hot prefix (and the token) are served from the caches.
+        with self.assertNumQueries(0):
+            response = self.get(views.HomeViewSet, "/home/autocomplete/?q=MY")
+        self.assertEqual([home["name"] for home in response.data], ["My Home"])
+
+        # Writes invalidate cached prefixes.
+        Home.objects.create(name="My Office", address="Wisma Goshen")
+        response = self.get(views.HomeViewSet, "/home/autocomplete/?q=my")
+        self.assertEqual(
+            [home["name"] for home in response.data], ["My Home", "My Office"]
+        )
+
+    def test_autocomplete_validation(self):
+        response = self.get(views.HumanViewSet, "/human/autocomplete/")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.get(views.HumanViewSet, "/human/autocomplete/?q=j&limit=x")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase
+
+from ..benchmarks import compare_results, generate_dataset, parse_size, percentile
+from ..models import Breed, Cat, Home, Human
+
+
+def dump_rows():
+    return {
+        model.__name__: list(
+            model.objects.order_by("pk").values_list(
+                *[
+                    field.attname
+                    for field in model._meta.concrete_fields
+                    if field.name != "updated_at"
+                ]
+            )
+        )
+        for model in (Home, Human, Breed, Cat)
+    }
+
+
+class DatasetTestCase(TestCase):
+    def test_deterministic(self):
+        pks = generate_dataset(200, seed=3)
+        rows = dump_rows()
+        for model in (Cat, Human, Home, Breed):
+            model.objects.all().delete()
+        self.assertEqual(generate_dataset(200, seed=3), pks)
+        self.assertEqual(dump_rows(), rows)
+
+        for model in (Cat, Human, Home, Breed):
+            model.objects.all().delete()
+        generate_dataset(200, seed=4)
+        self.assertNotEqual(dump_rows(), rows)
+
+    def test_fan_out(self):
+        pks = generate_dataset(400)
+        self.assertEqual(Cat.objects.count(), 400)
+        self.assertEqual(len(pks["cat"]), 400)
+        self.assertEqual(Home.objects.count(), 100)
+        self.assertTrue(100 <= Human.objects.count() <= 400)
+        # Counters and denormalized columns are consistent.
+        for home in Home.objects.annotate(actual=Count("humans")):
+            self.assertEqual(home.human_count, home.actual)
+        for human in Human.objects.annotate(actual=Count("cats")):
+            self.assertEqual(human.cat_count, human.actual)
+        for breed in Breed.objects.annotate(actual=Count("cats")):
+            self.assertEqual(breed.cat_count, breed.actual)
+        for cat in Cat.objects.select_related("owner__home"):
+            self.assertEqual(cat.home_id, cat.owner.home_id)
+            self.assertEqual(cat.home_name, cat.owner.home.name)
+        # Popular breeds and cat owners.
+        counts = sorted(Breed.objects.values_list("cat_count", flat=True))
+        self.assertGreater(counts[-1], counts[len(counts) // 2] * 4)
+        self.assertGreater(max(Human.objects.values_list("cat_count", flat=True)), 5)
+
+
+class BenchmarkCommandTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def benchmark(self, **options):
+        stdout = StringIO()
+        call_command(
+            "benchmark", cats=40, iterations=2, warmup=0, stdout=stdout, **options
+        )
+        return stdout.getvalue()
+
+    def test_results(self):
+        path = os.path.join(self.directory, "results.json")
+        output = self.benchmark(output=path, viewsets=["cat", "breed"])
+        self.assertIn("cat.list", output)
+        with open(path) as results_file:
+            results = json.load(results_file)
+        self.assertEqual(results["dataset"]["cats"], 40)
+        self.assertEqual(
+            sorted(results["scenarios"]),
+            [
+                "breed.create",
+                "breed.list",
+                "breed.retrieve",
+                "breed.token_auth",
+                "cat.create",
+                "cat.list",
+                "cat.retrieve",
+                "cat.token_auth",
+            ],
+        )
+        for result in results["scenarios"].values():
+            self.assertEqual(result["errors"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["peak_memory"], 0)
+        self.assertEqual(results["scenarios"]["cat.token_auth"]["queries"], 1)
+        # The dataset was rolled back.
+        self.assertFalse(Cat.objects.exists())
+
+        output = self.benchmark(baseline=path, threshold=100, viewsets=["cat"])
+        self.assertIn("No regression.", output)
+
+        results["scenarios"]["cat.list"]["queries"] = 0
+        with open(path, "w") as results_file:
+            json.dump(results, results_file)
+        with self.assertRaisesMessage(CommandError, "cat.list: queries went from 0"):
+            self.benchmark(baseline=path, threshold=100, viewsets=["cat"])
+
+    def test_baseline_of_another_size(self):
+        path = os.path.join(self.directory, "results.json")
+        with open(path, "w") as results_file:
+            json.dump({"dataset": {"cats": 1000}, "scenarios": {}}, results_file)
+        with self.assertRaisesMessage(CommandError, "measured on 1000 cats"):
+            self.benchmark(baseline=path)
+
+
+class ResultsTestCase(SimpleTestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1k"), 1000)
+        self.assertEqual(parse_size("1M"), 1000000)
+        self.assertEqual(parse_size("250"), 250)
+        with self.assertRaises(ValueError):
+            parse_size("0")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_compare_results(self):
+        def results(p50, queries, memory):
+            return {
+                "scenarios": {
+                    "cat.list": {
+                        "p50_ms": p50,
+                        "p90_ms": p50,
+                        "queries": queries,
+                        "peak_memory": memory,
+                    }
+                }
+            }
+
+        baseline = results(10.0, 2, 1000)
+        self.assertEqual(compare_results(baseline, results(11.0, 2, 1100)), [])
+        # Too small to be told from noise.
+        self.assertEqual(
+            compare_results(results(1.0, 2, 1000), results(1.5, 2, 1000)), []
+        )
+        self.assertEqual(
+            compare_results(baseline, results(20.0, 3, 2000)),
+            [
+                "cat.list: p50_ms went from 10.00 to 20.00",
+                "cat.list: p90_ms went from 10.00 to 20.00",
+                "cat.list: queries went from 2 to 3",
+                "cat.list: peak memory went from 1000 to 2000 bytes",
+            ],
+        )
@@ -4,7 +4,7 @@ from django.urls import reverse
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory
 
-from ..models import Breed
+from ..models import Breed, Cat, Home, Human
 from ..serializers import BreedSerializer
 from ..views import BreedViewSet
 
@@ -67,3 +67,17 @@ class BreedSerializerTestCase(TestCase):
         db_breed = Breed.objects.get(id=created_breed.id)
         # Assert if created data matches correctly
         self.assertDictContainsSubset(data, db_breed.__dict__)
+
+    def test_serializer_homes(self):
+        home = Home.objects.create(name="My Home", address="My Address")
+        office = Home.objects.create(name="Office", address="Wisma Goshen")
+        for name, house in (("Kitty", home), ("Summer", office)):
+            owner = Human.objects.create(name=name, gender="F", home=house)
+            Cat.objects.create(name=name, gender="M", breed=self.bobtail, owner=owner)
+        # Cats and their homes are resolved with a single joined query
+        with self.assertNumQueries(1):
+            data = BreedSerializer(self.bobtail, context={"request": self.request}).data
+        self.assertEqual(
+            sorted(data["homes"]),
+            ["Cat: Kitty, Home: My Home", "Cat: Summer, Home: Office"],
+        )
@@ -0,0 +1,214 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from catapp import views
+
+from .. import serializers
+from ..models import Breed, Cat, Home, Human
+from ..serializers import CatSerializer
+
+
+class BulkViewSetTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.breed, owner=self.owner
+        )
+        self.summer = Cat.objects.create(
+            name="Summer", gender="F", breed=self.breed, owner=self.owner
+        )
+        # Build test server url
+        self.owner_url = "http://testserver{path}{id}/".format(
+            path=reverse("human-list"), id=self.owner.id
+        )
+        self.breed_url = "http://testserver{path}{id}/".format(
+            path=reverse("breed-list"), id=self.breed.id
+        )
+
+    def request(self, method, action, data):
+        view = views.CatViewSet.as_view(actions={method: action})
+        request = getattr(self.factory, method)(
+            "/cat/",
+            data=data,
+            format="json",
+            HTTP_AUTHORIZATION="Token {}".format(self.token.key),
+        )
+        return view(request)
+
+    def test_bulk_create(self):
+        data = [
+            {
+                "name": "Cat %d" % index,
+                "gender": "M",
+                "breed": self.breed_url,
+                "owner": self.owner_url,
+            }
+            for index in range(20)
+        ]
+        serializer = CatSerializer(
+            data=data, many=True, context={"request": self.factory.get("/cat/")}
+        )
+        # Hyperlinks are resolved with one query per related model
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+        response = self.request("post", "create", data)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(Cat.objects.filter(name__startswith="Cat ").count(), 20)
+        self.assertTrue(all(row["id"] for row in response.data))
+
+    def test_bulk_create_returning_ids(self):
+        # The bulk_create() path of databases returning the new primary keys
+        # (PostgreSQL). SQLite does not, so the keys are handed out up front.
+        bulk_create = type(Cat.objects).bulk_create
+        next_id = Cat.objects.order_by("-pk").first().pk + 1
+
+        def bulk_create_returning_ids(queryset, objs, *args, **kwargs):
+            for pk, obj in enumerate(objs, next_id):
+                obj.pk = pk
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        features = mock.Mock(can_return_ids_from_bulk_insert=True)
+        hooks = {
+            name: mock.patch.object(serializers, name, wraps=getattr(serializers, name))
+            for name in (
+                "prepare_bulk_write",
+                "count_bulk_write",
+                "finish_bulk_write",
+                "replicate_bulk_write",
+                "bump_model_version",
+            )
+        }
+        data = [
+            {
+                "name": "Cat %d" % index,
+                "gender": "M",
+                "breed": self.breed_url,
+                "owner": self.owner_url,
+            }
+            for index in range(3)
+        ]
+        with mock.patch.object(
+            serializers, "connection", mock.Mock(features=features)
+        ), mock.patch.object(
+            type(Cat.objects), "bulk_create", bulk_create_returning_ids
+        ), mock.patch.object(
+            Cat, "save", side_effect=AssertionError("saved one by one")
+        ):
+            called = {name: hook.start() for name, hook in hooks.items()}
+            try:
+                response = self.request("post", "create", data)
+            finally:
+                for hook in hooks.values():
+                    hook.stop()
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = [row["id"] for row in response.data]
+        self.assertEqual(ids, list(range(next_id, next_id + 3)))
+        self.assertEqual(
+            list(
+                Cat.objects.filter(pk__in=ids)
+                .order_by("pk")
+                .values_list("name", "home_id", "home_name")
+            ),
+            [("Cat %d" % index, self.home.id, "My Home") for index in range(3)],
+        )
+        self.assertEqual(Breed.objects.get(pk=self.breed.pk).cat_count, 5)
+        self.assertEqual(Human.objects.get(pk=self.owner.pk).cat_count, 5)
+        for hook in called.values():
+            hook.assert_called_once()
+        called["bump_model_version"].assert_called_once_with(Cat)
+
+    def test_bulk_create_invalid_row(self):
+        data = [
+            {
+                "name": "Valid",
+                "gender": "M",
+                "breed": self.breed_url,
+                "owner": self.owner_url,
+            },
+            {
+                "name": "Invalid",
+                "gender": "M",
+                "breed": self.breed_url + "999/",
+                "owner": self.owner_url,
+            },
+            {
+                "name": "Missing",
+                "gender": "M",
+                "breed": "http://testserver/breed/999/",
+                "owner": self.owner_url,
+            },
+        ]
+        response = self.request("post", "create", data)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1]["breed"][0].code, "no_match")
+        self.assertEqual(response.data[2]["breed"][0].code, "does_not_exist")
+        # Nothing is written when a single row is invalid
+        self.assertEqual(Cat.objects.count(), 2)
+
+    def test_bulk_partial_update(self):
+        data = [
+            {"id": self.kitty.id, "name": "Kitty Edited"},
+            {"id": self.summer.id, "description": "Edited."},
+        ]
+        response = self.request("patch", "partial_bulk_update", data)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.kitty.refresh_from_db()
+        self.summer.refresh_from_db()
+        self.assertEqual(self.kitty.name, "Kitty Edited")
+        self.assertEqual(self.summer.name, "Summer")
+        self.assertEqual(self.summer.description, "Edited.")
+
+    def test_bulk_update_unknown_id(self):
+        data = [{"id": -2, "name": "Ghost", "gender": "M"}]
+        response = self.request("put", "bulk_update", data)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", response.data)
+
+    def test_bulk_destroy(self):
+        response = self.request(
+            "delete", "bulk_destroy", [self.kitty.id, self.summer.id]
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Cat.objects.exists())
+
+    def test_bulk_size_limit(self):
+        view = views.CatViewSet
+        self.addCleanup(setattr, view, "bulk_max_size", view.bulk_max_size)
+        view.bulk_max_size = 1
+        response = self.request(
+            "delete", "bulk_destroy", [self.kitty.id, self.summer.id]
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Cat.objects.count(), 2)
+
+    def test_router_maps_bulk_actions(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        response = client.patch(
+            reverse("cat-list"),
+            [{"id": self.kitty.id, "name": "Routed"}],
+            format="json",
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Cat.objects.get(pk=self.kitty.id).name, "Routed")
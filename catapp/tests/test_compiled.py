@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_cache
+from ..compiled import get_compiled_serializer
+from ..models import Breed, Cat, Home, Human
+from ..serializers import (
+    BreedSerializer,
+    CatSerializer,
+    HomeSerializer,
+    HumanSerializer,
+)
+
+
+class CompiledParityTestCase(TestCase):
+    """
+    The compiled list path must render exactly the same bytes as the
+    serializers.
+    """
+
+    urls = (
+        "/home/",
+        "/human/",
+        "/breed/",
+        "/cat/",
+        "/cat.json",
+        "/human/?fields=url,cats,date_of_birth",
+        "/breed/?exclude=homes",
+        "/cat/?gender=F&fields=id,home,owner",
+        "/human/?page_size=2",
+        "/breed/?page_size=1&ordering=-cat_count",
+        "/cat/?page_size=2&ordering=-date_of_birth",
+        "/home/?type=CONDO",
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        homes = [
+            Home.objects.create(name="My Home", address="My Address"),
+            Home.objects.create(name="Office", address="Wisma Goshen", type=Home.CONDO),
+        ]
+        breeds = [
+            Breed.objects.create(name="Persian", origin="Europe", description="Fluffy"),
+            Breed.objects.create(name="Bobtail", origin="Japan"),
+        ]
+        for index in range(4):
+            human = Human.objects.create(
+                name="Human %d" % index,
+                gender="MF"[index % 2],
+                date_of_birth="199%d-01-24" % index if index else None,
+                home=homes[index % 2],
+            )
+            for number in range(index):
+                Cat.objects.create(
+                    name="Cat %d.%d" % (index, number),
+                    gender="FM"[number % 2],
+                    date_of_birth="201%d-06-0%d" % (number, index) if number else None,
+                    description='Ünïcode "quoted"',
+                    breed=breeds[number % 2],
+                    owner=human,
+                )
+
+    def get(self, url):
+        get_cache().clear()
+        return self.client.get(url)
+
+    def test_parity(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                expected = self.get(url)
+                with override_settings(COMPILED_LIST_SERIALIZERS=True):
+                    compiled = self.get(url)
+                self.assertEqual(compiled.status_code, expected.status_code)
+                self.assertEqual(compiled.content, expected.content)
+
+    def test_invalid_parameters(self):
+        with override_settings(COMPILED_LIST_SERIALIZERS=True):
+            # Check status code
+            self.assertEqual(self.get("/cat/?fields=colour").status_code, 400)
+            self.assertEqual(
+                self.get("/cat/?page_size=1&ordering=name").status_code, 400
+            )
+
+    def test_compiles(self):
+        for serializer_class in (
+            HomeSerializer,
+            HumanSerializer,
+            BreedSerializer,
+            CatSerializer,
+        ):
+            self.assertIsNotNone(get_compiled_serializer(serializer_class))
+
+    def test_queries(self):
+        with override_settings(COMPILED_LIST_SERIALIZERS=True):
+            self.get("/human/")
+            # Validators, the humans and their cats
+            with self.assertNumQueries(3):
+                self.get("/human/")
+
+    def test_unsupported_fields(self):
+        class MethodCatSerializer(CatSerializer):
+            age = serializers.SerializerMethodField()
+
+            class Meta(CatSerializer.Meta):
+                fields = CatSerializer.Meta.fields + ("age",)
+
+            def get_age(self, obj):
+                return None
+
+        self.assertIsNone(get_compiled_serializer(MethodCatSerializer))
+        self.assertIsNotNone(
+            get_compiled_serializer(MethodCatSerializer, frozenset(["id"]))
+        )
+
+
+class BenchmarkCommandTestCase(TestCase):
+    def test_benchmark(self):
+        stdout = StringIO()
+        call_command("benchmark_list_serializers", cats=20, repeat=1, stdout=stdout)
+        self.assertEqual(stdout.getvalue().count("identical"), 4)
+        # The test rows are rolled back
+        self.assertFalse(Cat.objects.exists())
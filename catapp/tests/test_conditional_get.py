@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..models import Breed, Cat, Home, Human
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.breed, owner=self.owner
+        )
+        self.summer = Cat.objects.create(
+            name="Summer", gender="F", breed=self.breed, owner=self.owner
+        )
+
+    def revalidate(self, url, response):
+        cache.clear()
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_not_modified(self):
+        url = reverse("cat-detail", args=[self.kitty.id])
+        response = self.client.get(url)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        cache.clear()
+        # A single aggregate query, nothing is loaded or serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_if_modified_since(self):
+        url = reverse("breed-list")
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_modified_from_response_cache(self):
+        url = reverse("cat-list")
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_changes_etag(self):
+        url = reverse("cat-detail", args=[self.kitty.id])
+        response = self.client.get(url)
+        self.kitty.name = "Kitty Edited"
+        self.kitty.save()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_related_update_changes_etag(self):
+        # The cat list shows the owner's home name
+        url = reverse("cat-list")
+        response = self.client.get(url)
+        self.home.name = "New Home"
+        self.home.save()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_delete_changes_etag(self):
+        url = reverse("human-list")
+        response = self.client.get(url)
+        self.summer.delete()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_update_changes_etag(self):
+        url = reverse("cat-list")
+        response = self.client.get(url)
+        self.client.patch(url, [{"id": self.kitty.id, "name": "Bulk"}], format="json")
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_format_changes_etag(self):
+        url = reverse("cat-detail", args=[self.kitty.id])
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_ACCEPT="application/x-ndjson", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_object(self):
+        response = self.client.get(reverse("cat-detail", args=[-2]))
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
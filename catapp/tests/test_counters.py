@@ -0,0 +1,131 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..models import Breed, Cat, Home, Human
+
+
+class CounterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.office = Home.objects.create(name="Office", address="Wisma Goshen")
+        self.john = Human.objects.create(name="John", gender="M", home=self.home)
+        self.jane = Human.objects.create(name="Jane", gender="F", home=self.home)
+        self.persian = Breed.objects.create(name="Persian", origin="Europe")
+        self.bobtail = Breed.objects.create(name="Bobtail", origin="Japan")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.persian, owner=self.john
+        )
+
+    def assertCounts(self, **expected):
+        rows = {
+            "persian": (Breed, self.persian, "cat_count"),
+            "bobtail": (Breed, self.bobtail, "cat_count"),
+            "john": (Human, self.john, "cat_count"),
+            "jane": (Human, self.jane, "cat_count"),
+            "home": (Home, self.home, "human_count"),
+            "office": (Home, self.office, "human_count"),
+        }
+        counts = {}
+        for name in expected:
+            model, instance, field = rows[name]
+            counts[name] = getattr(model.objects.get(pk=instance.pk), field)
+        self.assertEqual(counts, expected)
+
+    def test_create(self):
+        self.assertCounts(persian=1, bobtail=0, john=1, jane=0, home=2, office=0)
+
+    def test_reassign(self):
+        self.kitty.breed = self.bobtail
+        self.kitty.owner = self.jane
+        self.kitty.save()
+        self.jane.home = self.office
+        self.jane.save()
+        self.assertCounts(persian=0, bobtail=1, john=0, jane=1, home=1, office=1)
+
+    def test_delete(self):
+        self.kitty.delete()
+        self.assertCounts(persian=0, john=0)
+        self.jane.delete()
+        self.assertCounts(home=1)
+
+    def test_bulk_writes(self):
+        breed_url = "/breed/{}/".format(self.bobtail.id)
+        owner_url = "/human/{}/".format(self.jane.id)
+        response = self.client.post(
+            "/cat/",
+            [
+                {"name": name, "gender": "F", "breed": breed_url, "owner": owner_url}
+                for name in ("Summer", "Tiger")
+            ],
+            format="json",
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCounts(persian=1, bobtail=2, john=1, jane=2)
+
+        response = self.client.patch(
+            "/cat/", [{"id": self.kitty.id, "owner": owner_url}], format="json"
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounts(john=0, jane=3)
+
+        ids = list(Cat.objects.filter(owner=self.jane).values_list("id", flat=True))
+        response = self.client.delete("/cat/", ids, format="json")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertCounts(persian=0, bobtail=0, john=0, jane=0)
+
+    def test_serialized_and_orderable(self):
+        Cat.objects.create(
+            name="Summer", gender="F", breed=self.bobtail, owner=self.jane
+        )
+        Cat.objects.create(
+            name="Tiger", gender="M", breed=self.bobtail, owner=self.jane
+        )
+        response = self.client.get("/breed/?page_size=10&ordering=-cat_count")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (breed["name"], breed["cat_count"])
+                for breed in response.json()["results"]
+            ],
+            [("Bobtail", 2), ("Persian", 1)],
+        )
+        response = self.client.get("/home/{}/".format(self.home.id))
+        self.assertEqual(response.json()["human_count"], 2)
+
+        # Unpaginated lists are ordered too
+        for url in (
+            "/breed/?ordering=-cat_count",
+            "/breed/?ordering=-cat_count&stream=1",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [breed["name"] for breed in json.loads(b"".join(response))],
+                ["Bobtail", "Persian"],
+            )
+        response = self.client.get("/breed/?ordering=description")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_repair_counters(self):
+        Breed.objects.filter(pk=self.persian.pk).update(cat_count=7)
+        Home.objects.filter(pk=self.office.pk).update(human_count=3)
+        stdout = StringIO()
+        call_command("repair_counters", batch_size=1, stdout=stdout)
+        self.assertIn("Breed.cat_count: fixed 1 rows", stdout.getvalue())
+        self.assertIn("Home.human_count: fixed 1 rows", stdout.getvalue())
+        self.assertCounts(persian=1, office=0)
@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..models import Breed, Cat, Home, Human
+
+
+class CatHomeTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.office = Home.objects.create(name="Office", address="Wisma Goshen")
+        self.john = Human.objects.create(name="John", gender="M", home=self.home)
+        self.jane = Human.objects.create(name="Jane", gender="F", home=self.office)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.breed, owner=self.john
+        )
+
+    def assertHome(self, cat, home):
+        cat.refresh_from_db()
+        self.assertEqual(cat.home_id, home.id)
+        self.assertEqual(cat.home_name, home.name)
+
+    def test_create(self):
+        self.assertHome(self.kitty, self.home)
+
+    def test_owner_change(self):
+        self.kitty.owner = self.jane
+        self.kitty.save()
+        self.assertHome(self.kitty, self.office)
+
+    def test_owner_moves(self):
+        self.john.home = self.office
+        self.john.save()
+        self.assertHome(self.kitty, self.office)
+
+    def test_home_renamed(self):
+        self.home.name = "Old Home"
+        self.home.save()
+        self.assertHome(self.kitty, self.home)
+
+    def test_bulk_writes(self):
+        response = self.client.post(
+            "/cat/",
+            [
+                {
+                    "name": "Summer",
+                    "gender": "F",
+                    "breed": "/breed/{}/".format(self.breed.id),
+                    "owner": "/human/{}/".format(self.jane.id),
+                }
+            ],
+            format="json",
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data[0]["home"], "Office")
+
+        response = self.client.patch(
+            "/human/",
+            [{"id": self.john.id, "home": "/home/{}/".format(self.office.id)}],
+            format="json",
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertHome(self.kitty, self.office)
+
+    def test_cat_list_skips_humans(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/cat/?home={}".format(self.home.id))
+        self.assertEqual(response.json()[0]["home"], "My Home")
+        # The token, the validators and the list, none of which join humans
+        self.assertEqual(len(context.captured_queries), 3)
+        for query in context.captured_queries[1:]:
+            self.assertNotIn("catapp_human", query["sql"])
+
+    def test_check_cat_homes(self):
+        stdout = StringIO()
+        call_command("check_cat_homes", stdout=stdout)
+        self.assertIn("consistent", stdout.getvalue())
+
+        Cat.objects.filter(pk=self.kitty.pk).update(home=self.office)
+        with self.assertRaises(CommandError):
+            call_command("check_cat_homes", stdout=StringIO())
+
+        call_command("check_cat_homes", fix=True, batch_size=1, stdout=stdout)
+        self.assertIn("Fixed 1 cats.", stdout.getvalue())
+        self.assertHome(self.kitty, self.home)
@@ -0,0 +1,107 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..models import Breed, Cat, Home, Human
+from ..pagination import get_indexed_fields
+
+
+class IndexedFilterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.office = Home.objects.create(
+            name="Office", address="Wisma Goshen", type=Home.CONDO
+        )
+        self.john = Human.objects.create(
+            name="John", gender="M", date_of_birth="1992-01-24", home=self.home
+        )
+        self.jane = Human.objects.create(
+            name="Jane", gender="F", date_of_birth="1996-12-24", home=self.office
+        )
+        self.persian = Breed.objects.create(name="Persian", origin="Europe")
+        self.bobtail = Breed.objects.create(name="Bobtail", origin="Japan")
+        self.kitty = Cat.objects.create(
+            name="Kitty",
+            gender="M",
+            date_of_birth="2016-01-24",
+            breed=self.persian,
+            owner=self.john,
+        )
+        self.summer = Cat.objects.create(
+            name="Summer",
+            gender="F",
+            date_of_birth="2012-12-24",
+            breed=self.persian,
+            owner=self.jane,
+        )
+        self.tiger = Cat.objects.create(
+            name="Tiger",
+            gender="M",
+            date_of_birth="2018-06-01",
+            breed=self.bobtail,
+            owner=self.jane,
+        )
+
+    def get(self, viewset, url):
+        view = viewset.as_view(actions={"get": "list"})
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        return view(request)
+
+    def get_names(self, viewset, url):
+        response = self.get(viewset, url)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(row["name"] for row in response.data)
+
+    def test_cat_filters(self):
+        url = "/cat/?breed={}&owner__home={}&date_of_birth__gt=2015-01-01".format(
+            self.persian.id, self.home.id
+        )
+        self.assertEqual(self.get_names(views.CatViewSet, url), ["Kitty"])
+        url = "/cat/?breed__in={},{}&gender=M".format(self.persian.id, self.bobtail.id)
+        self.assertEqual(self.get_names(views.CatViewSet, url), ["Kitty", "Tiger"])
+        url = "/cat/?owner={}&date_of_birth__lte=2016-01-24".format(self.jane.id)
+        self.assertEqual(self.get_names(views.CatViewSet, url), ["Summer"])
+
+    def test_human_and_home_filters(self):
+        url = "/human/?home={}".format(self.office.id)
+        self.assertEqual(self.get_names(views.HumanViewSet, url), ["Jane"])
+        url = "/home/?type={}".format(Home.CONDO)
+        self.assertEqual(self.get_names(views.HomeViewSet, url), ["Office"])
+
+    def test_filters_combine_with_other_parameters(self):
+        url = "/cat/?gender=F&fields=name&page_size=10"
+        response = self.get(views.CatViewSet, url)
+        self.assertEqual(response.data["results"], [{"name": "Summer"}])
+
+    def test_unsupported_filter_rejected(self):
+        for url in ("/cat/?name=Kitty", "/cat/?gender__in=M", "/breed/?origin=Japan"):
+            with self.subTest(url=url):
+                viewset = views.BreedViewSet if "breed" in url else views.CatViewSet
+                response = self.get(viewset, url)
+                # Check status code
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_value_rejected(self):
+        response = self.get(views.CatViewSet, "/cat/?date_of_birth__gte=yesterday")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("date_of_birth__gte", response.data)
+
+    def test_filter_fields_are_indexed(self):
+        for viewset in (views.HomeViewSet, views.HumanViewSet, views.CatViewSet):
+            for path in viewset.filter_fields:
+                model = viewset.queryset.model
+                for name in path.split("__"):
+                    with self.subTest(viewset=viewset.__name__, path=path):
+                        self.assertIn(name, get_indexed_fields(model))
+                    model = model._meta.get_field(name).related_model
@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ..models import Breed, Cat, Home, Human
+
+
+class ImportCatDBTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as target:
+            target.write(content)
+        return path
+
+    def import_files(self, **options):
+        stdout = StringIO()
+        call_command("import_catdb", stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_import_with_natural_keys(self):
+        breeds = self.write(
+            "breeds.csv",
+            "name,origin,description\nPersian,Europe,Fluffy\nBobtail,Japan,\n",
+        )
+        homes = self.write(
+            "homes.ndjson",
+            '{"name": "My Home", "address": "My Address"}\n'
+            '{"name": "Office", "address": "Wisma Goshen", "type": "CONDO"}\n',
+        )
+        humans = self.write(
+            "humans.csv",
+            "name,gender,date_of_birth,home_name,home_address\n"
+            "John,M,1992-01-24,My Home,My Address\n"
+            "Jane,F,,Office,Wisma Goshen\n",
+        )
+        cats = self.write(
+            "cats.ndjson",
+            "\n".join(
+                json.dumps(row)
+                for row in (
+                    {
+                        "name": "Kitty",
+                        "gender": "M",
+                        "breed": "Persian",
+                        "owner_name": "John",
+                        "home_name": "My Home",
+                        "home_address": "My Address",
+                    },
+                    {
+                        "name": "Summer",
+                        "gender": "F",
+                        "breed": "Bobtail",
+                        "owner_name": "Jane",
+                        "home_name": "Office",
+                        "home_address": "Wisma Goshen",
+                    },
+                )
+            ),
+        )
+        output = self.import_files(
+            breeds=breeds, homes=homes, humans=humans, cats=cats, batch_size=1
+        )
+        self.assertIn("rows/s", output)
+        self.assertEqual(Home.objects.get(name="Office").type, Home.CONDO)
+        self.assertIsNone(Human.objects.get(name="Jane").date_of_birth)
+        kitty = Cat.objects.get(name="Kitty")
+        self.assertEqual(kitty.breed.name, "Persian")
+        self.assertEqual(kitty.owner.home.name, "My Home")
+        # The denormalized home is copied from the owner
+        self.assertEqual(kitty.home_id, kitty.owner.home_id)
+        self.assertEqual(kitty.home_name, "My Home")
+        self.assertEqual(Cat.objects.get(name="Summer").owner.name, "Jane")
+        # Progress files are removed once the whole run is imported
+        for path in (breeds, homes, humans, cats):
+            self.assertFalse(os.path.exists(path + ".progress"))
+
+    def test_unknown_breed(self):
+        cats = self.write("cats.csv", "name,gender,breed,owner_id\nKitty,M,Siamese,1\n")
+        with self.assertRaisesMessage(CommandError, "Line 2: unknown breed 'Siamese'"):
+            self.import_files(cats=cats)
+
+    @override_settings(DATABASE_SHARDS=("default", "shard1"))
+    def test_sharding_is_refused(self):
+        breeds = self.write("breeds.csv", "name,origin\nPersian,Europe\n")
+        with self.assertRaisesMessage(CommandError, "DATABASE_SHARDS"):
+            self.import_files(breeds=breeds)
+        self.assertFalse(Breed.objects.exists())
+
+    def test_invalid_choice(self):
+        homes = self.write(
+            "homes.csv", "name,address,type\nGarden,Happy Garden,BLABLA\n"
+        )
+        with self.assertRaisesMessage(CommandError, "Line 2: type:"):
+            self.import_files(homes=homes)
+
+    def test_resume(self):
+        breeds = self.write(
+            "breeds.csv", "name,origin\nPersian,Europe\nBobtail,Japan\n"
+        )
+        # An interrupted import already committed the first batch
+        Breed.objects.create(name="Persian", origin="Europe")
+        self.write("breeds.csv.progress", json.dumps({"rows": 1}))
+        output = self.import_files(breeds=breeds, resume=True)
+        self.assertIn("Resuming", output)
+        self.assertEqual(
+            sorted(Breed.objects.values_list("name", flat=True)), ["Bobtail", "Persian"]
+        )
+
+    def test_resume_skips_imported_files(self):
+        breeds = self.write("breeds.csv", "name,origin\nPersian,Europe\n")
+        homes = self.write("homes.csv", "name,address\nMy Home,My Address\n")
+        humans = self.write(
+            "humans.csv",
+            "name,gender,home_name,home_address\nJohn,M,My Home,My Address\n",
+        )
+        # A run interrupted after the breeds and homes
+        self.import_files(breeds=breeds, homes=homes)
+        for path in (breeds, homes):
+            self.write(
+                os.path.basename(path) + ".progress",
+                json.dumps({"rows": 1, "complete": True}),
+            )
+        output = self.import_files(
+            breeds=breeds, homes=homes, humans=humans, resume=True
+        )
+        self.assertIn("Skipping %s" % breeds, output)
+        self.assertEqual(Breed.objects.count(), 1)
+        self.assertEqual(Home.objects.count(), 1)
+        self.assertEqual(Human.objects.get().home.name, "My Home")
+        self.assertFalse(os.path.exists(breeds + ".progress"))
+
+    def test_interrupted_run_keeps_finished_files(self):
+        breeds = self.write("breeds.csv", "name,origin\nPersian,Europe\n")
+        cats = self.write("cats.csv", "name,gender,breed,owner_id\nKitty,M,Persian,1\n")
+        with self.assertRaises(CommandError):
+            self.import_files(breeds=breeds, cats=cats)
+        with open(breeds + ".progress") as progress:
+            self.assertEqual(json.load(progress), {"rows": 1, "complete": True})
+        self.assertFalse(os.path.exists(cats + ".progress"))
+
+    def test_ambiguous_natural_keys(self):
+        Breed.objects.create(name="Persian", origin="Europe")
+        Breed.objects.create(name="Persian", origin="Iran")
+        cats = self.write("cats.csv", "name,gender,breed,owner_id\nKitty,M,Persian,1\n")
+        with self.assertRaisesMessage(CommandError, "Line 2: several breeds 'Persian'"):
+            self.import_files(cats=cats)
+
+        Home.objects.create(name="My Home", address="My Address")
+        Home.objects.create(name="My Home", address="My Address")
+        humans = self.write(
+            "humans.csv",
+            "name,gender,home_name,home_address\nJohn,M,My Home,My Address\n",
+        )
+        with self.assertRaisesMessage(
+            CommandError, "Line 2: several homes 'My Home' at 'My Address'"
+        ):
+            self.import_files(humans=humans)
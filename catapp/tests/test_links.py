@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_cache
+from ..links import build_url, get_url_template
+from ..models import Breed, Cat, Home, Human
+
+
+class LinkModeTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.breed, owner=self.owner
+        )
+        get_cache().clear()
+
+    def test_url_mode(self):
+        response = self.client.get("/cat/%d/" % self.kitty.pk)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["url"], "http://testserver/cat/%d/" % self.kitty.pk
+        )
+        self.assertEqual(
+            response.data["owner"], "http://testserver/human/%d/" % self.owner.pk
+        )
+
+    def test_query_param(self):
+        response = self.client.get("/cat/%d/?links=id" % self.kitty.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["url"], self.kitty.pk)
+        self.assertEqual(response.data["breed"], self.breed.pk)
+        self.assertEqual(response.data["owner"], self.owner.pk)
+
+        response = self.client.get("/human/?links=id")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["home"], self.home.pk)
+        self.assertEqual(response.data[0]["cats"], [self.kitty.pk])
+
+    def test_accept_header(self):
+        response = self.client.get("/cat/", HTTP_ACCEPT="application/json; links=id")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["owner"], self.owner.pk)
+        # The cached url-mode response is not served to id-mode requests
+        response = self.client.get("/cat/")
+        self.assertEqual(
+            response.data[0]["owner"],
+            "http://testserver/human/%d/" % self.owner.pk,
+        )
+
+    def test_unknown_mode(self):
+        response = self.client.get("/cat/%d/?links=uuid" % self.kitty.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["owner"], "http://testserver/human/%d/" % self.owner.pk
+        )
+
+    @override_settings(COMPILED_LIST_SERIALIZERS=True)
+    def test_compiled_parity(self):
+        for url in ("/cat/?links=id", "/human/?links=id", "/breed/?links=id"):
+            with self.subTest(url=url):
+                with override_settings(COMPILED_LIST_SERIALIZERS=False):
+                    expected = self.client.get(url)
+                get_cache().clear()
+                compiled = self.client.get(url)
+                get_cache().clear()
+                self.assertEqual(compiled.content, expected.content)
+
+    def test_write_raw_ids(self):
+        data = {
+            "name": "Tom",
+            "gender": "M",
+            "breed": self.breed.pk,
+            "owner": self.owner.pk,
+        }
+        response = self.client.post("/cat/?links=id", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["owner"], self.owner.pk)
+        tom = Cat.objects.get(name="Tom")
+        self.assertEqual(tom.owner, self.owner)
+
+        # Hyperlinks are still accepted
+        data["name"] = "Jerry"
+        data["owner"] = "http://testserver/human/%d/" % self.owner.pk
+        response = self.client.post("/cat/?links=id", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data["owner"] = self.owner.pk + 100
+        response = self.client.post("/cat/?links=id", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Raw ids are rejected in the url mode
+        data["owner"] = self.owner.pk
+        response = self.client.post("/cat/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_write_raw_ids(self):
+        data = [
+            {
+                "name": name,
+                "gender": "F",
+                "breed": self.breed.pk,
+                "owner": self.owner.pk,
+            }
+            for name in ("Tom", "Jerry")
+        ]
+        response = self.client.post("/cat/?links=id", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.owner.cats.count(), 3)
+
+    def test_build_url(self):
+        template = get_url_template("breed-detail", "pk", None)
+        self.assertEqual(template, ("/breed/", "/"))
+        self.assertEqual(build_url(template, 12), "/breed/12/")
+        self.assertEqual(build_url(template, "a b"), "/breed/a%20b/")
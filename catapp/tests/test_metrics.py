@@ -0,0 +1,120 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_cache
+from ..metrics import MetricsRegistry, registry
+from ..models import Breed, Cat, Home, Human
+
+
+def parse_server_timing(header):
+    phases = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        phases[name] = dict(param.split("=", 1) for param in params)
+    return phases
+
+
+class ServerTimingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        for name in ("Kitty", "Tom"):
+            Cat.objects.create(
+                name=name, gender="M", breed=self.breed, owner=self.owner
+            )
+        get_cache().clear()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_header(self):
+        response = self.client.get("/cat/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = parse_server_timing(response["Server-Timing"])
+        self.assertEqual(
+            set(phases), {"auth", "db", "serialize", "render", "view", "total"}
+        )
+        for params in phases.values():
+            self.assertGreaterEqual(float(params["dur"]), 0)
+        self.assertRegex(phases["db"]["desc"], r'^"\d+ queries"$')
+        self.assertGreaterEqual(
+            float(phases["total"]["dur"]), float(phases["view"]["dur"])
+        )
+
+    def test_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/cat/")
+        phases = parse_server_timing(response["Server-Timing"])
+        self.assertEqual(phases["db"]["desc"], '"3 queries"')
+
+    @override_settings(COMPILED_LIST_SERIALIZERS=True)
+    def test_compiled_list(self):
+        response = self.client.get("/cat/")
+        self.assertIn("serialize", parse_server_timing(response["Server-Timing"]))
+
+    @override_settings(PERFORMANCE_METRICS=False)
+    def test_disabled(self):
+        response = self.client.get("/cat/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn("cat-list", registry.render())
+
+    def test_metrics_endpoint(self):
+        self.client.get("/cat/")
+        self.client.get("/cat/")
+        self.client.get("/cat/%d/" % Cat.objects.first().pk)
+        self.client.get("/cat/0/")
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        text = response.content.decode()
+        self.assertIn(
+            'catapp_request_duration_seconds_count{endpoint="cat-list",method="GET"} 2',
+            text,
+        )
+        self.assertIn(
+            'catapp_request_duration_seconds_bucket{endpoint="cat-list",le="+Inf",'
+            'method="GET"} 2',
+            text,
+        )
+        self.assertIn(
+            'catapp_requests_total{endpoint="cat-detail",method="GET",status="404"} 1',
+            text,
+        )
+        self.assertRegex(
+            text,
+            r'catapp_request_phase_seconds_total\{endpoint="cat-list",method="GET",'
+            r'phase="render"\} [0-9.e-]+',
+        )
+
+
+class MetricsRegistryTestCase(SimpleTestCase):
+    def test_histogram(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+        for duration in (0.05, 0.1, 0.5, 2.0):
+            metrics.observe("cat-list", "GET", 200, duration, {"db": (0.01, 3)})
+        lines = metrics.render().splitlines()
+        values = [
+            line.rsplit(" ", 1)[1]
+            for line in lines
+            if line.startswith("catapp_request_duration_seconds")
+        ]
+        self.assertEqual(values[:3] + values[4:], ["2", "3", "4", "4"])
+        self.assertAlmostEqual(float(values[3]), 2.65)
+        self.assertIn(
+            'catapp_db_queries_total{endpoint="cat-list",method="GET"} 12', lines
+        )
+
+    def test_label_escaping(self):
+        metrics = MetricsRegistry()
+        metrics.observe('a"b', "GET", 200, 0.1, {})
+        self.assertIn('endpoint="a\\"b"', metrics.render())
@@ -0,0 +1,146 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..models import Home, Human
+from .utils import QueryBudgetMixin
+
+
+class KeysetPaginationTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.view = views.HomeViewSet.as_view(actions={"get": "list"})
+        for index in range(7):
+            Home.objects.create(name="Home %d" % index, address="Address %d" % index)
+
+    def get(self, url, view=None):
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        return (view or self.view)(request)
+
+    def walk(self, url, view=None):
+        """
+        Follow the `next` links from `url`, then the `previous` links back, and
+        return the ids seen each way.
+        """
+        response = self.get(url, view)
+        pages = [[row["id"] for row in response.data["results"]]]
+        while response.data["next"]:
+            response = self.get(response.data["next"], view)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([row["id"] for row in response.data["results"]])
+        backwards = pages[-1]
+        while response.data["previous"]:
+            response = self.get(response.data["previous"], view)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            backwards = [row["id"] for row in response.data["results"]] + backwards
+        return sum(pages, []), backwards
+
+    def test_unpaginated_by_default(self):
+        response = self.get("/home/")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Without pagination parameters the whole list is returned
+        self.assertEqual(len(response.data), Home.objects.count())
+
+    def test_follow_next_and_previous(self):
+        response = self.get("/home/?page_size=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["previous"])
+        ids = [row["id"] for row in response.data["results"]]
+        while response.data["next"]:
+            response = self.get(response.data["next"])
+            ids.extend(row["id"] for row in response.data["results"])
+        self.assertEqual(
+            ids, list(Home.objects.order_by("id").values_list("id", flat=True))
+        )
+        # Walk one page back from the last page
+        response = self.get(response.data["previous"])
+        self.assertEqual([row["id"] for row in response.data["results"]], ids[3:6])
+
+    def test_descending_ordering(self):
+        response = self.get("/home/?page_size=2&ordering=-id")
+        ids = [row["id"] for row in response.data["results"]]
+        self.assertEqual(
+            ids, list(Home.objects.order_by("-id").values_list("id", flat=True)[:2])
+        )
+
+    def test_deep_page_has_no_count_or_offset(self):
+        response = self.get("/home/?page_size=2")
+        for _ in range(2):
+            response = self.get(response.data["next"])
+        with self.assertQueryBudget(3) as context:
+            response = self.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in context.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+            self.assertNotIn("OFFSET", query["sql"])
+
+    def test_unindexed_ordering_rejected(self):
+        response = self.get("/home/?page_size=2&ordering=address")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ordering", response.data)
+
+    def test_ties_are_paged_on_the_primary_key(self):
+        Home.objects.filter(name__in=["Home 1", "Home 4"]).update(type=Home.CONDO)
+        for ordering in ("type", "-type"):
+            expected = list(
+                Home.objects.order_by(
+                    ordering, ordering.replace("type", "id")
+                ).values_list("id", flat=True)
+            )
+            forward, backwards = self.walk("/home/?page_size=2&ordering=" + ordering)
+            self.assertEqual(forward, expected)
+            self.assertEqual(backwards, expected)
+
+        response = self.get("/home/?page_size=2&ordering=type")
+        response = self.get(response.data["next"])
+        with self.assertQueryBudget(3) as context:
+            response = self.get(response.data["next"])
+        for query in context.captured_queries:
+            self.assertNotIn("OFFSET", query["sql"])
+
+    def test_nullable_ordering(self):
+        home = Home.objects.first()
+        for index, day in enumerate([3, None, 1, None, 3, None, 2]):
+            Human.objects.create(
+                name="Human %d" % index,
+                gender="F",
+                home=home,
+                date_of_birth=day and date(2000, 1, day),
+            )
+        view = views.HumanViewSet.as_view(actions={"get": "list"})
+        for ordering in ("date_of_birth", "-date_of_birth"):
+            expected = list(
+                Human.objects.order_by(
+                    ordering, ordering.replace("date_of_birth", "id")
+                ).values_list("id", flat=True)
+            )
+            for page_size in (1, 2, 3):
+                forward, backwards = self.walk(
+                    "/human/?page_size=%d&ordering=%s" % (page_size, ordering), view
+                )
+                self.assertEqual(forward, expected)
+                self.assertEqual(backwards, expected)
+
+    def test_invalid_cursor(self):
+        response = self.get("/home/?page_size=2&ordering=updated_at")
+        cursor = response.data["next"].split("cursor=")[1].split("&")[0]
+        # A cursor of another ordering.
+        response = self.get("/home/?cursor=%s" % cursor)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # A date that does not parse.
+        response = self.get(
+            "/home/?cursor=cD1ub3QtYS1kYXRlJnA9MQ==&ordering=updated_at"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,93 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..authentications import create_signed_token
+from ..caching import get_cache
+from ..models import Breed, Cat, Home, Human
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_TOP=5)
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "admin", "admin@example.com", "bar", is_staff=True
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.breed, owner=self.owner
+        )
+        get_cache().clear()
+
+    def get_report(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return json.loads(response.content.decode())
+
+    def test_cprofile(self):
+        report = self.get_report("/cat/?_profile=cprofile")
+        self.assertEqual(report["mode"], "cprofile")
+        self.assertEqual(report["status"], status.HTTP_200_OK)
+        self.assertGreater(report["content_length"], 0)
+        self.assertEqual(len(report["hotspots"]), 5)
+        times = [hotspot["total_time"] for hotspot in report["hotspots"]]
+        self.assertEqual(times, sorted(times, reverse=True))
+        self.assertLessEqual(len(report["allocations"]), 5)
+        self.assertGreater(report["peak_memory"], 0)
+        self.assertNotIn("queries", report)
+
+    def test_sql(self):
+        report = self.get_report("/cat/%d/?_profile=sql" % self.kitty.pk)
+        self.assertEqual(report["mode"], "sql")
+        self.assertEqual(report["query_count"], len(report["queries"]))
+        for query in report["queries"]:
+            self.assertTrue(query["sql"].startswith("SELECT"))
+            self.assertTrue(query["explain"])
+        self.assertEqual(report["queries"][-1]["params"], [str(self.kitty.pk)])
+
+    def test_function_views(self):
+        report = self.get_report("/stats/cats-per-breed/?_profile=sql")
+        self.assertGreater(report["query_count"], 0)
+
+    def test_unknown_mode(self):
+        response = self.client.get("/cat/?_profile=memory")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get("/cat/?_profile=sql")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["name"], "Kitty")
+
+    def test_demoted_signed_token(self):
+        key, _ = create_signed_token(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Signed {}".format(key))
+        self.assertEqual(client.get("/cat/?_profile=sql").json()["mode"], "sql")
+        # The token outlives the privilege it was issued with.
+        self.user.is_staff = False
+        self.user.save()
+        response = client.get("/cat/?_profile=sql")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["name"], "Kitty")
+
+    def test_anonymous(self):
+        response = APIClient().get("/cat/?_profile=sql")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        response = self.client.get("/cat/?_profile=sql")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["name"], "Kitty")
@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..models import Breed, Cat, Home, Human
+from ..querysets import get_query_plan
+from ..serializers import BreedSerializer, CatSerializer, HumanSerializer
+from .utils import QueryBudgetMixin
+
+# Maximum number of queries per list endpoint, authentication included.
+ENDPOINT_QUERY_BUDGETS = {
+    views.HomeViewSet: 3,
+    views.HumanViewSet: 4,
+    views.BreedViewSet: 4,
+    views.CatViewSet: 3,
+}
+
+
+class QueryPlanTestCase(TestCase):
+    def test_cat_plan(self):
+        plan = get_query_plan(CatSerializer)
+        # The home is denormalized, hyperlinks only need the foreign keys
+        self.assertEqual(plan.select_related, set())
+        self.assertEqual(plan.prefetch_related, {})
+        self.assertIn("breed", plan.only)
+        self.assertIn("home_name", plan.only)
+
+    def test_human_plan(self):
+        plan = get_query_plan(HumanSerializer)
+        self.assertEqual(plan.select_related, set())
+        self.assertEqual(list(plan.prefetch_related), ["cats"])
+
+    def test_breed_plan(self):
+        plan = get_query_plan(BreedSerializer)
+        self.assertEqual(list(plan.prefetch_related), ["cats"])
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.add_household(0)
+
+    def add_household(self, index):
+        home = Home.objects.create(name="Home %d" % index, address="Address")
+        breed = Breed.objects.create(name="Breed %d" % index, origin="Japan")
+        for human_index in range(3):
+            owner = Human.objects.create(
+                name="Human %d" % human_index, gender="F", home=home
+            )
+            for cat_index in range(3):
+                Cat.objects.create(
+                    name="Cat %d" % cat_index, gender="M", breed=breed, owner=owner
+                )
+
+    def get_list(self, viewset):
+        view = viewset.as_view(actions={"get": "list"})
+        request = self.factory.get(
+            "/", HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        response = view(request)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_list_within_budget(self):
+        for viewset, budget in ENDPOINT_QUERY_BUDGETS.items():
+            with self.subTest(viewset=viewset.__name__):
+                with self.assertQueryBudget(budget):
+                    self.get_list(viewset)
+
+    def test_query_count_independent_of_rows(self):
+        for index in range(1, 4):
+            self.add_household(index)
+        for viewset, budget in ENDPOINT_QUERY_BUDGETS.items():
+            with self.subTest(viewset=viewset.__name__):
+                with self.assertQueryBudget(budget):
+                    response = self.get_list(viewset)
+                self.assertEqual(
+                    len(response.data), viewset.queryset.model.objects.count()
+                )
+
+    def test_cat_home_matches_owner_home(self):
+        response = self.get_list(views.CatViewSet)
+        for row in response.data:
+            cat = Cat.objects.get(pk=row["id"])
+            self.assertEqual(row["home"], cat.owner.home.name)
@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_cache
+from ..models import Breed
+from ..replicas import (
+    ReplicaRouter,
+    _unavailable,
+    get_current_database,
+    get_pin_cache,
+    use_database,
+)
+from .utils import add_database, database, remove_database
+
+
+# Pins live in their own cache, as the tests keep clearing the response cache.
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "pins": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "pins",
+        },
+    },
+    DATABASE_REPLICAS=["replica"],
+    REPLICA_PIN_CACHE="pins",
+    REPLICA_PIN_SECONDS=10,
+)
+class ReplicaRoutingTestCase(TestCase):
+    """
+    Two SQLite files stand in for the primary and its replica; they are not
+    actually replicated, so each test can tell where a read was served from.
+    """
+
+    databases = {DEFAULT_DB_ALIAS, "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        add_database("replica", os.path.join(cls.directory, "replica.sqlite3"))
+        call_command("migrate", database="replica", verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        remove_database("replica")
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        replica_user = User.objects.db_manager("replica").create_user(
+            "admin", "admin@example.com", "bar"
+        )
+        Token.objects.using("replica").create(key=self.token.key, user=replica_user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.breed = Breed.objects.create(name="Persian")
+        Breed.objects.using("replica").create(name="Bobtail")
+        get_cache().clear()
+        get_pin_cache().clear()
+        self.addCleanup(_unavailable.clear)
+
+    def get_names(self, url="/breed/"):
+        get_cache().clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [breed["name"] for breed in response.data]
+
+    def test_reads_from_replica(self):
+        self.assertEqual(self.get_names(), ["Bobtail"])
+        # Both rows got the same id
+        get_cache().clear()
+        response = self.client.get("/breed/%d/" % self.breed.pk)
+        self.assertEqual(response.data["name"], "Bobtail")
+        self.assertIsNone(get_current_database())
+
+    def test_streamed_reads_from_replica(self):
+        response = self.client.get("/breed/?stream=ndjson")
+        self.assertIn(b"Bobtail", b"".join(response.streaming_content))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(self.get_names(), ["Persian"])
+
+    def test_writes_go_to_primary(self):
+        response = self.client.post(
+            "/breed/", {"name": "Siamese", "origin": "Thailand"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Breed.objects.filter(name="Siamese").exists())
+        self.assertFalse(Breed.objects.using("replica").filter(name="Siamese").exists())
+
+    def test_read_your_writes(self):
+        self.client.post(
+            "/breed/", {"name": "Siamese", "origin": "Thailand"}, format="json"
+        )
+        # The client is pinned to the primary after its write ...
+        self.assertEqual(self.get_names(), ["Persian", "Siamese"])
+        # ... other clients are not
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key + "x"))
+        self.assertNotEqual(other.get("/breed/").status_code, status.HTTP_200_OK)
+        # ... and it goes back to the replica once the pin expires.
+        get_pin_cache().clear()
+        self.assertEqual(self.get_names(), ["Bobtail"])
+
+    def test_failed_writes_do_not_pin(self):
+        response = self.client.post("/breed/", {"name": ""}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_names(), ["Bobtail"])
+
+    def test_new_token_falls_back_to_primary(self):
+        user = User.objects.create_user("new", "new@example.com", "bar")
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(token.key))
+        self.assertEqual(self.get_names(), ["Bobtail"])
+
+    def test_unavailable_replica(self):
+        with database("down", os.path.join(self.directory, "missing", "db.sqlite3")):
+            with override_settings(DATABASE_REPLICAS=["down"]):
+                self.assertEqual(self.get_names(), ["Persian"])
+                self.assertIn("down", _unavailable)
+                # Skipped without trying to connect until the retry delay is over
+                self.assertEqual(self.get_names(), ["Persian"])
+
+    def test_replica_failing_mid_request(self):
+        with connections["replica"].cursor() as cursor:
+            cursor.execute("ALTER TABLE catapp_breed RENAME TO catapp_breed_gone")
+        self.assertEqual(self.get_names(), ["Persian"])
+        self.assertIn("replica", _unavailable)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Breed))
+        with use_database("replica"):
+            self.assertEqual(router.db_for_read(Breed), "replica")
+        self.assertIsNone(router.db_for_read(Breed))
+        replica_breed = Breed.objects.using("replica").get()
+        self.assertEqual(
+            router.db_for_write(Breed, instance=replica_breed), DEFAULT_DB_ALIAS
+        )
+        self.assertTrue(router.allow_relation(self.breed, replica_breed))
@@ -0,0 +1,127 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_model_dependencies
+from ..models import Breed, Cat, Home, Human
+from ..serializers import (
+    BreedSerializer,
+    CatSerializer,
+    HomeSerializer,
+    HumanSerializer,
+)
+
+
+class ModelDependenciesTestCase(TestCase):
+    def test_dependencies(self):
+        self.assertEqual(get_model_dependencies(HomeSerializer), {Home})
+        self.assertEqual(get_model_dependencies(HumanSerializer), {Human, Cat})
+        self.assertEqual(get_model_dependencies(CatSerializer), {Cat})
+        self.assertEqual(get_model_dependencies(BreedSerializer), {Breed, Cat})
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty", gender="M", breed=self.breed, owner=self.owner
+        )
+
+    def test_cached_list(self):
+        first = self.client.get(reverse("cat-list"))
+        # Check status code
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        # Served from the cache, authentication included
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("cat-list"))
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+
+    def test_ndjson_retrieve_is_cached(self):
+        url = reverse("cat-detail", args=[self.kitty.id])
+        first = self.client.get(url, HTTP_ACCEPT="application/x-ndjson")
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual(second["Content-Type"], "application/x-ndjson")
+        self.assertEqual(first.content, second.content)
+        # NDJSON lists are streamed instead
+        response = self.client.get(
+            reverse("cat-list"), HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertTrue(response.streaming)
+
+    def test_query_string_and_format_are_part_of_the_key(self):
+        self.client.get(reverse("cat-list"))
+        response = self.client.get(reverse("cat-list") + "?page_size=1")
+        self.assertIn("results", response.json())
+        response = self.client.get(reverse("cat-list"), HTTP_ACCEPT="text/html")
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+
+    def test_scheme_and_host_are_part_of_the_key(self):
+        urls = {}
+        etags = set()
+        for host, secure in (
+            ("internal.local", False),
+            ("public.example.com", False),
+            ("public.example.com", True),
+        ):
+            response = self.client.get(
+                reverse("cat-list"), HTTP_HOST=host, secure=secure
+            )
+            urls[host, secure] = response.json()[0]["url"]
+            etags.add(response["ETag"])
+        self.assertEqual(
+            urls,
+            {
+                ("internal.local", False): "http://internal.local/cat/%d/"
+                % self.kitty.id,
+                ("public.example.com", False): "http://public.example.com/cat/%d/"
+                % self.kitty.id,
+                ("public.example.com", True): "https://public.example.com/cat/%d/"
+                % self.kitty.id,
+            },
+        )
+        self.assertEqual(len(etags), 3)
+
+    def test_write_invalidates(self):
+        self.client.get(reverse("cat-detail", args=[self.kitty.id]))
+        self.kitty.name = "Kitty Edited"
+        self.kitty.save()
+        response = self.client.get(reverse("cat-detail", args=[self.kitty.id]))
+        self.assertEqual(response.json()["name"], "Kitty Edited")
+
+    def test_related_write_invalidates(self):
+        # Cat responses show the owner's home name
+        self.client.get(reverse("cat-list"))
+        self.home.name = "New Home"
+        self.home.save()
+        response = self.client.get(reverse("cat-list"))
+        self.assertEqual(response.json()[0]["home"], "New Home")
+
+    def test_unrelated_write_keeps_cache(self):
+        self.client.get(reverse("home-list"))
+        Breed.objects.create(name="Bobtail", origin="Japan")
+        with self.assertNumQueries(0):
+            self.client.get(reverse("home-list"))
+
+    def test_bulk_update_invalidates(self):
+        self.client.get(reverse("cat-list"))
+        response = self.client.patch(
+            reverse("cat-list"),
+            [{"id": self.kitty.id, "name": "Bulk Edited"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse("cat-list"))
+        self.assertEqual(response.json()[0]["name"], "Bulk Edited")
@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..models import Breed, Cat, Home, Human
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.home = Home.objects.create(name="Tiger Lodge", address="My Address")
+        self.john = Human.objects.create(
+            name="John",
+            gender="M",
+            date_of_birth="1992-01-24",
+            home=self.home,
+            description="Owns a tiger striped cat",
+        )
+        self.bengal = Breed.objects.create(
+            name="Bengal", origin="USA", description="Looks like a small tiger"
+        )
+        self.tiger = Cat.objects.create(
+            name="Tiger",
+            gender="M",
+            date_of_birth="2018-06-01",
+            breed=self.bengal,
+            owner=self.john,
+        )
+
+    def get(self, url):
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        return views.search_view(request)
+
+    def test_search_ranks_across_models(self):
+        response = self.get("/search/?q=tiger")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(
+            [(result["type"], result["id"]) for result in results],
+            [
+                ("cat", self.tiger.id),
+                ("home", self.home.id),
+                ("breed", self.bengal.id),
+                ("human", self.john.id),
+            ],
+        )
+        self.assertEqual(
+            results[0]["url"], "http://testserver/cat/{}/".format(self.tiger.id)
+        )
+        self.assertEqual(results[0]["name"], "Tiger")
+
+    def test_search_type_filter(self):
+        response = self.get("/search/?q=tiger&type=breed,human")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["type"] for result in response.data["results"]],
+            ["breed", "human"],
+        )
+
+    def test_search_pagination(self):
+        response = self.get("/search/?q=tiger&limit=3")
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNone(response.data["previous"])
+        self.assertIn("offset=3", response.data["next"])
+
+        response = self.get("/search/?q=tiger&limit=3&offset=3")
+        self.assertEqual(
+            [result["type"] for result in response.data["results"]], ["human"]
+        )
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_search_queries(self):
+        # The token lookup, then one bounded query per searchable model.
+        with self.assertNumQueries(5):
+            self.get("/search/?q=tiger")
+
+    def test_search_validation(self):
+        # Check status code
+        self.assertEqual(self.get("/search/").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.get("/search/?q=tiger&type=dog").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_search_requires_authentication(self):
+        request = self.factory.get("/search/?q=tiger")
+        response = views.search_view(request)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,311 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_cache
+from ..models import Breed, Cat, Home, Human
+from ..sharding import HashRing, get_home_shard
+from .utils import add_database, remove_database
+
+SHARDS = (DEFAULT_DB_ALIAS, "shard1", "shard2")
+
+
+class HashRingTestCase(SimpleTestCase):
+    def test_balance(self):
+        ring = HashRing(SHARDS)
+        counts = {}
+        for key in range(3000):
+            node = ring.get_node(key)
+            counts[node] = counts.get(node, 0) + 1
+        self.assertEqual(set(counts), set(SHARDS))
+        self.assertGreater(min(counts.values()), 500)
+
+    def test_adding_a_node_moves_few_keys(self):
+        before = HashRing(SHARDS)
+        after = HashRing(SHARDS + ("shard3",))
+        moved = [
+            key for key in range(3000) if before.get_node(key) != after.get_node(key)
+        ]
+        # Keys only ever move to the new node.
+        self.assertEqual({after.get_node(key) for key in moved}, {"shard3"})
+        self.assertLess(len(moved), 1200)
+
+
+@override_settings(DATABASE_SHARDS=SHARDS, COMPILED_LIST_SERIALIZERS=False)
+class ShardingTestCase(TestCase):
+    """
+    Three SQLite files stand in for the shards, the default one also holding
+    the breeds, the users and the id sequences.
+    """
+
+    databases = set(SHARDS)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        for alias in SHARDS[1:]:
+            add_database(alias, os.path.join(cls.directory, alias + ".sqlite3"))
+            call_command("migrate", database=alias, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in SHARDS[1:]:
+            remove_database(alias)
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.breeds = [
+            Breed.objects.create(name="Persian", origin="Europe"),
+            Breed.objects.create(name="Bobtail", origin="Japan"),
+        ]
+        self.homes = []
+        for index in range(8):
+            home = Home.objects.create(name="Home %d" % index, address="Street")
+            human = Human.objects.create(
+                name="Human %d" % index, gender="MF"[index % 2], home=home
+            )
+            for number in range(2):
+                Cat.objects.create(
+                    name="Cat %d.%d" % (index, number),
+                    gender="FM"[number % 2],
+                    date_of_birth="201%d-01-0%d" % (number, index + 1),
+                    breed=self.breeds[number],
+                    owner=human,
+                )
+            self.homes.append(home)
+        get_cache().clear()
+
+    def get(self, url):
+        get_cache().clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_households_are_placed_together(self):
+        used = set()
+        for home in self.homes:
+            shard = get_home_shard(home.pk)
+            used.add(shard)
+            for alias in SHARDS:
+                homes = Home.objects.using(alias).filter(pk=home.pk)
+                humans = Human.objects.using(alias).filter(home=home.pk)
+                cats = Cat.objects.using(alias).filter(home=home.pk)
+                expected = 1 if alias == shard else 0
+                self.assertEqual(homes.count(), expected)
+                self.assertEqual(humans.count(), expected)
+                self.assertEqual(cats.count(), expected * 2)
+        # The households did spread.
+        self.assertGreater(len(used), 1)
+
+    def test_ids_are_unique_across_shards(self):
+        ids = [cat.pk for cat in Cat.objects.all()]
+        self.assertEqual(sorted(ids), list(range(1, 17)))
+        self.assertEqual([home.pk for home in Home.objects.all()], list(range(1, 9)))
+
+    def test_breeds_are_replicated(self):
+        for alias in SHARDS:
+            self.assertEqual(
+                Breed.objects.using(alias).filter(name="Persian").count(), 1
+            )
+        persian = self.breeds[0]
+        persian.origin = "Iran"
+        persian.save()
+        for alias in SHARDS:
+            self.assertEqual(
+                Breed.objects.using(alias).get(pk=persian.pk).origin, "Iran"
+            )
+        persian.delete()
+        for alias in SHARDS:
+            self.assertFalse(Breed.objects.using(alias).filter(pk=persian.pk).exists())
+            # Its cats went with it.
+            self.assertFalse(Cat.objects.using(alias).filter(breed=persian.pk).exists())
+
+    def test_counters(self):
+        for home in Home.objects.all():
+            self.assertEqual(home.human_count, 1)
+        for human in Human.objects.all():
+            self.assertEqual(human.cat_count, 2)
+        self.assertEqual(Breed.objects.get(name="Persian").cat_count, 8)
+
+    def test_list_is_merged_in_order(self):
+        response = self.get("/cat/")
+        self.assertEqual([cat["id"] for cat in response.data], list(range(1, 17)))
+
+        response = self.get("/cat/?page_size=5&ordering=-date_of_birth")
+        expected = sorted(Cat.objects.values_list("date_of_birth", "id"), reverse=True)
+        ids = [cat["id"] for cat in response.data["results"]]
+        self.assertEqual(ids, [pk for _, pk in expected[:5]])
+        response = self.get(response.data["next"])
+        ids = [cat["id"] for cat in response.data["results"]]
+        self.assertEqual(ids, [pk for _, pk in expected[5:10]])
+
+    def test_list_with_related_rows(self):
+        response = self.get("/human/")
+        self.assertEqual(len(response.data), 8)
+        for human in response.data:
+            self.assertEqual(len(human["cats"]), 2)
+        response = self.get("/breed/")
+        self.assertEqual(len(response.data[0]["homes"]), 8)
+
+    def test_compiled_and_streamed_lists(self):
+        expected = self.get("/human/").content
+        with override_settings(COMPILED_LIST_SERIALIZERS=True):
+            self.assertEqual(self.get("/human/").content, expected)
+        response = self.get("/cat/?stream=ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 16)
+
+    def test_filters(self):
+        home = self.homes[3]
+        response = self.get("/cat/?home=%d" % home.pk)
+        self.assertEqual(len(response.data), 2)
+        response = self.get("/cat/?gender=F")
+        self.assertEqual(len(response.data), 8)
+
+    def test_retrieve_update_destroy(self):
+        cat = Cat.objects.get(name="Cat 5.1")
+        shard = get_home_shard(cat.home_id)
+        self.assertEqual(cat._state.db, shard)
+        url = "/cat/%d/" % cat.pk
+        self.assertEqual(self.get(url).data["name"], "Cat 5.1")
+
+        response = self.client.patch(url, {"name": "Tom"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Cat.objects.using(shard).get(pk=cat.pk).name, "Tom")
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Cat.objects.filter(pk=cat.pk).exists())
+        self.assertEqual(Human.objects.get(pk=cat.owner_id).cat_count, 1)
+
+    def test_moves_across_shards_are_rejected(self):
+        # Two households of different shards.
+        first = self.homes[0]
+        second = next(
+            home
+            for home in self.homes
+            if get_home_shard(home.pk) != get_home_shard(first.pk)
+        )
+        human = Human.objects.get(home=first)
+        cat = Cat.objects.filter(owner=human).first()
+        other_human = Human.objects.get(home=second)
+
+        response = self.client.patch(
+            "/human/%d/" % human.pk,
+            {"home": "http://testserver/home/%d/" % second.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("home", response.data)
+        response = self.client.patch(
+            "/cat/%d/" % cat.pk,
+            {"owner": "http://testserver/human/%d/" % other_human.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("owner", response.data)
+        response = self.client.patch(
+            "/cat/",
+            [
+                {"id": cat.pk, "name": "Tom"},
+                {
+                    "id": cat.pk + 1,
+                    "owner": "http://testserver/human/%d/" % other_human.pk,
+                },
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("owner", response.data[1])
+        self.assertEqual(Cat.objects.get(pk=cat.pk).owner_id, human.pk)
+        self.assertEqual(Cat.objects.get(pk=cat.pk).name, cat.name)
+
+        # Moves within a shard still work.
+        same = next(
+            home
+            for home in self.homes[1:]
+            if get_home_shard(home.pk) == get_home_shard(first.pk)
+        )
+        response = self.client.patch(
+            "/human/%d/" % human.pk,
+            {"home": "http://testserver/home/%d/" % same.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create(self):
+        home = self.homes[6]
+        human = Human.objects.get(home=home)
+        data = {
+            "name": "Tom",
+            "gender": "M",
+            "breed": "http://testserver/breed/%d/" % self.breeds[1].pk,
+            "owner": "http://testserver/human/%d/" % human.pk,
+        }
+        response = self.client.post("/cat/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["id"], 17)
+        tom = Cat.objects.using(get_home_shard(home.pk)).get(pk=17)
+        self.assertEqual(tom.home_name, home.name)
+
+        response = self.client.post(
+            "/cat/", [dict(data, name="Jerry"), dict(data, name="Felix")], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Human.objects.get(pk=human.pk).cat_count, 5)
+
+    def test_stats(self):
+        response = self.get("/stats/cats-per-breed/")
+        self.assertEqual(
+            [(row["breed_name"], row["count"]) for row in response.data],
+            [("Persian", 8), ("Bobtail", 8)],
+        )
+        response = self.get("/stats/cats-per-gender/")
+        self.assertEqual(
+            response.data,
+            [{"gender": "F", "count": 8}, {"gender": "M", "count": 8}],
+        )
+
+    def test_search_is_merged_in_rank_order(self):
+        response = self.get("/search/?q=Cat&type=cat&limit=5&offset=3")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [4, 5, 6, 7, 8]
+        )
+
+    def test_autocomplete_returns_the_global_top(self):
+        response = self.get("/human/autocomplete/?q=Human&limit=5")
+        self.assertEqual(
+            [row["name"] for row in response.data],
+            ["Human 0", "Human 1", "Human 2", "Human 3", "Human 4"],
+        )
+
+    def test_conditional_get_sees_every_shard(self):
+        etag = self.get("/breed/")["ETag"]
+        get_cache().clear()
+        response = self.client.get("/breed/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        cat = next(
+            cat for cat in Cat.objects.all() if cat._state.db != DEFAULT_DB_ALIAS
+        )
+        cat.name = "Tom"
+        cat.save()
+        get_cache().clear()
+        response = self.client.get("/breed/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
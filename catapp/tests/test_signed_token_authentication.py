@@ -0,0 +1,119 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..authentications import (
+    SIGNED_TOKEN_SALT,
+    SignedTokenUser,
+    create_signed_token,
+    get_revocation_cache,
+)
+
+
+class SignedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.factory = APIRequestFactory()
+        self.key, _ = create_signed_token(self.user)
+
+    def get_list(self, key):
+        view = views.HomeViewSet.as_view(actions={"get": "list"})
+        request = self.factory.get("/home/", HTTP_AUTHORIZATION="Signed {}".format(key))
+        return view(request)
+
+    def test_obtain_token(self):
+        request = self.factory.post(
+            "/api-signed-token-auth/", data={"username": "admin", "password": "bar"}
+        )
+        response = views.obtain_signed_auth_token(request)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["expires_in"], settings.TOKEN_EXPIRY_TIME)
+        response = self.get_list(response.data["token"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_valid_token_costs_no_queries(self):
+        # Authentication only looks up the shared revocation list, then come the
+        # validators and the list query
+        with self.assertNumQueries(3):
+            response = self.get_list(self.key)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_user(self):
+        claims = signing.loads(self.key, salt=SIGNED_TOKEN_SALT)
+        self.user.delete()
+        response = self.get_list(self.key)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Check error detail
+        self.assertEqual(str(response.data["detail"]), "The Token is revoked")
+        # A revocation not seen yet: the user is looked up on first use
+        get_revocation_cache().clear()
+        with self.assertRaisesMessage(AuthenticationFailed, "User not found"):
+            SignedTokenUser(claims).is_staff
+        with override_settings(REQUEST_PROFILING=True):
+            response = self.client.get(
+                "/home/?_profile=sql", HTTP_AUTHORIZATION="Signed {}".format(self.key)
+            )
+        # Not profiled
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+
+    def test_tampered_token(self):
+        response = self.get_list(self.key[:-1] + ("A" if self.key[-1] != "A" else "B"))
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Check error detail
+        self.assertEqual(str(response.data["detail"]), "Invalid Token")
+
+    def test_expired_token(self):
+        claims = signing.loads(self.key, salt=SIGNED_TOKEN_SALT)
+        claims["exp"] = int(time.time()) - 1
+        response = self.get_list(signing.dumps(claims, salt=SIGNED_TOKEN_SALT))
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Check error detail
+        self.assertEqual(str(response.data["detail"]), "The Token is expired")
+
+    def test_revoke_token(self):
+        request = self.factory.post(
+            "/api-signed-token-revoke/", HTTP_AUTHORIZATION="Signed {}".format(self.key)
+        )
+        response = views.revoke_signed_auth_token(request)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.get_list(self.key)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Check error detail
+        self.assertEqual(str(response.data["detail"]), "The Token is revoked")
+        # Other tokens of the same user stay valid
+        other_key, _ = create_signed_token(self.user)
+        self.assertEqual(self.get_list(other_key).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.get_list(self.key)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expiring_token_still_accepted(self):
+        # The signed and database tokens can be used side by side
+        token = Token.objects.create(user=self.user)
+        view = views.HomeViewSet.as_view(actions={"get": "list"})
+        request = self.factory.get(
+            "/home/", HTTP_AUTHORIZATION="Token {}".format(token.key)
+        )
+        self.assertEqual(view(request).status_code, status.HTTP_200_OK)
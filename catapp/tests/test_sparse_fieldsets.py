@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..models import Breed, Cat, Home, Human
+
+
+class SparseFieldsetTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.owner = Human.objects.create(name="John", gender="M", home=self.home)
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        self.kitty = Cat.objects.create(
+            name="Kitty",
+            gender="M",
+            description="A very long description.",
+            breed=self.breed,
+            owner=self.owner,
+        )
+
+    def get(self, viewset, url):
+        view = viewset.as_view(actions={"get": "list"})
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = view(request)
+        list_query = context.captured_queries[-1]["sql"]
+        return response, list_query
+
+    def test_fields(self):
+        response, sql = self.get(views.CatViewSet, "/cat/?fields=id,name")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data[0]), ["id", "name"])
+        # Neither the description column nor the owner->home join are needed
+        self.assertNotIn("description", sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_exclude(self):
+        response, sql = self.get(views.CatViewSet, "/cat/?exclude=home,description")
+        self.assertEqual(
+            list(response.data[0]),
+            ["url", "id", "name", "gender", "date_of_birth", "breed", "owner"],
+        )
+        self.assertNotIn("description", sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_denormalized_home(self):
+        response, sql = self.get(views.CatViewSet, "/cat/?fields=id,home")
+        self.assertEqual(response.data[0], {"id": self.kitty.id, "home": "My Home"})
+        # The home name is read from the cat row
+        self.assertIn("home_name", sql)
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("description", sql)
+
+    def test_dropped_prefetch(self):
+        view = views.HumanViewSet.as_view(actions={"get": "list"})
+        request = self.factory.get(
+            "/human/?fields=id,name",
+            HTTP_AUTHORIZATION="Token {}".format(self.token.key),
+        )
+        view(request)
+        # Validators and the list query, the cats are not prefetched
+        request = self.factory.get(
+            "/human/?fields=id,name",
+            HTTP_AUTHORIZATION="Token {}".format(self.token.key),
+        )
+        with self.assertNumQueries(2):
+            response = view(request)
+        self.assertEqual(response.data, [{"id": self.owner.id, "name": "John"}])
+
+    def test_unknown_field(self):
+        response, _ = self.get(views.CatViewSet, "/cat/?fields=id,colour&exclude=age")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+        self.assertIn("exclude", response.data)
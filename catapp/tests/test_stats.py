@@ -0,0 +1,141 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..caching import get_cache
+from ..models import Breed, Cat, Home, Human
+
+
+class StatsTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        self.home = Home.objects.create(name="My Home", address="My Address")
+        self.office = Home.objects.create(
+            name="Office", address="Wisma Goshen", type=Home.CONDO
+        )
+        self.john = Human.objects.create(
+            name="John", gender="M", date_of_birth="1992-01-24", home=self.home
+        )
+        self.jane = Human.objects.create(
+            name="Jane", gender="F", date_of_birth="1996-12-24", home=self.office
+        )
+        self.persian = Breed.objects.create(name="Persian", origin="Europe")
+        self.bobtail = Breed.objects.create(name="Bobtail", origin="Japan")
+        this_year = date.today().year
+        for name, gender, age, breed, owner in (
+            ("Kitty", "M", 0, self.persian, self.john),
+            ("Summer", "F", 1, self.persian, self.jane),
+            ("Tiger", "M", 3, self.bobtail, self.jane),
+        ):
+            Cat.objects.create(
+                name=name,
+                gender=gender,
+                date_of_birth=date(this_year - age, 1, 1),
+                breed=breed,
+                owner=owner,
+            )
+        Cat.objects.create(
+            name="Stray", gender="F", breed=self.persian, owner=self.jane
+        )
+
+    def tearDown(self):
+        get_cache().clear()
+
+    def get(self, url, chart=None):
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        return views.stats_view(request, chart=chart)
+
+    def test_stats_index(self):
+        response = self.get("/stats/")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["cats-per-breed"], "http://testserver/stats/cats-per-breed/"
+        )
+
+    def test_cats_per_breed(self):
+        # The token lookup and one GROUP BY query.
+        with self.assertNumQueries(2):
+            response = self.get("/stats/cats-per-breed/", "cats-per-breed")
+        self.assertEqual(
+            response.data,
+            [
+                {"breed": self.persian.id, "breed_name": "Persian", "count": 3},
+                {"breed": self.bobtail.id, "breed_name": "Bobtail", "count": 1},
+            ],
+        )
+
+    def test_cats_per_home_type(self):
+        response = self.get("/stats/cats-per-home-type/", "cats-per-home-type")
+        self.assertEqual(
+            response.data,
+            [{"type": Home.CONDO, "count": 3}, {"type": Home.LANDED, "count": 1}],
+        )
+
+    def test_per_gender(self):
+        response = self.get("/stats/cats-per-gender/", "cats-per-gender")
+        self.assertEqual(
+            response.data, [{"gender": "F", "count": 2}, {"gender": "M", "count": 2}]
+        )
+        response = self.get("/stats/humans-per-gender/", "humans-per-gender")
+        self.assertEqual(
+            response.data, [{"gender": "F", "count": 1}, {"gender": "M", "count": 1}]
+        )
+
+    def test_age_histogram(self):
+        response = self.get("/stats/cat-ages/?bucket=2", "cat-ages")
+        self.assertEqual(
+            response.data,
+            [
+                {"min_age": 0, "max_age": 1, "count": 2},
+                {"min_age": 2, "max_age": 3, "count": 1},
+                {"min_age": None, "max_age": None, "count": 1},
+            ],
+        )
+        response = self.get("/stats/cat-ages/?bucket=0", "cat-ages")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_filters(self):
+        response = self.get(
+            "/stats/cats-per-breed/?owner__home={}".format(self.home.id),
+            "cats-per-breed",
+        )
+        self.assertEqual(
+            response.data,
+            [{"breed": self.persian.id, "breed_name": "Persian", "count": 1}],
+        )
+        response = self.get("/stats/cats-per-breed/?colour=red", "cats-per-breed")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.get("/stats/humans-per-gender/?bucket=2", "humans-per-gender")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_cache(self):
+        self.get("/stats/cats-per-gender/", "cats-per-gender")
+        with self.assertNumQueries(0):
+            self.get("/stats/cats-per-gender/", "cats-per-gender")
+
+        # Writes invalidate the cached aggregates.
+        Cat.objects.create(name="Luna", gender="F", breed=self.bobtail, owner=self.john)
+        response = self.get("/stats/cats-per-gender/", "cats-per-gender")
+        self.assertEqual(
+            response.data, [{"gender": "F", "count": 3}, {"gender": "M", "count": 2}]
+        )
+
+    def test_unknown_chart(self):
+        response = self.get("/stats/dogs/", "dogs")
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,86 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from catapp import views
+
+from ..models import Breed, Cat, Home, Human
+
+
+class StreamingListTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        home = Home.objects.create(name="My Home", address="My Address")
+        breed = Breed.objects.create(name="Persian", origin="Europe")
+        for index in range(5):
+            owner = Human.objects.create(name="Human %d" % index, gender="F", home=home)
+            for cat_index in range(index):
+                Cat.objects.create(
+                    name="Cat %d" % cat_index, gender="M", breed=breed, owner=owner
+                )
+
+    def get(self, viewset, url, **extra):
+        view = viewset.as_view(actions={"get": "list"})
+        request = self.factory.get(
+            url, HTTP_AUTHORIZATION="Token {}".format(self.token.key), **extra
+        )
+        response = view(request)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def get_expected(self, viewset, url):
+        response = self.get(viewset, url)
+        return json.loads(json.dumps(response.data))
+
+    def test_stream_json_array(self):
+        response = self.get(views.CatViewSet, "/cat/?stream=1")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        content = b"".join(response.streaming_content)
+        self.assertEqual(
+            json.loads(content), self.get_expected(views.CatViewSet, "/cat/")
+        )
+
+    def test_stream_ndjson_accept_header(self):
+        response = self.get(
+            views.CatViewSet, "/cat/", HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            self.get_expected(views.CatViewSet, "/cat/"),
+        )
+
+    def test_stream_prefetch_in_chunks(self):
+        view = views.HumanViewSet
+        self.addCleanup(setattr, view, "stream_chunk_size", view.stream_chunk_size)
+        view.stream_chunk_size = 2
+        response = self.get(view, "/human/?stream=ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        # Prefetched cats survive chunk boundaries
+        self.assertEqual(
+            sorted((json.loads(line) for line in lines), key=lambda row: row["id"]),
+            sorted(self.get_expected(view, "/human/"), key=lambda row: row["id"]),
+        )
+        # And keep the requested ordering, ties included
+        for ordering in ("-cat_count", "-gender"):
+            url = "/human/?ordering=%s" % ordering
+            response = self.get(view, url + "&stream=ndjson")
+            lines = b"".join(response.streaming_content).splitlines()
+            self.assertEqual(
+                [json.loads(line) for line in lines], self.get_expected(view, url)
+            )
+
+    def test_stream_empty(self):
+        Home.objects.all().delete()
+        response = self.get(views.HomeViewSet, "/home/?stream=1")
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [])
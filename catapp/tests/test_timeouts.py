@@ -0,0 +1,118 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models.expressions import RawSQL
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..caching import get_cache
+from ..models import Breed
+from ..timeouts import StatementGuard, StatementTimeout, statement_timeout
+from ..views import BreedViewSet
+
+SLOW_SQL = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+    "WHERE x < 100000000) SELECT count(*) FROM c"
+)
+
+
+class StatementTimeoutTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        Breed.objects.create(name="Persian", origin="Europe")
+        get_cache().clear()
+
+    def test_interrupts_slow_statement(self):
+        with self.assertRaises(StatementTimeout):
+            with statement_timeout(0.05, [DEFAULT_DB_ALIAS]):
+                with connection.cursor() as cursor:
+                    cursor.execute(SLOW_SQL)
+        # The connection is still usable, and later statements are not bounded.
+        with statement_timeout(0.05, [DEFAULT_DB_ALIAS]):
+            self.assertEqual(Breed.objects.count(), 1)
+
+    def test_postgresql_connections_are_limited_on_first_use(self):
+        used = mock.MagicMock(vendor="postgresql", alias="used")
+        unused = mock.MagicMock(vendor="postgresql", alias="unused")
+        guard = StatementGuard(50)
+        execute = mock.Mock()
+        for _ in range(2):
+            guard(execute, "SELECT 1", None, False, {"connection": used})
+        self.assertEqual(execute.call_count, 2)
+        cursor = used.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with("SET statement_timeout = %s", [50])
+        with mock.patch(
+            "catapp.timeouts.connections", {"used": used, "unused": unused}
+        ):
+            guard.reset()
+        cursor.execute.assert_called_with("RESET statement_timeout")
+        unused.cursor.assert_not_called()
+
+    def test_slow_endpoint(self):
+        slow = Breed.objects.annotate(slow=RawSQL("(%s)" % SLOW_SQL, []))
+        with mock.patch.object(BreedViewSet, "queryset", slow), mock.patch.object(
+            BreedViewSet, "statement_timeouts", {"list": 0.05}
+        ):
+            response = self.client.get("/breed/")
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response.data["detail"].code, "statement_timeout")
+
+    @override_settings(STATEMENT_TIMEOUT=30)
+    def test_timeout_lookup(self):
+        view = BreedViewSet()
+        view.action = "list"
+        self.assertEqual(view.get_statement_timeout(), 30)
+        view.statement_timeout = 10
+        self.assertEqual(view.get_statement_timeout(), 10)
+        view.statement_timeouts = {"list": 5}
+        self.assertEqual(view.get_statement_timeout(), 5)
+        view.action = "retrieve"
+        self.assertEqual(view.get_statement_timeout(), 10)
+
+    @override_settings(STATEMENT_TIMEOUT=None)
+    def test_disabled(self):
+        with mock.patch.object(BreedViewSet, "statement_timeout", None):
+            response = self.client.get("/breed/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class SlowQueryLogTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("admin", "admin@example.com", "bar")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token.key))
+        self.breed = Breed.objects.create(name="Persian", origin="Europe")
+        get_cache().clear()
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_logs_slow_queries(self):
+        with self.assertLogs("catapp.slow_queries", "WARNING") as logs:
+            self.client.get("/breed/%d/" % self.breed.pk)
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual(records, [record.slow_query for record in logs.records])
+        self.assertEqual({record["endpoint"] for record in records}, {"breed-detail"})
+        (breed_query,) = [
+            record
+            for record in records
+            if record["sql"].startswith('SELECT "catapp_breed"."id"')
+        ]
+        self.assertEqual(breed_query["params"], [self.breed.pk])
+        self.assertEqual(breed_query["user"], self.user.pk)
+        self.assertEqual(breed_query["database"], DEFAULT_DB_ALIAS)
+        self.assertGreaterEqual(breed_query["duration"], 0)
+        # The token lookup runs before the user is known.
+        self.assertIsNone(records[0]["user"])
+
+    @override_settings(SLOW_QUERY_THRESHOLD=60)
+    def test_fast_queries_are_not_logged(self):
+        with mock.patch("catapp.metrics.slow_query_logger") as logger:
+            self.client.get("/breed/%d/" % self.breed.pk)
+        logger.warning.assert_not_called()
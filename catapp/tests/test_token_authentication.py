@@ -1,5 +1,7 @@
+import time
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.utils import timezone
@@ -9,12 +11,15 @@ from rest_framework.test import APIRequestFactory
 
 from catapp import views
 
+from ..authentications import token_cache
+
 
 # Create your tests here.
 class TokenAuthenticationAPITestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create_user("admin", "admin@example.com", "bar")
         self.token = Token.objects.create(user=self.user)
+        token_cache.clear()
 
     def test_valid_token(self):
         factory = APIRequestFactory()
@@ -68,3 +73,73 @@ class TokenAuthenticationAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         # Check error detail
         self.assertEqual(str(response.data["detail"]), "The Token is expired")
+
+    def test_warm_token_costs_no_queries(self):
+        factory = APIRequestFactory()
+        view = views.HomeViewSet.as_view(actions={"get": "list"})
+        request = factory.get(
+            "/home/", HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        # Cold cache: token and user are fetched with one query, then the
+        # conditional GET validators and the list itself
+        with self.assertNumQueries(3):
+            view(request)
+        # Warm cache: only the validators and the list query itself
+        request = factory.get(
+            "/home/", HTTP_AUTHORIZATION="Token {}".format(self.token.key)
+        )
+        with self.assertNumQueries(2):
+            response = view(request)
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_invalidates_cache(self):
+        factory = APIRequestFactory()
+        view = views.HomeViewSet.as_view(actions={"get": "list"})
+        key = self.token.key
+        view(factory.get("/home/", HTTP_AUTHORIZATION="Token {}".format(key)))
+        self.assertIsNotNone(token_cache.get(key))
+        # Delete token object
+        self.token.delete()
+        self.assertIsNone(token_cache.get(key))
+        response = view(
+            factory.get("/home/", HTTP_AUTHORIZATION="Token {}".format(key))
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidates_cache(self):
+        factory = APIRequestFactory()
+        view = views.HomeViewSet.as_view(actions={"get": "list"})
+        key = self.token.key
+        view(factory.get("/home/", HTTP_AUTHORIZATION="Token {}".format(key)))
+        self.user.is_active = False
+        self.user.save()
+        response = view(
+            factory.get("/home/", HTTP_AUTHORIZATION="Token {}".format(key))
+        )
+        # Check status code
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Check error detail
+        self.assertEqual(str(response.data["detail"]), "User is not active")
+
+    def test_cached_users_are_not_shared(self):
+        token_cache.set(Token.objects.select_related("user").get(pk=self.token.pk))
+        first = token_cache.get(self.token.key)
+        first.user.is_active = False
+        second = token_cache.get(self.token.key)
+        self.assertIsNot(second.user, first.user)
+        self.assertEqual(second.user, self.user)
+        self.assertTrue(second.user.is_active)
+        self.assertEqual(second.created, self.token.created)
+        self.assertFalse(second._state.adding)
+
+    def test_cache_bounded_by_token_lifetime(self):
+        # Token that expires in 10 seconds
+        self.token.created = timezone.now() - timedelta(
+            seconds=settings.TOKEN_EXPIRY_TIME - 10
+        )
+        self.token.save()
+        token_cache.set(self.token)
+        _, deadline = token_cache._entries[self.token.key]
+        self.assertLessEqual(deadline - time.monotonic(), 10)
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting that a block of code stays within a query budget.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                "%d. %s" % (index, query["sql"])
+                for index, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                "%d queries executed, budget is %d\nCaptured queries were:\n%s"
+                % (executed, budget, queries)
+            )
+
+
+def add_database(alias, name):
+    """
+    Register the SQLite database file `name` under `alias`, for tests that
+    need more databases than the settings define.
+    """
+    connections.databases[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+    }
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections.databases[alias]
+    if hasattr(connections._connections, alias):
+        delattr(connections._connections, alias)
+
+
+@contextmanager
+def database(alias, name):
+    """
+    Register `alias` for the duration of the block.
+    """
+    add_database(alias, name)
+    try:
+        yield
+    finally:
+        remove_database(alias)
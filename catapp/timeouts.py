@@ -0,0 +1,113 @@
+import threading
+from contextlib import ExitStack, contextmanager
+
+from django.db import DatabaseError, connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# SQLSTATE of a statement cancelled by statement_timeout on PostgreSQL.
+QUERY_CANCELED = "57014"
+
+
+class StatementTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The request took too long, try again with a narrower query."
+    default_code = "statement_timeout"
+
+
+class StatementGuard:
+    """
+    `connection.execute_wrapper()` turning the error of a statement cancelled
+    by `statement_timeout()` into `StatementTimeout`. On PostgreSQL, it sets
+    the `statement_timeout` of a connection before its first statement.
+    """
+
+    def __init__(self, milliseconds=None):
+        self.milliseconds = milliseconds
+        self.limited = set()
+        self.lock = threading.Lock()
+        self.active = True
+        self.expired = False
+
+    def limit(self, connection):
+        # A session-level SET needs no transaction, reset() undoes it. The SET
+        # statement goes through this wrapper too.
+        self.limited.add(connection.alias)
+        with connection.cursor() as cursor:
+            cursor.execute("SET statement_timeout = %s", [self.milliseconds])
+
+    def reset(self):
+        for alias in self.limited:
+            database = connections[alias]
+            if database.connection is None:
+                continue
+            try:
+                with database.cursor() as cursor:
+                    cursor.execute("RESET statement_timeout")
+            except DatabaseError:
+                # An aborted transaction, whose rollback undoes the SET anyway.
+                pass
+
+    def interrupt(self, databases):
+        # Called from the timer thread, at the deadline.
+        with self.lock:
+            if not self.active:
+                return
+            self.expired = True
+            for database in databases:
+                if database.connection is not None:
+                    database.connection.interrupt()
+
+    def close(self):
+        with self.lock:
+            self.active = False
+
+    def is_timeout(self, error):
+        if getattr(error.__cause__, "pgcode", None) == QUERY_CANCELED:
+            return True
+        return self.expired and "interrupted" in str(error)
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context["connection"]
+        if (
+            self.milliseconds is not None
+            and connection.vendor == "postgresql"
+            and connection.alias not in self.limited
+        ):
+            self.limit(connection)
+        try:
+            return execute(sql, params, many, context)
+        except DatabaseError as error:
+            if self.is_timeout(error):
+                raise StatementTimeout() from error
+            raise
+
+
+@contextmanager
+def statement_timeout(seconds, using=None):
+    """
+    Cancel the statements the block runs on the `using` databases (every
+    database by default) when they take too long, raising `StatementTimeout`.
+
+    PostgreSQL connections get `SET statement_timeout` before their first
+    statement in the block and are reset after it, so databases the block does
+    not query cost nothing. SQLite has no such setting, so a timer interrupts
+    the connections once the block has run for `seconds`. Other databases are
+    not limited.
+    """
+    guard = StatementGuard(int(seconds * 1000))
+    interrupted = []
+    with ExitStack() as stack:
+        for alias in connections if using is None else using:
+            database = connections[alias]
+            stack.enter_context(database.execute_wrapper(guard))
+            if database.vendor == "sqlite":
+                interrupted.append(database)
+        stack.callback(guard.reset)
+        if interrupted:
+            timer = threading.Timer(seconds, guard.interrupt, [interrupted])
+            timer.daemon = True
+            timer.start()
+            stack.callback(timer.cancel)
+            stack.callback(guard.close)
+        yield
@@ -1,15 +1,20 @@
 from catapp.views import HomeViewSet
 from django.conf.urls import include, re_path
-from rest_framework.routers import DefaultRouter
 
-from .views import HomeViewSet, HumanViewSet, BreedViewSet, CatViewSet
+from .metrics import metrics_view
+from .routers import BulkRouter
+from .views import HomeViewSet, HumanViewSet, BreedViewSet, CatViewSet, search_view, stats_view
 
-router = DefaultRouter()
+router = BulkRouter()
 router.register(r'home', HomeViewSet)
 router.register(r'human', HumanViewSet)
 router.register(r'breed', BreedViewSet)
 router.register(r'cat', CatViewSet)
 
 urlpatterns = [
+    re_path(r'^metrics/$', metrics_view, name='metrics'),
+    re_path(r'^search/$', search_view, name='search'),
+    re_path(r'^stats/$', stats_view, name='stats-index'),
+    re_path(r'^stats/(?P<chart>[a-z-]+)/$', stats_view, name='stats'),
     re_path('^', include(router.urls)),
 ]
\ No newline at end of file
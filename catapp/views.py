@@ -1,69 +1,296 @@
 from datetime import timedelta
 
 from django.conf import settings
+from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated  # , IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .authentications import ExpiringTokenAuthentication
+from .authentications import (
+    ExpiringTokenAuthentication,
+    SignedTokenAuthentication,
+    create_signed_token,
+    revoke_signed_token,
+)
+from .caching import get_cache, get_response_cache_key
+from .filters import IndexedFilterBackend
+from .mixins import (
+    AutocompleteMixin,
+    BulkModelMixin,
+    CompiledListMixin,
+    ConditionalGetMixin,
+    QueryPlanMixin,
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    ServerTimingMixin,
+    StatementTimeoutMixin,
+    StreamingListMixin,
+)
 from .models import Breed, Cat, Home, Human
+from .pagination import KeysetPagination, SearchPagination
+from .search import SEARCH_MODELS, search
 from .serializers import BreedSerializer, CatSerializer, HomeSerializer, HumanSerializer
+from .stats import CHARTS
 
 # Create your views here.
 
 
-class HomeViewSet(viewsets.ModelViewSet):
+class HomeViewSet(
+    ServerTimingMixin,
+    StatementTimeoutMixin,
+    ReplicaReadMixin,
+    AutocompleteMixin,
+    QueryPlanMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    StreamingListMixin,
+    CompiledListMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet,
+):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
     """
 
-    authentication_classes = (ExpiringTokenAuthentication, SessionAuthentication)
+    authentication_classes = (
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+        SessionAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    filter_backends = (IndexedFilterBackend,)
+    filter_fields = {"type": ("exact", "in")}
     serializer_class = HomeSerializer
     queryset = Home.objects.all()
 
 
-class HumanViewSet(viewsets.ModelViewSet):
+class HumanViewSet(
+    ServerTimingMixin,
+    StatementTimeoutMixin,
+    ReplicaReadMixin,
+    AutocompleteMixin,
+    QueryPlanMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    StreamingListMixin,
+    CompiledListMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet,
+):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
     """
 
-    authentication_classes = (ExpiringTokenAuthentication, SessionAuthentication)
+    authentication_classes = (
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+        SessionAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    filter_backends = (IndexedFilterBackend,)
+    filter_fields = {
+        "home": ("exact", "in"),
+        "gender": ("exact",),
+        "date_of_birth": ("exact", "gt", "gte", "lt", "lte"),
+    }
     serializer_class = HumanSerializer
     queryset = Human.objects.all()
 
 
-class BreedViewSet(viewsets.ModelViewSet):
+class BreedViewSet(
+    ServerTimingMixin,
+    StatementTimeoutMixin,
+    ReplicaReadMixin,
+    AutocompleteMixin,
+    QueryPlanMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    StreamingListMixin,
+    CompiledListMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet,
+):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
     """
 
-    authentication_classes = (ExpiringTokenAuthentication, SessionAuthentication)
+    authentication_classes = (
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+        SessionAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    filter_backends = (IndexedFilterBackend,)
+    filter_fields = {}
     serializer_class = BreedSerializer
     queryset = Breed.objects.all()
 
 
-class CatViewSet(viewsets.ModelViewSet):
+class CatViewSet(
+    ServerTimingMixin,
+    StatementTimeoutMixin,
+    ReplicaReadMixin,
+    QueryPlanMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    StreamingListMixin,
+    CompiledListMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet,
+):
     """
     This viewset automatically provides `list`, `create`, `retrieve`,
     `update` and `destroy` actions.
     """
 
-    authentication_classes = (ExpiringTokenAuthentication, SessionAuthentication)
+    authentication_classes = (
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+        SessionAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    filter_backends = (IndexedFilterBackend,)
+    filter_fields = {
+        "breed": ("exact", "in"),
+        "owner": ("exact", "in"),
+        "home": ("exact", "in"),
+        "owner__home": ("exact", "in"),
+        "gender": ("exact",),
+        "date_of_birth": ("exact", "gt", "gte", "lt", "lte"),
+    }
     serializer_class = CatSerializer
     queryset = Cat.objects.all()
 
 
+class SearchView(APIView):
+    """
+    Ranked full-text search across homes, humans, breeds and cats.
+
+    `?q=` is required; `?type=cat,breed` restricts the result types. Results
+    are paginated with `limit` and `offset`.
+    """
+
+    authentication_classes = (
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+        SessionAuthentication,
+    )
+    permission_classes = (IsAuthenticated,)
+    pagination_class = SearchPagination
+
+    def get_types(self, request):
+        types = request.query_params.get("type")
+        if not types:
+            return None
+        types = set(types.split(","))
+        unknown = types - set(SEARCH_MODELS)
+        if unknown:
+            raise ValidationError(
+                {"type": ["Unknown type: %s." % ", ".join(sorted(unknown))]}
+            )
+        return types
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": ["This query parameter is required."]})
+        types = self.get_types(request)
+
+        paginator = self.pagination_class()
+        results = paginator.paginate_results(
+            lambda offset, limit: search(query, offset, limit, types), request
+        )
+        data = [
+            {
+                "type": result_type,
+                "id": pk,
+                "name": name,
+                "url": request.build_absolute_uri(
+                    reverse("%s-detail" % result_type, args=(pk,))
+                ),
+                "rank": rank,
+            }
+            for rank, result_type, pk, name in results
+        ]
+        return paginator.get_paginated_response(data)
+
+
+search_view = SearchView.as_view()
+
+
+class StatsView(APIView):
+    """
+    Aggregates computed by the database, one `GROUP BY` query per chart.
+
+    `/stats/` lists the charts. Each chart accepts the filters of the list
+    endpoint of its model, e.g. `/stats/cats-per-breed/?gender=F`. Results are
+    cached until one of the models they depend on is written to.
+    """
+
+    authentication_classes = (
+        ExpiringTokenAuthentication,
+        SignedTokenAuthentication,
+        SessionAuthentication,
+    )
+    permission_classes = (IsAuthenticated,)
+    filter_backends = (IndexedFilterBackend,)
+    viewsets = (HomeViewSet, HumanViewSet, BreedViewSet, CatViewSet)
+
+    def get(self, request, chart=None):
+        if chart is None:
+            return Response(
+                {
+                    name: request.build_absolute_uri(reverse("stats", args=(name,)))
+                    for name in sorted(CHARTS)
+                }
+            )
+        try:
+            chart = CHARTS[chart]
+        except KeyError:
+            raise NotFound()
+        # Read by IndexedFilterBackend.
+        self.filter_fields = self.get_filter_fields(chart.model)
+        self.extra_query_params = chart.params
+
+        cache = get_cache()
+        key = get_response_cache_key(request, chart.models)
+        data = cache.get(key)
+        if data is None:
+            data = chart.aggregate(
+                self.filter_queryset(chart.model._default_manager.all()),
+                request.query_params,
+            )
+            cache.set(key, data, getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300))
+        return Response(data)
+
+    def get_filter_fields(self, model):
+        for viewset in self.viewsets:
+            if viewset.queryset.model is model:
+                return viewset.filter_fields
+        return {}
+
+    def filter_queryset(self, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+
+stats_view = StatsView.as_view()
+
+
 class ObtainExpiringAuthToken(ObtainAuthToken):
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -105,3 +332,38 @@ class ObtainExpiringAuthToken(ObtainAuthToken):
 
 
 obtain_expiring_auth_token = ObtainExpiringAuthToken.as_view()
+
+
+class ObtainSignedAuthToken(ObtainAuthToken):
+    """
+    Variant of `ObtainExpiringAuthToken` issuing stateless signed tokens,
+    to be sent as `Authorization: Signed <token>`.
+    """
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if serializer.is_valid():
+            key, expires_in_seconds = create_signed_token(
+                serializer.validated_data["user"]
+            )
+            return Response({"token": key, "expires_in": expires_in_seconds})
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+obtain_signed_auth_token = ObtainSignedAuthToken.as_view()
+
+
+class RevokeSignedAuthToken(APIView):
+    """
+    Log out by adding the signed token of the request to the revocation list.
+    """
+
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        revoke_signed_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+revoke_signed_auth_token = RevokeSignedAuthToken.as_view()
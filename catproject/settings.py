@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "catapp.metrics.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -50,6 +51,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "catapp.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "catproject.urls"
@@ -85,6 +87,30 @@ DATABASES = {
         "PORT": 5432,
     }
 }
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # Shared by every worker, its table is created by migration 0011
+    "signed-tokens": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "catapp_signed_token_cache",
+    },
+}
+# Read replicas: aliases in DATABASES serving list/retrieve actions and token
+# lookups (catapp.replicas). To try it locally, point "default" and a "replica"
+# alias at two SQLite files, migrate both and list "replica" here.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ["catapp.sharding.ShardRouter", "catapp.replicas.ReplicaRouter"]
+# Seconds a client keeps reading from the primary after it writes, and the
+# cache alias remembering those clients
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_CACHE = "default"
+# Seconds an unreachable replica is skipped before being tried again
+REPLICA_RETRY_SECONDS = 30
+# Shards: aliases in DATABASES holding the homes, humans and cats, placed by
+# consistent hashing of the home id (catapp.sharding). Breeds and the id
+# sequences stay on "default", which may be one of the shards. Every shard
+# needs the migrated schema. Sharded deployments do not use read replicas.
+DATABASE_SHARDS = []
 
 
 # Password validation
@@ -123,7 +149,38 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.TokenAuthentication",
-    )
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "catapp.renderers.JSONRenderer",
+        "catapp.renderers.BrowsableAPIRenderer",
+        "catapp.renderers.NDJSONRenderer",
+    ),
 }
 # Auth token expiry time in seconds
 TOKEN_EXPIRY_TIME = 86400
+# HMAC key of signed auth tokens, None to use SECRET_KEY
+SIGNED_TOKEN_KEY = None
+# Cache alias of revoked signed tokens, which must be shared by every worker
+SIGNED_TOKEN_REVOCATION_CACHE = "signed-tokens"
+# Per-process cache of validated auth tokens: lifetime in seconds and max entries
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_SIZE = 10000
+# Cached API responses: cache alias and lifetime in seconds
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 300
+# Lifetime in seconds of cached autocomplete results
+AUTOCOMPLETE_CACHE_TIMEOUT = 30
+# Serve list actions through the compiled values() read path (catapp.compiled)
+COMPILED_LIST_SERIALIZERS = False
+# Time requests (Server-Timing header) and aggregate them on /metrics/
+PERFORMANCE_METRICS = True
+# Log the queries of timed requests taking at least this many seconds to the
+# "catapp.slow_queries" logger, None to disable
+SLOW_QUERY_THRESHOLD = 1.0
+# Let staff users profile a request with ?_profile=cprofile|sql, reporting
+# the top REQUEST_PROFILING_TOP functions and allocations
+REQUEST_PROFILING = False
+REQUEST_PROFILING_TOP = 30
+# Default limit in seconds on the SQL statements of a viewset action, see
+# catapp.mixins.StatementTimeoutMixin; None to disable
+STATEMENT_TIMEOUT = 30
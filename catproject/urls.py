@@ -16,11 +16,17 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken import views
-from catapp.views import obtain_expiring_auth_token
+from catapp.views import (
+    obtain_expiring_auth_token,
+    obtain_signed_auth_token,
+    revoke_signed_auth_token,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('catapp.urls')),
     path('api-auth/', include('rest_framework.urls')),
-    path('api-token-auth/', obtain_expiring_auth_token)
+    path('api-token-auth/', obtain_expiring_auth_token),
+    path('api-signed-token-auth/', obtain_signed_auth_token),
+    path('api-signed-token-revoke/', revoke_signed_auth_token),
 ]